@@ -0,0 +1,60 @@
+"""
+Measures how long importing ezoff takes in a fresh interpreter.
+Compares the lazy package import against importing everything up front
+(ezoff.ezoff) and touching a single function.
+
+Run from the repository root:
+    python benchmarks/import_time.py [runs]
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CASES = {
+    "python startup": "pass",
+    "import ezoff": "import ezoff",
+    "import ezoff + one function": "import ezoff; ezoff.get_member_details",
+    "import ezoff.ezoff (everything)": "import ezoff.ezoff",
+}
+
+
+def time_run(code: str) -> float:
+    """
+    Wall time in ms of running code in a fresh interpreter
+    """
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], env=env, check=True)
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+    # Warm up the OS file cache and bytecode caches
+    for code in CASES.values():
+        time_run(code)
+
+    # Cases are interleaved so machine noise hits them all equally
+    timings = {name: [] for name in CASES}
+    for _ in range(runs):
+        for name, code in CASES.items():
+            timings[name].append(time_run(code))
+
+    baseline = statistics.median(timings["python startup"])
+
+    print(f"{'case':<36}{'median ms':>12}{'min ms':>10}{'over startup':>14}")
+    for name, values in timings.items():
+        median = statistics.median(values)
+        print(
+            f"{name:<36}{median:>12.1f}{min(values):>10.1f}{median - baseline:>14.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
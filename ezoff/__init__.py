@@ -1 +1,178 @@
-from .ezoff import *
+"""
+Python package that acts as a wrapper for the EZOffice API.
+Submodules (and requests, pandas, pyarrow...) are only imported the first
+time one of their names is used, so importing ezoff itself is cheap.
+"""
+
+import importlib
+
+# Public names and the submodule each one lives in, checked against the
+# modules by tests/test_exports.py
+_EXPORTS = {
+    "assets": [
+        "get_all_assets",
+        "iter_all_asset_pages",
+        "iter_all_asset_records",
+        "get_filtered_assets",
+        "iter_filtered_asset_pages",
+        "iter_filtered_asset_records",
+        "search_for_asset",
+        "create_asset",
+        "update_asset",
+        "delete_asset",
+        "checkin_asset",
+        "checkout_asset",
+        "get_asset_history",
+        "iter_asset_history_records",
+        "apply_asset_payload",
+        "EditableAsset",
+    ],
+    "bulk": ["bulk_create_work_orders"],
+    "cdc": ["ChangeCapture", "fingerprint"],
+    "coalesce": ["WriteBuffer"],
+    "dataframe": [
+        "ASSET_CATEGORICALS",
+        "MEMBER_CATEGORICALS",
+        "LOCATION_CATEGORICALS",
+        "HISTORY_CATEGORICALS",
+        "WORK_ORDER_CATEGORICALS",
+        "to_dataframe",
+        "assets_to_dataframe",
+        "members_to_dataframe",
+        "locations_to_dataframe",
+        "history_to_dataframe",
+        "work_orders_to_dataframe",
+    ],
+    "export": [
+        "flatten_record",
+        "export_pages",
+        "export_assets",
+        "export_members",
+        "export_locations",
+        "export_work_orders",
+    ],
+    "groups": ["get_subgroups"],
+    "holders": ["HolderIndex"],
+    "location_tree": ["LocationTree"],
+    "locations": [
+        "get_locations",
+        "iter_location_pages",
+        "get_location_details",
+        "get_location_item_quantities",
+        "create_location",
+        "activate_location",
+        "deactivate_location",
+        "update_location",
+    ],
+    "members": [
+        "get_members",
+        "iter_member_pages",
+        "iter_member_records",
+        "get_member_details",
+        "create_member",
+        "update_member",
+        "deactivate_member",
+        "activate_member",
+        "get_custom_roles",
+        "get_teams",
+    ],
+    "mirror": ["Mirror"],
+    "reconcile": [
+        "plan_member_changes",
+        "apply_member_plan",
+        "reconcile_members",
+    ],
+    "schemas": [
+        "SCHEMAS",
+        "PayloadSchema",
+        "get_schema",
+        "validate_payload",
+        "validate_payloads",
+    ],
+    "search_index": ["SEARCH_FIELDS", "tokenize", "AssetSearchIndex"],
+    "shared_store": ["SharedAssetStore", "StoreRefresher", "write_asset_store"],
+    "snapshots": ["SnapshotArchive"],
+    "transform": [
+        "DATE_FORMATS",
+        "normalize_dates",
+        "map_ids",
+        "Chain",
+        "transform_pages",
+        "transform_records",
+    ],
+    "webhooks": [
+        "WebhookReceiver",
+        "send_test_webhook",
+        "parse_notification",
+        "sign",
+        "verify_signature",
+    ],
+    "workorders": [
+        "get_work_orders",
+        "iter_work_order_pages",
+        "get_work_order_details",
+        "get_work_order_types",
+        "create_work_order",
+        "start_work_order",
+        "end_work_order",
+        "add_work_log_to_work_order",
+        "add_linked_inv_to_work_order",
+        "get_checklists",
+    ],
+}
+
+_SUBMODULES = {
+    "assets",
+    "auth",
+    "bulk",
+    "cache",
+    "cdc",
+    "cli",
+    "coalesce",
+    "dataframe",
+    "events",
+    "export",
+    "ezoff",
+    "groups",
+    "holders",
+    "jsonstream",
+    "location_tree",
+    "locations",
+    "members",
+    "mirror",
+    "ratelimit",
+    "reconcile",
+    "resilience",
+    "scheduler",
+    "schemas",
+    "search_index",
+    "shared_store",
+    "snapshots",
+    "timeouts",
+    "transform",
+    "transport",
+    "webhooks",
+    "workorders",
+}
+
+_NAME_TO_MODULE = {name: module for module, names in _EXPORTS.items() for name in names}
+
+__all__ = sorted(_NAME_TO_MODULE)
+
+
+def __getattr__(name: str):
+    if name in _SUBMODULES:
+        return importlib.import_module("." + name, __name__)
+
+    module_name = _NAME_TO_MODULE.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module("." + module_name, __name__), name)
+    # Cache it so later lookups don't come back through here
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__) | _SUBMODULES)
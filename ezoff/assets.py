@@ -3,148 +3,151 @@ Covers everything related to fixed assets in EZOffice
 """
 
 import os
+from typing import Iterator, Literal, Optional, Union
 
-import requests
-
+from ezoff import events, schemas, transport
 from ezoff.auth import Decorators
 
 
 @Decorators.check_env_vars
-def get_all_assets() -> list[dict]:
+def get_all_assets(per_page: Union[int, Literal["auto"], None] = None) -> list[dict]:
     """
     Get assets
     Recommended to use endpoint that takes a filter instead.
     This endpoint can be slow as it returns all assets in the system. Potentially
     several hundred pages of assets.
+    per_page sets the page size, or "auto" to tune it for the fastest pull.
     https://ezo.io/ezofficeinventory/developers/#api-retrive-assets
     """
 
-    url = os.environ["EZO_BASE_URL"] + "assets.api"
-
-    page = 1
     all_assets = []
 
-    while True:
-        params = {"page": page}
-
-        try:
-            response = requests.get(
-                url,
-                headers={"Authorization": "Bearer " + os.environ["EZO_TOKEN"]},
-                params=params,
-                data={
-                    "include_custom_fields": "true",
-                    "show_document_urls": "true",
-                    "show_image_urls": "true",
-                },
-                timeout=10,
-            )
-        except Exception as e:
-            print("Error, could not get assets from EZOfficeInventory: ", e)
-            raise Exception(
-                "Error, could not get assets from EZOfficeInventory: " + str(e)
-            )
-
-        if response.status_code != 200:
-            print(
-                f"Error {response.status_code}, could not get assets from EZOfficeInventory: ",
-                response.content,
-            )
-            break
-
-        data = response.json()
-
-        if "assets" not in data:
-            print(
-                f"Error, could not get assets from EZOfficeInventory: ",
-                response.content,
-            )
-            raise Exception(
-                f"Error, could not get assets from EZOfficeInventory: "
-                + str(response.content)
-            )
-
-        all_assets.extend(data["assets"])
-
-        if "total_pages" not in data:
-            print("Error, could not get total_pages from EZOfficeInventory: ", data)
-            break
-
-        if page >= data["total_pages"]:
-            break
-
-        page += 1
+    for page in iter_all_asset_pages(per_page):
+        all_assets.extend(page)
 
     return all_assets
 
 
 @Decorators.check_env_vars
-def get_filtered_assets(filter: dict) -> list[dict]:
+def iter_all_asset_pages(
+    per_page: Union[int, Literal["auto"], None] = None,
+) -> Iterator[list[dict]]:
+    """
+    Same as get_all_assets, but yields the assets one page at a time instead
+    of collecting every page in memory first.
+    """
+
+    url = os.environ["EZO_BASE_URL"] + "assets.api"
+
+    yield from transport.iter_pages(
+        url,
+        "assets",
+        "assets",
+        per_page=per_page,
+        headers={"Authorization": "Bearer " + os.environ["EZO_TOKEN"]},
+        data={
+            "include_custom_fields": "true",
+            "show_document_urls": "true",
+            "show_image_urls": "true",
+        },
+    )
+
+
+@Decorators.check_env_vars
+def iter_all_asset_records(per_page: Optional[int] = None) -> Iterator[dict]:
+    """
+    Same as get_all_assets, but yields assets one at a time, parsed as the
+    response comes in. Memory use stays at about one asset however big the
+    pages are.
+    """
+
+    url = os.environ["EZO_BASE_URL"] + "assets.api"
+
+    yield from transport.iter_records(
+        url,
+        "assets",
+        "assets",
+        per_page=per_page,
+        headers={"Authorization": "Bearer " + os.environ["EZO_TOKEN"]},
+        data={
+            "include_custom_fields": "true",
+            "show_document_urls": "true",
+            "show_image_urls": "true",
+        },
+    )
+
+
+@Decorators.check_env_vars
+def get_filtered_assets(
+    filter: dict, per_page: Union[int, Literal["auto"], None] = None
+) -> list[dict]:
     """
     Get assets via filtering. Recommended to use this endpoint rather than
     returning all assets.
+    per_page sets the page size, or "auto" to tune it for the fastest pull.
+    """
+
+    all_assets = []
+
+    for page in iter_filtered_asset_pages(filter, per_page):
+        all_assets.extend(page)
+
+    return all_assets
+
+
+@Decorators.check_env_vars
+def iter_filtered_asset_pages(
+    filter: dict, per_page: Union[int, Literal["auto"], None] = None
+) -> Iterator[list[dict]]:
+    """
+    Same as get_filtered_assets, but yields the assets one page at a time.
     """
     if "status" not in filter:
         raise ValueError("filter must have 'status' key")
 
     url = os.environ["EZO_BASE_URL"] + "assets/filter.api"
 
-    page = 1
-    all_assets = []
+    yield from transport.iter_pages(
+        url,
+        "assets",
+        "assets",
+        params=filter,
+        per_page=per_page,
+        headers={"Authorization": "Bearer " + os.environ["EZO_TOKEN"]},
+        data={
+            "include_custom_fields": "true",
+            "show_document_urls": "true",
+            "show_image_urls": "true",
+        },
+    )
 
-    while True:
-        params = {"page": page}
-        params.update(filter)
-
-        try:
-            response = requests.get(
-                url,
-                headers={"Authorization": "Bearer " + os.environ["EZO_TOKEN"]},
-                params=params,
-                data={
-                    "include_custom_fields": "true",
-                    "show_document_urls": "true",
-                    "show_image_urls": "true",
-                },
-                timeout=10,
-            )
-        except Exception as e:
-            print("Error, could not get assets from EZOfficeInventory: ", e)
-            raise Exception(
-                "Error, could not get assets from EZOfficeInventory: " + str(e)
-            )
-
-        if response.status_code != 200:
-            print(
-                f"Error {response.status_code}, could not get assets from EZOfficeInventory: ",
-                response.content,
-            )
-            break
-
-        data = response.json()
-
-        if "assets" not in data:
-            print(
-                f"Error, could not get assets from EZOfficeInventory: ",
-                response.content,
-            )
-            raise Exception(
-                f"Error, could not get assets from EZOfficeInventory: "
-                + str(response.content)
-            )
-
-        all_assets.extend(data["assets"])
-
-        if "total_pages" not in data:
-            print("Error, could not get total_pages from EZOfficeInventory: ", data)
-            break
-
-        if page >= data["total_pages"]:
-            break
-
-        page += 1
 
-    return all_assets
+@Decorators.check_env_vars
+def iter_filtered_asset_records(
+    filter: dict, per_page: Optional[int] = None
+) -> Iterator[dict]:
+    """
+    Same as get_filtered_assets, but yields assets one at a time, parsed as
+    the response comes in.
+    """
+    if "status" not in filter:
+        raise ValueError("filter must have 'status' key")
+
+    url = os.environ["EZO_BASE_URL"] + "assets/filter.api"
+
+    yield from transport.iter_records(
+        url,
+        "assets",
+        "assets",
+        params=filter,
+        per_page=per_page,
+        headers={"Authorization": "Bearer " + os.environ["EZO_TOKEN"]},
+        data={
+            "include_custom_fields": "true",
+            "show_document_urls": "true",
+            "show_image_urls": "true",
+        },
+    )
 
 
 @Decorators.check_env_vars
@@ -159,61 +162,23 @@ def search_for_asset(search_term: str) -> list[dict]:
 
     url = os.environ["EZO_BASE_URL"] + "search.api"
 
-    page = 1
     all_assets = []
 
-    while True:
-        data = {
-            "page": page,
+    for page in transport.iter_pages(
+        url,
+        "assets",
+        "assets",
+        headers={"Authorization": "Bearer " + os.environ["EZO_TOKEN"]},
+        data={
             "search": search_term,
             "facet": "FixedAsset",
             "include_custom_fields": "true",
             "show_document_urls": "true",
             "show_image_urls": "true",
             "show_document_details": "true",
-        }
-
-        try:
-            response = requests.get(
-                url,
-                headers={"Authorization": "Bearer " + os.environ["EZO_TOKEN"]},
-                data=data,
-                timeout=10,
-            )
-        except Exception as e:
-            print("Error, could not get assets from EZOfficeInventory: ", e)
-            raise Exception(
-                "Error, could not get assets from EZOfficeInventory: " + str(e)
-            )
-
-        if response.status_code != 200:
-            print(
-                f"Error {response.status_code}, could not get assets from EZOfficeInventory: ",
-                response.content,
-            )
-            break
-
-        data = response.json()
-
-        if "assets" not in data:
-            print(
-                f"Error, could not get assets from EZOfficeInventory: ",
-                response.content,
-            )
-            raise Exception(
-                f"Error, could not get assets from EZOfficeInventory: "
-                + str(response.content)
-            )
-
-        all_assets.extend(data["assets"])
-
-        if "total_pages" not in data:
-            break
-
-        if page >= data["total_pages"]:
-            break
-
-        page += 1
+        },
+    ):
+        all_assets.extend(page)
 
     return all_assets
 
@@ -225,46 +190,15 @@ def create_asset(asset: dict) -> dict:
     https://ezo.io/ezofficeinventory/developers/#api-create-asset
     """
 
-    # Required fields
-    if "fixed_asset[name]" not in asset:
-        raise ValueError("asset must have 'fixed_asset[name]' key")
-    if "fixed_asset[group_id]" not in asset:
-        raise ValueError("asset must have 'fixed_asset[group_id]' key")
-    if "fixed_asset[purchased_on]" not in asset:
-        raise ValueError("asset must have 'fixed_asset[purchased_on]' key")
-        # Also check that the date is in the correct format mm/dd/yyyy
-        try:
-            datetime.strptime(asset["fixed_asset[purchased_on]"], "%m/%d/%Y")
-        except ValueError:
-            raise ValueError(
-                "asset['fixed_asset[purchased_on]'] must be in the format mm/dd/yyyy"
-            )
-
-    # Remove any keys that are not valid
-    valid_keys = [
-        "fixed_asset[name]",
-        "fixed_asset[description]",
-        "fixed_asset[group_id]",
-        "fixed_asset[sub_group_id]",
-        "fixed_asset[purchased_on]",
-        "fixed_asset[location_id]",
-        "fixed_asset[image_url]",
-        "fixed_asset[document_urls][]",
-        "fixed_asset[identifier]",
-    ]
-
-    asset = {
-        k: v for k, v in asset.items() if k in valid_keys or k.startswith("cust_attr")
-    }
+    asset = schemas.validate_payload("create_asset", asset)
 
     url = os.environ["EZO_BASE_URL"] + "assets.api"
 
     try:
-        response = requests.post(
+        response = transport.post(
             url,
             headers={"Authorization": "Bearer " + os.environ["EZO_TOKEN"]},
             data=asset,
-            timeout=10,
         )
     except Exception as e:
         print("Error, could not create asset in EZOfficeInventory: ", e)
@@ -280,7 +214,10 @@ def create_asset(asset: dict) -> dict:
             + str(response.content)
         )
 
-    return response.json()
+    result = response.json()
+    events.emit("asset_created", asset=asset, response=result)
+
+    return result
 
 
 @Decorators.check_env_vars
@@ -290,31 +227,15 @@ def update_asset(asset_id: int, asset: dict) -> dict:
     https://ezo.io/ezofficeinventory/developers/#api-update-asset
     """
 
-    # Remove any keys that are not valid
-    valid_keys = [
-        "fixed_asset[name]",
-        "fixed_asset[description]",
-        "fixed_asset[group_id]",
-        "fixed_asset[sub_group_id]",
-        "fixed_asset[identifier]",
-        "fixed_asset[purchased_on]",
-        "fixed_asset[location_id]",
-        "fixed_asset[image_url]",
-        "fixed_asset[document_urls][]",
-    ]
-
-    asset = {
-        k: v for k, v in asset.items() if k in valid_keys or k.startswith("cust_attr")
-    }
+    asset = schemas.validate_payload("update_asset", asset)
 
     url = os.environ["EZO_BASE_URL"] + "assets/" + str(asset_id) + ".api"
 
     try:
-        response = requests.put(
+        response = transport.put(
             url,
             headers={"Authorization": "Bearer " + os.environ["EZO_TOKEN"]},
             data=asset,
-            timeout=10,
         )
     except Exception as e:
         print("Error, could not update asset in EZOfficeInventory: ", e)
@@ -330,7 +251,10 @@ def update_asset(asset_id: int, asset: dict) -> dict:
             + str(response.content)
         )
 
-    return response.json()
+    result = response.json()
+    events.emit("asset_updated", asset_id=asset_id, asset=asset, response=result)
+
+    return result
 
 
 @Decorators.check_env_vars
@@ -343,10 +267,9 @@ def delete_asset(asset_id: int) -> dict:
     url = os.environ["EZO_BASE_URL"] + "assets/" + str(asset_id) + ".api"
 
     try:
-        response = requests.delete(
+        response = transport.delete(
             url,
             headers={"Authorization": "Bearer " + os.environ["EZO_TOKEN"]},
-            timeout=10,
         )
     except Exception as e:
         print("Error, could not delete asset in EZOfficeInventory: ", e)
@@ -362,7 +285,10 @@ def delete_asset(asset_id: int) -> dict:
             + str(response.content)
         )
 
-    return response.json()
+    result = response.json()
+    events.emit("asset_deleted", asset_id=asset_id, response=result)
+
+    return result
 
 
 @Decorators.check_env_vars
@@ -372,30 +298,15 @@ def checkin_asset(asset_id: int, checkin: dict) -> dict:
     https://ezo.io/ezofficeinventory/developers/#api-checkin-asset
     """
 
-    # Required fields
-    if "checkin_values[location_id]" not in checkin:
-        raise ValueError("checkin must have 'checkin[location_id]' key")
-
-    # Remove any keys that are not valid
-    valid_keys = [
-        "checkin_values[location_id]",
-        "checkin_values[comments]",
-    ]
-
-    checkin = {
-        k: v
-        for k, v in checkin.items()
-        if k in valid_keys or k.startswith("checkin_values[c_attr_vals]")
-    }
+    checkin = schemas.validate_payload("checkin_asset", checkin)
 
     url = os.environ["EZO_BASE_URL"] + "assets/" + str(asset_id) + "/checkin.api"
 
     try:
-        response = requests.put(
+        response = transport.put(
             url,
             headers={"Authorization": "Bearer " + os.environ["EZO_TOKEN"]},
             data=checkin,
-            timeout=10,
         )
     except Exception as e:
         print("Error, could not checkin asset in EZOfficeInventory: ", e)
@@ -413,7 +324,10 @@ def checkin_asset(asset_id: int, checkin: dict) -> dict:
             + str(response.content)
         )
 
-    return response.json()
+    result = response.json()
+    events.emit("asset_checked_in", asset_id=asset_id, checkin=checkin, response=result)
+
+    return result
 
 
 @Decorators.check_env_vars
@@ -426,31 +340,16 @@ def checkout_asset(asset_id: int, user_id: int, checkout: dict) -> dict:
     asset will not be checked out. Response will contain a message.
     """
 
-    # Remove any keys that are not valid
-    valid_keys = [
-        "checkout_values[location_id]",
-        "checkout_values[comments]",
-        "till",
-        "till_time",
-        "checkout_values[override_conflicting_reservations]",
-        "checkout_values[override_my_conflicting_reservations]",
-    ]
-
-    checkout = {
-        k: v
-        for k, v in checkout.items()
-        if k in valid_keys or k.startswith("checkout_values[c_attr_vals]")
-    }
+    checkout = schemas.validate_payload("checkout_asset", checkout)
 
     url = os.environ["EZO_BASE_URL"] + "assets/" + str(asset_id) + "/checkout.api"
 
     try:
-        response = requests.put(
+        response = transport.put(
             url,
             headers={"Authorization": "Bearer " + os.environ["EZO_TOKEN"]},
             params={"user_id": user_id},
             data=checkout,
-            timeout=10,
         )
     except Exception as e:
         print("Error, could not checkout asset in EZOfficeInventory: ", e)
@@ -468,13 +367,25 @@ def checkout_asset(asset_id: int, user_id: int, checkout: dict) -> dict:
             + str(response.content)
         )
 
-    return response.json()
+    result = response.json()
+    events.emit(
+        "asset_checked_out",
+        asset_id=asset_id,
+        user_id=user_id,
+        checkout=checkout,
+        response=result,
+    )
+
+    return result
 
 
 @Decorators.check_env_vars
-def get_asset_history(asset_id: int) -> list[dict]:
+def get_asset_history(
+    asset_id: int, per_page: Union[int, Literal["auto"], None] = None
+) -> list[dict]:
     """
     Get asset history
+    per_page sets the page size, or "auto" to tune it for the fastest pull.
     https://ezo.io/ezofficeinventory/developers/#api-checkin-out-history
     """
 
@@ -482,51 +393,146 @@ def get_asset_history(asset_id: int) -> list[dict]:
         os.environ["EZO_BASE_URL"] + "assets/" + str(asset_id) + "/history_paginate.api"
     )
 
-    page = 1
     all_history = []
 
-    while True:
-        try:
-            response = requests.get(
-                url,
-                headers={"Authorization": "Bearer " + os.environ["EZO_TOKEN"]},
-                params={"page": page},
-                timeout=10,
-            )
-        except Exception as e:
-            print("Error, could not get asset history from EZOfficeInventory: ", e)
-            raise Exception(
-                "Error, could not get asset history from EZOfficeInventory: " + str(e)
-            )
-
-        if response.status_code != 200:
-            print(
-                f"Error {response.status_code}, could not get asset history from EZOfficeInventory: ",
-                response.content,
-            )
-            break
-
-        data = response.json()
-
-        if "history" not in data:
-            print(
-                f"Error, could not get asset history from EZOfficeInventory: ",
-                response.content,
-            )
-            raise Exception(
-                f"Error, could not get asset history from EZOfficeInventory: "
-                + str(response.content)
-            )
-
-        all_history.extend(data["history"])
-
-        if "total_pages" not in data:
-            print("Error, could not get total_pages from EZOfficeInventory: ", data)
-            break
-
-        if page >= data["total_pages"]:
-            break
-
-        page += 1
+    for page in transport.iter_pages(
+        url,
+        "history",
+        "asset history",
+        per_page=per_page,
+        headers={"Authorization": "Bearer " + os.environ["EZO_TOKEN"]},
+    ):
+        all_history.extend(page)
 
     return all_history
+
+
+@Decorators.check_env_vars
+def iter_asset_history_records(
+    asset_id: int, per_page: Optional[int] = None
+) -> Iterator[dict]:
+    """
+    Same as get_asset_history, but yields history entries one at a time,
+    parsed as the response comes in.
+    """
+
+    url = (
+        os.environ["EZO_BASE_URL"] + "assets/" + str(asset_id) + "/history_paginate.api"
+    )
+
+    yield from transport.iter_records(
+        url,
+        "history",
+        "asset history",
+        per_page=per_page,
+        headers={"Authorization": "Bearer " + os.environ["EZO_TOKEN"]},
+    )
+
+
+def apply_asset_payload(record: dict, asset: dict) -> dict:
+    """
+    Return a copy of an asset record (as returned by the get functions) with
+    a create_asset / update_asset payload applied to it. Used to keep local
+    copies in sync with changes made through ezoff.
+    fixed_asset[field] keys set record[field], cust_attr[Name] keys set the
+    custom field called Name.
+    """
+    record = dict(record)
+    custom_fields = [dict(field) for field in record.get("custom_fields") or []]
+
+    for key, value in asset.items():
+        if key.startswith("fixed_asset[") and key.endswith("]"):
+            field = key[len("fixed_asset[") : -1]
+            if field.endswith("]["):
+                # e.g. fixed_asset[document_urls][]
+                continue
+            record[field] = value
+        elif key.startswith("cust_attr[") and key.endswith("]"):
+            name = key[len("cust_attr[") : -1]
+            for field in custom_fields:
+                if field.get("name") == name:
+                    field["value"] = value
+                    break
+            else:
+                custom_fields.append({"name": name, "value": value})
+
+    if custom_fields:
+        record["custom_fields"] = custom_fields
+
+    return record
+
+
+class EditableAsset:
+    """
+    Wraps an asset record (as returned by the get functions) to edit it with
+    update_asset keys, e.g. asset["cust_attr[Serial]"] = "X123".
+    Only fields that actually changed are sent when saving, and nothing is
+    sent at all if none did.
+    """
+
+    def __init__(self, record: dict, id_key: str = "sequence_num"):
+        self.record = record
+        self.asset_id = record[id_key]
+        self._changes = {}
+
+    def _original(self, key: str):
+        if key.startswith("cust_attr[") and key.endswith("]"):
+            name = key[len("cust_attr[") : -1]
+            for field in self.record.get("custom_fields") or []:
+                if field.get("name") == name:
+                    return field.get("value")
+            return None
+        if key.startswith("fixed_asset[") and key.endswith("]"):
+            return self.record.get(key[len("fixed_asset[") : -1])
+        return None
+
+    def __getitem__(self, key: str):
+        if key in self._changes:
+            return self._changes[key]
+        return self._original(key)
+
+    def __setitem__(self, key: str, value) -> None:
+        if not schemas.get_schema("update_asset").is_valid_key(key):
+            raise KeyError(f"'{key}' is not a valid key for update_asset")
+
+        original = self._original(key)
+        unchanged = original == value or (
+            original is not None and value is not None and str(original) == str(value)
+        )
+        if unchanged:
+            # Set back to what it was, no longer needs sending
+            self._changes.pop(key, None)
+        else:
+            self._changes[key] = value
+
+    @property
+    def changes(self) -> dict:
+        """
+        The update_asset payload that save would send
+        """
+        return dict(self._changes)
+
+    @property
+    def is_dirty(self) -> bool:
+        return bool(self._changes)
+
+    def discard(self) -> None:
+        """
+        Forget any unsaved edits
+        """
+        self._changes = {}
+
+    def save(self) -> Optional[dict]:
+        """
+        Send the changed fields with update_asset. Returns its response, or
+        None without making a call if nothing changed.
+        """
+        if not self._changes:
+            return None
+
+        changes = self._changes
+        response = update_asset(self.asset_id, changes)
+        self.record = apply_asset_payload(self.record, changes)
+        self._changes = {}
+
+        return response
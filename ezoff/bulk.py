@@ -0,0 +1,131 @@
+"""
+Bulk operations that run many independent jobs against the API at once.
+Each job's own steps still happen in order, but many jobs are in flight
+at the same time, up to max_workers.
+"""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Optional
+
+from ezoff import scheduler, schemas
+from ezoff.workorders import (
+    add_linked_inv_to_work_order,
+    add_work_log_to_work_order,
+    create_work_order,
+    end_work_order,
+    start_work_order,
+)
+
+
+def _work_order_id(response) -> Optional[int]:
+    """
+    Work order number out of a create_work_order response
+    """
+    if not isinstance(response, dict):
+        return None
+    for key in ["work_order", "task"]:
+        if isinstance(response.get(key), dict):
+            response = response[key]
+            break
+    for key in ["sequence_num", "id"]:
+        if response.get(key) is not None:
+            return response[key]
+    return None
+
+
+def _run_work_order(order: dict, result: dict) -> None:
+    """
+    Run every step for one order, stopping at the first failure.
+    Progress is recorded on result as it goes, so a failure partway through
+    still shows which steps were done.
+    """
+    response = create_work_order(order["work_order"])
+    work_order_id = _work_order_id(response)
+    if work_order_id is None:
+        raise Exception(
+            "Error, could not create work order in EZOfficeInventory: " + str(response)
+        )
+    result["work_order_id"] = work_order_id
+    result["steps"].append("create")
+
+    for linked_inv in order.get("linked_inventory", []):
+        add_linked_inv_to_work_order(work_order_id, linked_inv)
+        result["steps"].append("linked_inventory")
+
+    for work_log in order.get("work_logs", []):
+        add_work_log_to_work_order(work_order_id, work_log)
+        result["steps"].append("work_log")
+
+    if order.get("start"):
+        start_work_order(work_order_id)
+        result["steps"].append("start")
+
+    if order.get("end"):
+        end_work_order(work_order_id)
+        result["steps"].append("end")
+
+
+def _validate_work_order(order: dict) -> None:
+    """
+    Check every payload of an order before anything is sent
+    """
+    if "work_order" not in order:
+        raise ValueError("order must have 'work_order' key")
+    schemas.validate_payload("create_work_order", order["work_order"])
+    for linked_inv in order.get("linked_inventory", []):
+        schemas.validate_payload("add_linked_inv_to_work_order", linked_inv)
+    for work_log in order.get("work_logs", []):
+        schemas.validate_payload("add_work_log_to_work_order", work_log)
+
+
+def bulk_create_work_orders(
+    orders: list[dict],
+    max_workers: int = 8,
+    progress: Optional[Callable[[dict], None]] = None,
+) -> list[dict]:
+    """
+    Create many work orders, each with its follow-up steps. An order is a dict:
+        work_order: create_work_order payload
+        linked_inventory: list of add_linked_inv_to_work_order payloads (optional)
+        work_logs: list of add_work_log_to_work_order payloads (optional)
+        start: start the work order once set up (optional)
+        end: end the work order afterwards (optional)
+    Steps for one order run in order, up to max_workers orders run at the same
+    time. Every payload is validated before any API call, invalid orders are
+    reported without being sent.
+    Returns one result per order, in the same order as given, with the order's
+    index, ok, work_order_id, the steps that completed and the error if any.
+    progress, if given, is called with each result as it finishes.
+    """
+    results = [
+        {"index": i, "ok": False, "work_order_id": None, "steps": [], "error": None}
+        for i in range(len(orders))
+    ]
+    runnable = []
+
+    for i, order in enumerate(orders):
+        try:
+            _validate_work_order(order)
+            runnable.append(i)
+        except ValueError as e:
+            results[i]["error"] = str(e)
+            if progress is not None:
+                progress(results[i])
+
+    # Workers run at the caller's scheduler priority
+    run_work_order = scheduler.bind_priority(_run_work_order)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(run_work_order, orders[i], results[i]): i for i in runnable
+        }
+        for future in as_completed(futures):
+            result = results[futures[future]]
+            try:
+                future.result()
+                result["ok"] = True
+            except Exception as e:
+                result["error"] = str(e)
+            if progress is not None:
+                progress(result)
+
+    return results
@@ -0,0 +1,292 @@
+"""
+Optional on-disk cache for GET responses from the EZOffice API.
+Useful for short-lived processes (cron jobs etc.) that would otherwise
+re-download the same data every run. Off unless EZO_CACHE_DIR is set or
+configure_cache is called.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from typing import Optional
+
+# Seconds a cached response stays fresh, by endpoint (first path segment)
+DEFAULT_TTLS = {
+    "assets": 300,
+    "search": 300,
+    "members": 900,
+    "locations": 3600,
+    "groups": 3600,
+    "custom_roles": 3600,
+    "teams": 3600,
+    "task_types": 3600,
+    "checklists": 3600,
+    "tasks": 300,
+}
+
+# Writes to one endpoint can change what another endpoint returns
+RELATED_ENDPOINTS = {
+    "assets": ("assets", "search", "locations"),
+    "locations": ("locations",),
+    "members": ("members",),
+    "tasks": ("tasks",),
+}
+
+
+class DiskCache:
+    """
+    Response cache stored as one file per request under a directory, grouped
+    by endpoint. Entries expire after a per-endpoint TTL and the least recently
+    used entries are evicted once the total size goes over max_bytes.
+    Files are written to a temp file and renamed into place, so several
+    processes can share one directory. Errors reading or writing entries are
+    treated as misses, the cache never fails a request.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: int = 256 * 1024 * 1024,
+        ttls: Optional[dict] = None,
+        default_ttl: int = 300,
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttls = dict(DEFAULT_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+        self.default_ttl = default_ttl
+        self._size = None
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, endpoint: str, key: str) -> str:
+        name = hashlib.sha256(key.encode()).hexdigest()
+        return os.path.join(self.directory, endpoint, name + ".entry")
+
+    def ttl(self, endpoint: str) -> int:
+        """
+        Seconds an entry for the given endpoint stays fresh
+        """
+        return self.ttls.get(endpoint, self.default_ttl)
+
+    def get(self, endpoint: str, key: str) -> Optional[dict]:
+        """
+        Look up a stored response. Returns None on a miss, otherwise a dict with
+        the body, the stored headers/validators and whether it is still fresh.
+        Stale entries are returned too so they can be revalidated.
+        """
+        path = self._path(endpoint, key)
+        try:
+            with open(path, "rb") as f:
+                meta = json.loads(f.readline())
+                content = f.read()
+        except (OSError, ValueError):
+            return None
+
+        if not isinstance(meta, dict) or meta.get("key") != key:
+            return None
+        if not isinstance(meta.get("stored_at"), (int, float)):
+            return None
+
+        try:
+            # Bump mtime, it's what eviction orders by
+            os.utime(path)
+        except OSError:
+            pass
+
+        meta["content"] = content
+        meta["fresh"] = time.time() - meta["stored_at"] < self.ttl(endpoint)
+        return meta
+
+    def set(
+        self,
+        endpoint: str,
+        key: str,
+        content: bytes,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+        content_type: str = "application/json",
+    ) -> None:
+        """
+        Store a response body. A cache that can't be written to (disk full,
+        directory removed by another process...) is reported and skipped,
+        it never fails the request that fetched the body.
+        """
+        try:
+            self._set(endpoint, key, content, etag, last_modified, content_type)
+        except Exception as e:
+            print("Warning, could not write to the response cache: ", e)
+
+    def _set(
+        self,
+        endpoint: str,
+        key: str,
+        content: bytes,
+        etag: Optional[str],
+        last_modified: Optional[str],
+        content_type: str,
+    ) -> None:
+        path = self._path(endpoint, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        meta = {
+            "key": key,
+            "stored_at": time.time(),
+            "etag": etag,
+            "last_modified": last_modified,
+            "content_type": content_type,
+        }
+        header = json.dumps(meta).encode() + b"\n"
+
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(header)
+                f.write(content)
+            try:
+                replaced = os.stat(path).st_size
+            except OSError:
+                replaced = 0
+            os.replace(tmp, path)
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+
+        with self._lock:
+            if self._size is None:
+                self._size = self._total_size()
+            else:
+                self._size += len(header) + len(content) - replaced
+            over = self._size > self.max_bytes
+
+        if over:
+            self.evict()
+
+    def _entries(self) -> list[tuple[float, int, str]]:
+        """
+        (mtime, size, path) of every entry currently on disk
+        """
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".entry"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _total_size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self) -> None:
+        """
+        Remove least recently used entries until the cache is at 90% of max_bytes
+        """
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                # Another process got to it first
+                pass
+            total -= size
+
+        with self._lock:
+            self._size = total
+
+    def invalidate(self, endpoint: Optional[str] = None, key: Optional[str] = None):
+        """
+        Drop cached entries. With a key, only that request. With just an
+        endpoint, everything cached for the endpoint. With neither, everything.
+        """
+        if endpoint is not None and key is not None:
+            try:
+                os.remove(self._path(endpoint, key))
+            except OSError:
+                pass
+        elif endpoint is not None:
+            shutil.rmtree(os.path.join(self.directory, endpoint), ignore_errors=True)
+        else:
+            try:
+                names = os.listdir(self.directory)
+            except OSError:
+                names = []
+            for name in names:
+                shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+
+        with self._lock:
+            self._size = None
+
+
+_cache = None
+_configured = False
+
+
+def configure_cache(
+    directory: str,
+    max_bytes: int = 256 * 1024 * 1024,
+    ttls: Optional[dict] = None,
+    default_ttl: int = 300,
+) -> DiskCache:
+    """
+    Turn on the disk cache for all ezoff read functions.
+    ttls maps endpoint names (e.g. 'assets', 'members', 'locations') to seconds.
+    """
+    global _cache, _configured
+    _cache = DiskCache(directory, max_bytes, ttls, default_ttl)
+    _configured = True
+    return _cache
+
+
+def disable_cache() -> None:
+    """
+    Turn the disk cache off, regardless of EZO_CACHE_DIR
+    """
+    global _cache, _configured
+    _cache = None
+    _configured = True
+
+
+def get_cache() -> Optional[DiskCache]:
+    """
+    The active cache, if any. Falls back to the EZO_CACHE_DIR and
+    EZO_CACHE_MAX_BYTES environment variables when not configured in code.
+    """
+    global _cache, _configured
+    if not _configured:
+        if "EZO_CACHE_DIR" in os.environ:
+            try:
+                _cache = DiskCache(
+                    os.environ["EZO_CACHE_DIR"],
+                    int(os.environ.get("EZO_CACHE_MAX_BYTES", 256 * 1024 * 1024)),
+                )
+            except OSError as e:
+                print("Warning, could not open the response cache, caching is off: ", e)
+        _configured = True
+    return _cache
+
+
+def invalidate_cache(endpoint: Optional[str] = None) -> None:
+    """
+    Drop cached responses for an endpoint (e.g. 'assets'), or all of them
+    """
+    cache = get_cache()
+    if cache is not None:
+        cache.invalidate(endpoint)
@@ -0,0 +1,223 @@
+"""
+Change data capture between successive pulls.
+Instead of keeping the previous snapshot, a small SQLite file holds one
+fingerprint per record: a hash of the whole record plus a short hash per
+(flattened) field. Comparing a new pull against it yields created, updated
+and deleted events, with the fields that changed, while holding only one
+record in memory at a time.
+"""
+
+import hashlib
+import json
+import sqlite3
+from typing import Iterable, Iterator, Literal, Optional
+
+from ezoff.export import flatten_record
+from ezoff.transport import IncompletePullError
+
+ID_KEYS = {
+    "assets": "sequence_num",
+    "members": "id",
+    "locations": "id",
+}
+
+
+def _hash(value) -> str:
+    encoded = json.dumps(value, sort_keys=True, default=str).encode()
+    return hashlib.blake2b(encoded, digest_size=8).hexdigest()
+
+
+def fingerprint(record: dict) -> tuple[str, dict]:
+    """
+    Hash of a record and the hash of each of its flattened fields
+    """
+    fields = {name: _hash(value) for name, value in flatten_record(record).items()}
+    return _hash(sorted(fields.items())), fields
+
+
+class ChangeCapture:
+    """
+    Fingerprints of one entity's records, kept in a SQLite file between runs.
+
+        capture = ChangeCapture("assets.cdc")
+        for change in capture.capture():
+            ...
+
+    Each change is a dict:
+        type: 'created', 'updated' or 'deleted'
+        id: record id
+        record: the new record (None for deleted)
+        changed: flattened fields that were added or changed, with their new
+            values (for updated)
+        removed: flattened fields that are gone (for updated)
+    Only hashes of the previous values are kept, so old values aren't known.
+    Fingerprints are only saved once a run has been consumed to the end; if
+    it stops early the same changes come out again next time. A pull that
+    fails partway saves what it got but reports no deletions.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        entity: Literal["assets", "members", "locations"] = "assets",
+        id_key: Optional[str] = None,
+    ):
+        if entity not in ID_KEYS:
+            raise ValueError(f"entity must be one of {list(ID_KEYS)}")
+        self.path = path
+        self.entity = entity
+        self.id_key = id_key or ID_KEYS[entity]
+        self._db = sqlite3.connect(path, isolation_level=None)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS fingerprints ("
+            "entity TEXT NOT NULL, id TEXT NOT NULL, hash TEXT NOT NULL, "
+            "fields TEXT NOT NULL, run INTEGER NOT NULL, PRIMARY KEY (entity, id))"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS runs (entity TEXT PRIMARY KEY, run INTEGER NOT NULL)"
+        )
+
+    def __enter__(self) -> "ChangeCapture":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self._db.execute(
+            "SELECT COUNT(*) FROM fingerprints WHERE entity = ?", (self.entity,)
+        ).fetchone()[0]
+
+    def _next_run(self) -> int:
+        row = self._db.execute(
+            "SELECT run FROM runs WHERE entity = ?", (self.entity,)
+        ).fetchone()
+        run = (row[0] if row else 0) + 1
+        self._db.execute(
+            "INSERT OR REPLACE INTO runs (entity, run) VALUES (?, ?)",
+            (self.entity, run),
+        )
+        return run
+
+    def _compare(self, record: dict, run: int) -> Optional[dict]:
+        record_id = record[self.id_key]
+        record_hash, fields = fingerprint(record)
+
+        row = self._db.execute(
+            "SELECT hash, fields FROM fingerprints WHERE entity = ? AND id = ?",
+            (self.entity, str(record_id)),
+        ).fetchone()
+
+        if row is not None and row[0] == record_hash:
+            self._db.execute(
+                "UPDATE fingerprints SET run = ? WHERE entity = ? AND id = ?",
+                (run, self.entity, str(record_id)),
+            )
+            return None
+
+        self._db.execute(
+            "INSERT OR REPLACE INTO fingerprints (entity, id, hash, fields, run) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (self.entity, str(record_id), record_hash, json.dumps(fields), run),
+        )
+
+        if row is None:
+            return {
+                "type": "created",
+                "id": record_id,
+                "record": record,
+                "changed": {},
+                "removed": [],
+            }
+
+        previous = json.loads(row[1])
+        flat = flatten_record(record)
+        return {
+            "type": "updated",
+            "id": record_id,
+            "record": record,
+            "changed": {
+                name: flat[name]
+                for name, field_hash in fields.items()
+                if previous.get(name) != field_hash
+            },
+            "removed": sorted(set(previous) - set(fields)),
+        }
+
+    def process(self, records: Iterable[dict]) -> Iterator[dict]:
+        """
+        Compare a full pull of records against the stored fingerprints,
+        yielding a change for every record that was created or updated, then
+        one for every record that wasn't in the pull.
+        If iterating records raises IncompletePullError (a page failed), the
+        changes already yielded are saved but no deletions are reported,
+        since records that weren't reached can't be told apart from deleted
+        ones. The error is then raised again.
+        """
+        self._db.execute("BEGIN")
+        try:
+            run = self._next_run()
+            seen = set()
+
+            for record in records:
+                record_id = str(record[self.id_key])
+                if record_id in seen:
+                    continue
+                seen.add(record_id)
+                change = self._compare(record, run)
+                if change is not None:
+                    yield change
+
+            deleted = self._db.execute(
+                "SELECT id FROM fingerprints WHERE entity = ? AND run < ?",
+                (self.entity, run),
+            ).fetchall()
+            for (record_id,) in deleted:
+                yield {
+                    "type": "deleted",
+                    "id": _stored_id(record_id),
+                    "record": None,
+                    "changed": {},
+                    "removed": [],
+                }
+            self._db.execute(
+                "DELETE FROM fingerprints WHERE entity = ? AND run < ?",
+                (self.entity, run),
+            )
+        except IncompletePullError:
+            self._db.execute("COMMIT")
+            raise
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        self._db.execute("COMMIT")
+
+    def capture(self, per_page: Optional[int] = None) -> Iterator[dict]:
+        """
+        Pull every record of the entity and yield the changes since the last
+        run (see process). Records are streamed, one in memory at a time.
+        """
+        if self.entity == "assets":
+            from ezoff.assets import iter_all_asset_records
+
+            records = iter_all_asset_records(per_page)
+        elif self.entity == "members":
+            from ezoff.members import iter_member_records
+
+            records = iter_member_records(None, per_page)
+        else:
+            from ezoff.locations import iter_location_pages
+
+            records = (r for page in iter_location_pages(None, per_page) for r in page)
+
+        yield from self.process(records)
+
+    def close(self) -> None:
+        self._db.close()
+
+
+def _stored_id(record_id: str):
+    """
+    Ids are stored as text, give numeric ones back as ints
+    """
+    return int(record_id) if record_id.isdigit() else record_id
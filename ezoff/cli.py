@@ -0,0 +1,447 @@
+"""
+ezoff command-line tool, for bulk jobs without writing code.
+
+    ezoff export assets -o assets.parquet
+    ezoff sync ezoffice.db --prune
+    ezoff import assets new_assets.csv --concurrency 16
+    ezoff checkout checkouts.csv --checkpoint checkouts.done
+
+Progress (records/sec and API calls made) is reported on stderr.
+Run ezoff <command> --help for the options of each command.
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Iterator, Optional
+
+from ezoff import ratelimit, scheduler, schemas, transport
+
+_FORMATS = {
+    ".parquet": "parquet",
+    ".arrow": "arrow",
+    ".ndjson": "ndjson",
+    ".jsonl": "ndjson",
+    ".csv": "csv",
+}
+
+
+class Progress:
+    """
+    Running count of records done, printed on one line of stderr with the
+    rate and the number of API calls made so far
+    """
+
+    def __init__(self, label: str, quiet: bool = False, interval: float = 0.5):
+        self.label = label
+        self.quiet = quiet
+        self.interval = interval
+        self.count = 0
+        self._started = time.monotonic()
+        self._calls_at_start = transport.api_calls()
+        self._printed_at = 0.0
+        self._width = 0
+        self._lock = threading.Lock()
+
+    def _line(self) -> str:
+        elapsed = max(time.monotonic() - self._started, 1e-6)
+        calls = transport.api_calls() - self._calls_at_start
+        return (
+            f"{self.label}: {self.count} records, {self.count / elapsed:.1f} records/sec, "
+            f"{calls} API calls, {elapsed:.1f}s"
+        )
+
+    def _print(self, end: str = "") -> None:
+        # Pad over whatever is left of a longer previous line
+        line = self._line()
+        sys.stderr.write("\r" + line.ljust(self._width) + end)
+        sys.stderr.flush()
+        self._width = len(line)
+
+    def add(self, records: int = 1) -> None:
+        with self._lock:
+            self.count += records
+            now = time.monotonic()
+            if not self.quiet and now - self._printed_at >= self.interval:
+                self._printed_at = now
+                self._print()
+
+    def finish(self) -> None:
+        if not self.quiet:
+            with self._lock:
+                self._print("\n")
+
+
+class Checkpoint:
+    """
+    File listing the rows of an input that have been done, one row number per
+    line, so a rerun after a crash or failure skips them. No file, no-op.
+    """
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self.done = set()
+        self._file = None
+        self._lock = threading.Lock()
+        if path is None:
+            return
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.done = {int(line) for line in f if line.strip()}
+        self._file = open(path, "a", encoding="utf-8")
+
+    def __contains__(self, row: int) -> bool:
+        return row in self.done
+
+    def add(self, row: int) -> None:
+        if self._file is None:
+            return
+        with self._lock:
+            self.done.add(row)
+            self._file.write(f"{row}\n")
+            self._file.flush()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+
+
+def _format_for(path: str, format: Optional[str]) -> str:
+    if format:
+        return format
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in _FORMATS:
+        raise ValueError(
+            f"can't tell the format of {path} from its extension, pass --format"
+        )
+    return _FORMATS[extension]
+
+
+def read_rows(path: str, format: Optional[str] = None) -> list[dict]:
+    """
+    Rows of a CSV or NDJSON input file. Empty CSV cells are left out.
+    """
+    format = _format_for(path, format)
+    if format == "csv":
+        with open(path, encoding="utf-8", newline="") as f:
+            return [
+                {k: v for k, v in row.items() if v not in ("", None)}
+                for row in csv.DictReader(f)
+            ]
+    if format == "ndjson":
+        with open(path, encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+    raise ValueError("input must be a CSV or NDJSON file")
+
+
+def _parse_per_page(value: str):
+    return value if value == "auto" else int(value)
+
+
+def _parse_filter(values: Optional[list[str]]) -> Optional[dict]:
+    if not values:
+        return None
+    filter = {}
+    for value in values:
+        if "=" not in value:
+            raise ValueError(f"filter '{value}' must look like key=value")
+        key, val = value.split("=", 1)
+        filter[key] = val
+    return filter
+
+
+def _counted(pages: Iterator, progress: Progress) -> Iterator:
+    for page in pages:
+        progress.add(len(page))
+        yield page
+
+
+def _export(args) -> int:
+    from ezoff import export
+    from ezoff.assets import iter_all_asset_pages, iter_filtered_asset_pages
+    from ezoff.locations import iter_location_pages
+    from ezoff.members import iter_member_pages
+    from ezoff.workorders import iter_work_order_pages
+
+    format = _format_for(args.output, args.format)
+    filter = _parse_filter(args.filter)
+
+    if args.entity == "assets":
+        if filter is not None:
+            pages = iter_filtered_asset_pages(filter, args.per_page)
+        else:
+            pages = iter_all_asset_pages(args.per_page)
+    elif args.entity == "members":
+        pages = iter_member_pages(filter, args.per_page)
+    elif args.entity == "locations":
+        pages = iter_location_pages(filter, args.per_page)
+    else:
+        if args.status is None:
+            raise ValueError("exporting work orders needs --status")
+        pages = (
+            list(page.values())
+            for page in iter_work_order_pages(args.status, args.per_page)
+        )
+
+    progress = Progress("export " + args.entity, args.quiet)
+    export.export_pages(_counted(pages, progress), args.output, format)
+    progress.finish()
+    return 0
+
+
+def _sync(args) -> int:
+    from ezoff.mirror import ENTITIES, Mirror
+
+    entities = args.entity or ENTITIES
+    progress = Progress("sync", args.quiet)
+    results = {}
+
+    with Mirror(args.database) as mirror:
+        with ThreadPoolExecutor(
+            max_workers=min(args.concurrency, len(entities))
+        ) as executor:
+            futures = {
+                executor.submit(
+                    scheduler.bind_priority(mirror.sync),
+                    entity,
+                    args.per_page,
+                    args.prune,
+                    progress.add,
+                ): entity
+                for entity in entities
+            }
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                    results[futures[future]] = (
+                        f"{result['stored']} stored, {result['pruned']} pruned"
+                    )
+                except Exception as e:
+                    results[futures[future]] = "failed: " + str(e)
+
+    progress.finish()
+    for entity in entities:
+        if not args.quiet or results[entity].startswith("failed"):
+            sys.stderr.write(f"{entity}: {results[entity]}\n")
+    return 1 if any(r.startswith("failed") for r in results.values()) else 0
+
+
+def _run_jobs(args, jobs: list[tuple], label: str) -> int:
+    """
+    Run (row, schema name, function, args, payload) jobs concurrently after
+    validating every payload. Rows in the checkpoint are skipped, rows done
+    are added to it.
+    """
+    errors = []
+    for row, schema_name, _, _, payload in jobs:
+        try:
+            schemas.validate_payload(schema_name, payload)
+        except ValueError as e:
+            errors.append((row, str(e)))
+    if errors:
+        for row, error in errors:
+            sys.stderr.write(f"row {row}: {error}\n")
+        sys.stderr.write(f"{len(errors)} invalid rows, nothing was sent\n")
+        return 2
+
+    checkpoint = Checkpoint(args.checkpoint)
+    todo = [job for job in jobs if job[0] not in checkpoint]
+    skipped = len(jobs) - len(todo)
+    progress = Progress(label, args.quiet)
+    failed = []
+
+    try:
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            futures = {
+                executor.submit(scheduler.bind_priority(function), *call_args): row
+                for row, _, function, call_args, _ in todo
+            }
+            for future in as_completed(futures):
+                row = futures[future]
+                try:
+                    future.result()
+                    checkpoint.add(row)
+                except Exception as e:
+                    failed.append((row, str(e)))
+                progress.add()
+    finally:
+        checkpoint.close()
+        progress.finish()
+
+    for row, error in sorted(failed):
+        sys.stderr.write(f"row {row} failed: {error}\n")
+    if skipped and not args.quiet:
+        sys.stderr.write(f"{skipped} rows skipped, already in checkpoint\n")
+    return 1 if failed else 0
+
+
+def _import(args) -> int:
+    from ezoff.assets import create_asset, update_asset
+    from ezoff.locations import create_location, update_location
+    from ezoff.members import create_member, update_member
+
+    writers = {
+        "assets": ("asset", create_asset, update_asset),
+        "members": ("member", create_member, update_member),
+        "locations": ("location", create_location, update_location),
+    }
+    noun, create, update = writers[args.entity]
+
+    jobs = []
+    for i, row in enumerate(read_rows(args.input, args.input_format), start=1):
+        payload = {k: v for k, v in row.items() if k != "id"}
+        if row.get("id") not in (None, ""):
+            jobs.append((i, "update_" + noun, update, (row["id"], payload), payload))
+        else:
+            jobs.append((i, "create_" + noun, create, (payload,), payload))
+
+    return _run_jobs(args, jobs, "import " + args.entity)
+
+
+def _checkin_checkout(args) -> int:
+    from ezoff.assets import checkin_asset, checkout_asset
+
+    jobs = []
+    for i, row in enumerate(read_rows(args.input, args.input_format), start=1):
+        if "asset_id" not in row:
+            sys.stderr.write(f"row {i}: missing 'asset_id'\n")
+            return 2
+        payload = {k: v for k, v in row.items() if k not in ("asset_id", "user_id")}
+        if args.command == "checkin":
+            call_args = (row["asset_id"], payload)
+            jobs.append((i, "checkin_asset", checkin_asset, call_args, payload))
+        else:
+            if "user_id" not in row:
+                sys.stderr.write(f"row {i}: missing 'user_id'\n")
+                return 2
+            call_args = (row["asset_id"], row["user_id"], payload)
+            jobs.append((i, "checkout_asset", checkout_asset, call_args, payload))
+
+    return _run_jobs(args, jobs, args.command)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument(
+        "--rate-limit",
+        type=float,
+        help="requests per second, shared with other ezoff processes on this host",
+    )
+    common.add_argument(
+        "--quiet", action="store_true", help="don't report progress on stderr"
+    )
+
+    # export walks one paginated stream, so only the other commands take this
+    concurrent = argparse.ArgumentParser(add_help=False)
+    concurrent.add_argument(
+        "--concurrency",
+        type=int,
+        default=8,
+        help="API calls in flight at once (default 8)",
+    )
+
+    paging = argparse.ArgumentParser(add_help=False)
+    paging.add_argument(
+        "--per-page",
+        type=_parse_per_page,
+        default="auto",
+        help="page size, or 'auto' to tune it (default auto)",
+    )
+
+    rows = argparse.ArgumentParser(add_help=False)
+    rows.add_argument("--input-format", choices=["csv", "ndjson"])
+    rows.add_argument(
+        "--checkpoint",
+        help="file recording the rows done, rows already in it are skipped",
+    )
+
+    parser = argparse.ArgumentParser(
+        prog="ezoff", description="Bulk jobs against the EZOffice API."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser(
+        "export", parents=[common, paging], help="stream records to a file"
+    )
+    export.add_argument(
+        "entity", choices=["assets", "members", "locations", "work_orders"]
+    )
+    export.add_argument("-o", "--output", required=True)
+    export.add_argument("--format", choices=sorted(set(_FORMATS.values())))
+    export.add_argument(
+        "--filter",
+        action="append",
+        metavar="KEY=VALUE",
+        help="filter as for the matching get_ function, repeatable",
+    )
+    export.add_argument(
+        "--status",
+        choices=["complete", "in_progress", "review_pending", "open"],
+        help="which work orders to export",
+    )
+    export.set_defaults(run=_export)
+
+    sync = commands.add_parser(
+        "sync",
+        parents=[common, concurrent, paging],
+        help="pull records into a SQLite mirror",
+    )
+    sync.add_argument("database", help="SQLite file, created if missing")
+    sync.add_argument(
+        "--entity",
+        action="append",
+        choices=["assets", "members", "locations", "work_orders"],
+        help="entity to sync, repeatable (default all)",
+    )
+    sync.add_argument(
+        "--prune",
+        action="store_true",
+        help="delete mirrored records that weren't in the pull",
+    )
+    sync.set_defaults(run=_sync)
+
+    import_ = commands.add_parser(
+        "import",
+        parents=[common, concurrent, rows],
+        help="create records, or update them when the row has an 'id'",
+    )
+    import_.add_argument("entity", choices=["assets", "members", "locations"])
+    import_.add_argument("input", help="CSV or NDJSON file, one payload per row")
+    import_.set_defaults(run=_import)
+
+    for name in ["checkin", "checkout"]:
+        command = commands.add_parser(
+            name,
+            parents=[common, concurrent, rows],
+            help=f"{name} assets, rows need 'asset_id'"
+            + (" and 'user_id'" if name == "checkout" else ""),
+        )
+        command.add_argument("input", help="CSV or NDJSON file, one asset per row")
+        command.set_defaults(run=_checkin_checkout)
+
+    return parser
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+
+    if args.rate_limit:
+        ratelimit.configure_rate_limit(args.rate_limit)
+
+    try:
+        return args.run(args)
+    except (ValueError, OSError) as e:
+        sys.stderr.write(f"ezoff: error: {e}\n")
+        return 2
+    except transport.IncompletePullError as e:
+        sys.stderr.write(f"ezoff: error: {e}\n")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
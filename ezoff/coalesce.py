@@ -0,0 +1,171 @@
+"""
+Opt-in write buffer that merges rapid updates to the same entity.
+Updates for one asset/location/member arriving within a short window are
+merged into a single request. Each update gets a future that resolves with
+the response of the request it ended up in.
+"""
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable
+
+from ezoff import schemas
+from ezoff.assets import update_asset
+from ezoff.locations import update_location
+from ezoff.members import update_member
+
+_WRITERS = {
+    "update_asset": update_asset,
+    "update_location": update_location,
+    "update_member": update_member,
+}
+
+
+class WriteBuffer:
+    """
+    Buffers update_asset / update_location / update_member calls for window
+    seconds after the first pending update of an entity, merging later
+    updates to the same entity into it (later values win). Then sends one
+    request per entity.
+
+        with WriteBuffer(window=0.5) as buffer:
+            buffer.update_asset(123, {"fixed_asset[name]": "New name"})
+            buffer.update_asset(123, {"cust_attr[Serial]": "X1"})
+        # one update_asset call with both fields
+
+    flush() sends everything pending right away, close() flushes and stops
+    the buffer. Leaving a with block closes it.
+    Requests for one entity go out one at a time: updates arriving while one
+    is in flight wait for it to finish, so an older request can't land after
+    a newer one and overwrite its values.
+    """
+
+    def __init__(self, window: float = 1.0, max_workers: int = 4):
+        self.window = window
+        self._pending = {}
+        # Entities with a request in flight
+        self._sending = set()
+        self._condition = threading.Condition()
+        self._in_flight = 0
+        self._closed = False
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def __enter__(self) -> "WriteBuffer":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _add(self, name: str, entity_id, payload: dict) -> Future:
+        # Fail on a bad payload now, not when the merged request goes out
+        payload = schemas.validate_payload(name, payload)
+        future = Future()
+
+        with self._condition:
+            if self._closed:
+                raise Exception("Error, WriteBuffer is closed")
+            entry = self._pending.get((name, entity_id))
+            if entry is None:
+                entry = self._pending[(name, entity_id)] = {
+                    "payload": {},
+                    "futures": [],
+                    "deadline": time.monotonic() + self.window,
+                }
+                self._condition.notify_all()
+            entry["payload"].update(payload)
+            entry["futures"].append(future)
+
+        return future
+
+    def update_asset(self, asset_id: int, asset: dict) -> Future:
+        """
+        Queue an update_asset call
+        """
+        return self._add("update_asset", asset_id, asset)
+
+    def update_location(self, location_num: int, location: dict) -> Future:
+        """
+        Queue an update_location call
+        """
+        return self._add("update_location", location_num, location)
+
+    def update_member(self, member_id: int, member: dict) -> Future:
+        """
+        Queue an update_member call
+        """
+        return self._add("update_member", member_id, member)
+
+    def _send(self, name: str, entity_id, entry: dict) -> None:
+        writer: Callable = _WRITERS[name]
+        try:
+            response = writer(entity_id, entry["payload"])
+        except Exception as e:
+            for future in entry["futures"]:
+                future.set_exception(e)
+        else:
+            for future in entry["futures"]:
+                future.set_result(response)
+        finally:
+            with self._condition:
+                self._in_flight -= 1
+                self._sending.discard((name, entity_id))
+                self._condition.notify_all()
+
+    def _dispatch(self, keys: list) -> None:
+        """
+        Hand pending entries to the executor, except for entities that
+        already have a request in flight. Caller holds the condition.
+        """
+        for key in keys:
+            if key in self._sending:
+                continue
+            entry = self._pending.pop(key)
+            self._sending.add(key)
+            self._in_flight += 1
+            self._executor.submit(self._send, key[0], key[1], entry)
+
+    def _run(self) -> None:
+        with self._condition:
+            while not self._closed:
+                now = time.monotonic()
+                # Entries held back for an in-flight request are woken by
+                # _send finishing it
+                waiting = {
+                    k: e for k, e in self._pending.items() if k not in self._sending
+                }
+                due = [k for k, e in waiting.items() if e["deadline"] <= now]
+                if due:
+                    self._dispatch(due)
+                    continue
+                if waiting:
+                    next_deadline = min(e["deadline"] for e in waiting.values())
+                    self._condition.wait(next_deadline - now)
+                else:
+                    self._condition.wait()
+
+    def flush(self) -> None:
+        """
+        Send everything pending now and wait until all of it has completed
+        """
+        with self._condition:
+            while True:
+                self._dispatch(list(self._pending))
+                if not self._pending and not self._in_flight:
+                    return
+                self._condition.wait()
+
+    def close(self) -> None:
+        """
+        Flush, then stop accepting updates
+        """
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
+        self.flush()
+        self._executor.shutdown()
@@ -0,0 +1,195 @@
+"""
+Convert EZOffice records to pandas DataFrames.
+Columns are built in bulk rather than row by row, custom fields are spread
+out into one typed column each and repeated strings (statuses, group and
+location names etc.) are stored as categoricals. Requires pandas
+(pip install ezoff[dataframe]).
+"""
+
+from typing import Iterable, Optional, Union
+
+# Columns stored as categoricals by default, when present
+ASSET_CATEGORICALS = [
+    "state",
+    "status",
+    "group_name",
+    "sub_group_name",
+    "location_name",
+]
+MEMBER_CATEGORICALS = ["status", "role_name", "team_name", "department"]
+LOCATION_CATEGORICALS = ["status", "city", "state", "country"]
+HISTORY_CATEGORICALS = ["action", "location_name", "assigned_to_name", "created_by"]
+WORK_ORDER_CATEGORICALS = [
+    "state",
+    "status",
+    "priority",
+    "task_type",
+    "assigned_to_name",
+    "location_name",
+]
+
+
+def _import_pandas():
+    try:
+        import pandas
+    except ImportError:
+        raise ImportError(
+            "pandas is required for DataFrame conversion, install with 'pip install ezoff[dataframe]'"
+        )
+    return pandas
+
+
+def _custom_field_columns(values: list, length: int) -> dict:
+    """
+    Spread a column of custom_fields values (list of {name, value} dicts,
+    or a dict of name -> value) into a dict of full length columns
+    """
+    columns = {}
+
+    for i, fields in enumerate(values):
+        if isinstance(fields, list):
+            for field in fields:
+                if isinstance(field, dict) and "name" in field:
+                    column = columns.get(field["name"])
+                    if column is None:
+                        column = columns[field["name"]] = [None] * length
+                    column[i] = field.get("value")
+        elif isinstance(fields, dict):
+            for name, value in fields.items():
+                column = columns.get(name)
+                if column is None:
+                    column = columns[name] = [None] * length
+                column[i] = value
+
+    return columns
+
+
+def _type_column(pd, column):
+    """
+    Give an object column of custom field values a proper dtype when every
+    value fits: numbers, then booleans. Anything else is left alone.
+    """
+    present = column.notna()
+    count = present.sum()
+    if count == 0:
+        return column
+
+    # Identifiers like '00123' have to stay strings
+    text = column[present].astype(str)
+    if not text.str.match(r"0\d").any():
+        numeric = pd.to_numeric(column, errors="coerce")
+        if numeric.notna().sum() == count:
+            return numeric
+
+    lowered = text.str.lower()
+    if lowered.isin(["true", "false"]).all():
+        flags = column.where(~present, lowered).map({"true": True, "false": False})
+        return flags.astype("boolean")
+
+    return column
+
+
+def to_dataframe(
+    records: Union[Iterable[dict], dict],
+    categorical: Optional[list[str]] = None,
+    max_category_ratio: float = 0.5,
+):
+    """
+    Build a DataFrame from a list of records (or a dict of records keyed by id,
+    as get_work_orders returns).
+    Nested dicts become 'parent.child' columns and custom fields become one
+    'custom_fields.{name}' column each, converted to numeric/boolean dtypes
+    when every value allows it.
+    Columns named in categorical, plus any other string column where unique
+    values make up at most max_category_ratio of the rows, become categoricals.
+    Pass max_category_ratio=0 to only convert the named columns.
+    """
+    pd = _import_pandas()
+
+    if isinstance(records, dict):
+        records = list(records.values())
+    elif not isinstance(records, list):
+        records = list(records)
+
+    frame = pd.DataFrame.from_records(records)
+    length = len(frame)
+    parts = []
+
+    if "custom_fields" in frame.columns:
+        custom = _custom_field_columns(frame.pop("custom_fields").tolist(), length)
+        if custom:
+            custom_frame = pd.DataFrame(custom, index=frame.index, dtype=object)
+            custom_frame = custom_frame.apply(lambda c: _type_column(pd, c))
+            parts.append(custom_frame.add_prefix("custom_fields."))
+
+    for name in list(frame.columns):
+        column = frame[name]
+        if column.dtype != object:
+            continue
+        sample = column.dropna()
+        if sample.empty or not isinstance(sample.iloc[0], dict):
+            continue
+        nested = pd.json_normalize(
+            [value if isinstance(value, dict) else {} for value in column.tolist()]
+        )
+        nested.index = frame.index
+        parts.append(nested.add_prefix(name + "."))
+        frame = frame.drop(columns=name)
+
+    if parts:
+        frame = pd.concat([frame] + parts, axis=1)
+
+    named = set(categorical or [])
+    for name in frame.columns:
+        column = frame[name]
+        if column.dtype != object and not pd.api.types.is_string_dtype(column):
+            continue
+        if name in named:
+            frame[name] = column.astype("category")
+            continue
+        if max_category_ratio <= 0 or length == 0:
+            continue
+        present = column.dropna()
+        if present.empty or not present.map(type).eq(str).all():
+            continue
+        if present.nunique() <= max_category_ratio * length:
+            frame[name] = column.astype("category")
+
+    return frame
+
+
+def assets_to_dataframe(assets: list[dict], max_category_ratio: float = 0.5):
+    """
+    DataFrame from get_all_assets / get_filtered_assets output
+    """
+    return to_dataframe(assets, ASSET_CATEGORICALS, max_category_ratio)
+
+
+def members_to_dataframe(members: list[dict], max_category_ratio: float = 0.5):
+    """
+    DataFrame from get_members output
+    """
+    return to_dataframe(members, MEMBER_CATEGORICALS, max_category_ratio)
+
+
+def locations_to_dataframe(locations: list[dict], max_category_ratio: float = 0.5):
+    """
+    DataFrame from get_locations output
+    """
+    return to_dataframe(locations, LOCATION_CATEGORICALS, max_category_ratio)
+
+
+def history_to_dataframe(history: list[dict], max_category_ratio: float = 0.5):
+    """
+    DataFrame from get_asset_history output
+    """
+    return to_dataframe(history, HISTORY_CATEGORICALS, max_category_ratio)
+
+
+def work_orders_to_dataframe(
+    work_orders: Union[dict, list[dict]], max_category_ratio: float = 0.5
+):
+    """
+    DataFrame from get_work_orders output (a dict keyed by work order number)
+    """
+    return to_dataframe(work_orders, WORK_ORDER_CATEGORICALS, max_category_ratio)
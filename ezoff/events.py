@@ -0,0 +1,73 @@
+"""
+Hooks for reacting to changes made through ezoff.
+Write functions emit an event after the API accepts a change, local
+indexes subscribe to keep themselves up to date without re-pulling data.
+
+Events emitted:
+- asset_created (asset, response)
+- asset_updated (asset_id, asset, response)
+- asset_deleted (asset_id, response)
+- asset_checked_in (asset_id, checkin, response)
+- asset_checked_out (asset_id, user_id, checkout, response)
+- record_changed (entity, action, record_id, record), from webhook notifications
+"""
+
+import threading
+import weakref
+from typing import Callable
+
+_subscribers = {}
+_lock = threading.Lock()
+
+
+def _ref(callback: Callable) -> Callable:
+    """
+    Bound methods are held weakly, so an index that is no longer used can be
+    garbage collected without unsubscribing. Calling the result gives back the
+    callback, or None once its object is gone.
+    """
+    if hasattr(callback, "__self__") and hasattr(callback, "__func__"):
+        return weakref.WeakMethod(callback)
+    return lambda: callback
+
+
+def subscribe(event: str, callback: Callable) -> None:
+    """
+    Call callback with the event's keyword arguments every time it's emitted.
+    A bound method stops being called once its object is garbage collected.
+    """
+    with _lock:
+        _subscribers.setdefault(event, []).append(_ref(callback))
+
+
+def unsubscribe(event: str, callback: Callable) -> None:
+    """
+    Stop calling callback for event
+    """
+    with _lock:
+        refs = _subscribers.get(event, [])
+        for ref in refs:
+            if ref() == callback:
+                refs.remove(ref)
+                return
+
+
+def emit(event: str, **kwargs) -> None:
+    """
+    Call every subscriber of event. A failing subscriber doesn't stop the
+    others, or the API call that triggered the event.
+    """
+    with _lock:
+        refs = _subscribers.get(event, [])
+        callbacks = [ref() for ref in refs]
+        # Drop subscribers whose object has been garbage collected
+        refs[:] = [
+            ref for ref, callback in zip(refs, callbacks) if callback is not None
+        ]
+        callbacks = [callback for callback in callbacks if callback is not None]
+
+    for callback in callbacks:
+        try:
+            callback(**kwargs)
+        except Exception as e:
+            print(f"Error in {event} subscriber {callback}: ", e)
@@ -0,0 +1,296 @@
+"""
+Export EZOffice records to files (Parquet, Arrow IPC, NDJSON or CSV).
+Records are streamed page by page, through a temporary file so the columns
+cover every page, and memory use stays flat no matter how big the tenant is.
+Parquet and Arrow require pyarrow (pip install ezoff[export]).
+"""
+
+import csv
+import json
+import tempfile
+from typing import Iterable, Literal, Optional, Union
+
+from ezoff.assets import iter_all_asset_pages, iter_filtered_asset_pages
+from ezoff.locations import iter_location_pages
+from ezoff.members import iter_member_pages
+from ezoff.workorders import iter_work_order_pages
+
+
+def flatten_record(record: dict, prefix: str = "") -> dict:
+    """
+    Flatten a record into a single level dict.
+    Nested dicts become 'parent.child' keys, the custom_fields list becomes
+    one 'custom_fields.{name}' key per field, other lists are kept as JSON strings.
+    """
+    flat = {}
+
+    for key, value in record.items():
+        name = prefix + key
+
+        if key == "custom_fields" and isinstance(value, list):
+            for field in value:
+                if isinstance(field, dict) and "name" in field:
+                    flat[name + "." + field["name"]] = field.get("value")
+        elif key == "custom_fields" and isinstance(value, dict):
+            for field_name, field_value in value.items():
+                flat[name + "." + field_name] = field_value
+        elif isinstance(value, dict):
+            flat.update(flatten_record(value, name + "."))
+        elif isinstance(value, list):
+            flat[name] = json.dumps(value)
+        else:
+            flat[name] = value
+
+    return flat
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError(
+            "pyarrow is required for exporting, install with 'pip install ezoff[export]'"
+        )
+    return pyarrow
+
+
+def _column_type(pa, values: list):
+    """
+    Arrow type of a column's values, string if they don't share one
+    """
+    try:
+        return pa.array(values).type
+    except (pa.ArrowInvalid, pa.ArrowTypeError, OverflowError):
+        return pa.string()
+
+
+def _widen(pa, current, new):
+    """
+    Type that holds values of both types: ints and floats become floats,
+    anything else that differs becomes string
+    """
+    if current is None or current == new or pa.types.is_null(new):
+        return current if current is not None else new
+    if pa.types.is_null(current):
+        return new
+    numeric = [pa.types.is_integer, pa.types.is_floating]
+    if any(f(current) for f in numeric) and any(f(new) for f in numeric):
+        return pa.float64()
+    return pa.string()
+
+
+def _spool(pages: Iterable[list[dict]], spool, pa=None) -> dict:
+    """
+    Flatten every record into spool, one JSON object per line, and return
+    every column seen (in order of first appearance), mapped to the arrow
+    type covering all its values when pa is given
+    """
+    columns = {}
+    for page in pages:
+        rows = [flatten_record(record) for record in page]
+        for row in rows:
+            spool.write(json.dumps(row) + "\n")
+        names = dict.fromkeys(name for row in rows for name in row)
+        for name in names:
+            if pa is None:
+                columns[name] = None
+                continue
+            values = [row[name] for row in rows if name in row]
+            columns[name] = _widen(pa, columns.get(name), _column_type(pa, values))
+    return columns
+
+
+def _to_table(pa, rows: list[dict], schema):
+    """
+    Build a table for a batch on the schema of the file. Values of string
+    columns that aren't strings are written as text. Raises ValueError if a
+    value doesn't fit its column's type, rather than losing it.
+    """
+    columns = []
+    for field in schema:
+        values = [row.get(field.name) for row in rows]
+        if pa.types.is_string(field.type):
+            values = [
+                value if value is None or isinstance(value, str) else str(value)
+                for value in values
+            ]
+        try:
+            columns.append(pa.array(values, type=field.type))
+        except (pa.ArrowInvalid, pa.ArrowTypeError, OverflowError) as e:
+            raise ValueError(
+                f"values of column '{field.name}' don't fit its type {field.type}: {e}"
+            )
+
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+def _write_arrow(
+    pa, rows: Iterable[dict], path: str, format: str, batch_size: int, schema
+) -> int:
+    """
+    Write flattened rows to a Parquet or Arrow IPC file, one row group per
+    batch of batch_size rows
+    """
+    if format == "parquet":
+        writer = pa.parquet.ParquetWriter(path, schema)
+    else:
+        writer = pa.ipc.new_file(path, schema)
+
+    batch = []
+    total = 0
+    try:
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                writer.write_table(_to_table(pa, batch, schema))
+                total += len(batch)
+                batch = []
+        if batch or total == 0:
+            writer.write_table(_to_table(pa, batch, schema))
+            total += len(batch)
+    finally:
+        writer.close()
+
+    return total
+
+
+def _export_ndjson(pages: Iterable[list[dict]], path: str) -> int:
+    """
+    Write records as they came from the API, one JSON object per line
+    """
+    total = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for page in pages:
+            for record in page:
+                f.write(json.dumps(record) + "\n")
+            total += len(page)
+    return total
+
+
+def _export_csv(pages: Iterable[list[dict]], path: str) -> int:
+    """
+    Write flattened records as CSV. Records are spooled to a temporary file
+    first so the header has every column of every page.
+    """
+    total = 0
+    with tempfile.TemporaryFile("w+", encoding="utf-8") as spool:
+        columns = _spool(pages, spool)
+        spool.seek(0)
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, list(columns))
+            writer.writeheader()
+            for line in spool:
+                writer.writerow(json.loads(line))
+                total += 1
+
+    return total
+
+
+def export_pages(
+    pages: Iterable[list[dict]],
+    path: str,
+    format: Literal["parquet", "arrow", "ndjson", "csv"] = "parquet",
+    batch_size: int = 10000,
+    schema=None,
+) -> int:
+    """
+    Write pages of records to a Parquet, Arrow IPC, NDJSON or CSV file.
+    Parquet and Arrow files get one row group per batch of batch_size records.
+    Unless a pyarrow schema is given, records are flattened into a temporary
+    file first so the columns and their types cover every page: a column
+    whose values don't share a type (5 on one page, "N/A" on another) is
+    written as strings. With a schema, only its columns are written and a
+    value that doesn't fit raises ValueError. NDJSON keeps records as they
+    are, CSV flattens them like Parquet does.
+    Only one batch is held in memory at a time.
+    Returns the number of rows written.
+    """
+    if format not in ["parquet", "arrow", "ndjson", "csv"]:
+        raise ValueError("format must be one of 'parquet', 'arrow', 'ndjson', 'csv'")
+
+    if format == "ndjson":
+        return _export_ndjson(pages, path)
+    if format == "csv":
+        return _export_csv(pages, path)
+
+    pa = _import_pyarrow()
+
+    if schema is not None:
+        rows = (flatten_record(record) for page in pages for record in page)
+        return _write_arrow(pa, rows, path, format, batch_size, schema)
+
+    with tempfile.TemporaryFile("w+", encoding="utf-8") as spool:
+        columns = _spool(pages, spool, pa)
+        schema = pa.schema(
+            [
+                pa.field(name, pa.string() if pa.types.is_null(type) else type)
+                for name, type in columns.items()
+            ]
+        )
+        spool.seek(0)
+        rows = (json.loads(line) for line in spool)
+        return _write_arrow(pa, rows, path, format, batch_size, schema)
+
+
+def export_assets(
+    path: str,
+    format: Literal["parquet", "arrow", "ndjson", "csv"] = "parquet",
+    filter: Optional[dict] = None,
+    batch_size: int = 10000,
+    per_page: Union[int, Literal["auto"], None] = None,
+) -> int:
+    """
+    Export assets to a Parquet, Arrow, NDJSON or CSV file.
+    Exports every asset, or those matching filter (see get_filtered_assets).
+    """
+    if filter is not None:
+        pages = iter_filtered_asset_pages(filter, per_page)
+    else:
+        pages = iter_all_asset_pages(per_page)
+
+    return export_pages(pages, path, format, batch_size)
+
+
+def export_members(
+    path: str,
+    format: Literal["parquet", "arrow", "ndjson", "csv"] = "parquet",
+    filter: Optional[dict] = None,
+    batch_size: int = 10000,
+    per_page: Union[int, Literal["auto"], None] = None,
+) -> int:
+    """
+    Export members to a Parquet, Arrow, NDJSON or CSV file. filter is as for get_members.
+    """
+    pages = iter_member_pages(filter, per_page)
+    return export_pages(pages, path, format, batch_size)
+
+
+def export_locations(
+    path: str,
+    format: Literal["parquet", "arrow", "ndjson", "csv"] = "parquet",
+    filter: Optional[dict] = None,
+    batch_size: int = 10000,
+    per_page: Union[int, Literal["auto"], None] = None,
+) -> int:
+    """
+    Export locations to a Parquet, Arrow, NDJSON or CSV file. filter is as for get_locations.
+    """
+    pages = iter_location_pages(filter, per_page)
+    return export_pages(pages, path, format, batch_size)
+
+
+def export_work_orders(
+    path: str,
+    filter: Literal["complete", "in_progress", "review_pending", "open"],
+    format: Literal["parquet", "arrow", "ndjson", "csv"] = "parquet",
+    batch_size: int = 10000,
+    per_page: Union[int, Literal["auto"], None] = None,
+) -> int:
+    """
+    Export work orders with the given status to a Parquet, Arrow, NDJSON or
+    CSV file.
+    """
+    pages = (list(page.values()) for page in iter_work_order_pages(filter, per_page))
+    return export_pages(pages, path, format, batch_size)
@@ -3,7 +3,22 @@ Module for interacting with the EZOffice Inventory API
 """
 
 from .assets import *
+from .bulk import *
+from .cdc import *
+from .coalesce import *
+from .dataframe import *
+from .export import *
 from .groups import *
+from .holders import *
+from .location_tree import *
 from .locations import *
 from .members import *
+from .mirror import *
+from .reconcile import *
+from .schemas import *
+from .search_index import *
+from .shared_store import *
+from .snapshots import *
+from .transform import *
+from .webhooks import *
 from .workorders import *
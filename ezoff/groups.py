@@ -5,8 +5,7 @@ Covers everything related to groups and subgroups in EZOfficeInventory
 import os
 from typing import Optional
 
-import requests
-
+from ezoff import transport
 from ezoff.auth import Decorators
 
 
@@ -24,51 +23,15 @@ def get_subgroups(group_id: Optional[int]) -> list[dict]:
     if group_id:
         params["group_id"] = group_id
 
-    page = 1
-
     all_subgroups = []
 
-    while True:
-        try:
-            response = requests.get(
-                url,
-                headers={"Authorization": "Bearer " + os.environ["EZO_TOKEN"]},
-                params=params,
-                timeout=10,
-            )
-        except Exception as e:
-            print("Error, could not get subgroups from EZOfficeInventory: ", e)
-            raise Exception(
-                "Error, could not get subgroups from EZOfficeInventory: " + str(e)
-            )
-
-        if response.status_code != 200:
-            print(
-                f"Error {response.status_code}, could not get subgroups from EZOfficeInventory: ",
-                response.content,
-            )
-            break
-
-        data = response.json()
-
-        if "sub_groups" not in data:
-            print(
-                f"Error, could not get subgroups from EZOfficeInventory: ",
-                response.content,
-            )
-            raise Exception(
-                f"Error, could not get subgroups from EZOfficeInventory: "
-                + str(response.content)
-            )
-
-        all_subgroups.extend(data["sub_groups"])
-
-        if "total_pages" not in data:
-            break
-
-        if page >= data["total_pages"]:
-            break
-
-        page += 1
+    for page in transport.iter_pages(
+        url,
+        "sub_groups",
+        "subgroups",
+        params=params,
+        headers={"Authorization": "Bearer " + os.environ["EZO_TOKEN"]},
+    ):
+        all_subgroups.extend(page)
 
     return all_subgroups
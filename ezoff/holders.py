@@ -0,0 +1,238 @@
+"""
+Local index of who holds which asset.
+Built from one full asset pull, then kept up to date from the check-ins,
+check-outs, creates, updates and deletes made through ezoff (and record_changed
+webhook notifications). Answers "what does member X have" and "who has
+asset Y" without an API call.
+"""
+
+import threading
+from typing import Optional
+
+from ezoff import events
+from ezoff.assets import apply_asset_payload, get_all_assets
+
+
+def _normalize_id(value):
+    """
+    Ids come back from the API as ints but are often passed around as
+    strings (CSV files, URLs). Use ints where possible so both match.
+    """
+    if isinstance(value, str) and value.strip().isdigit():
+        return int(value)
+    return value
+
+
+def _checkout_applied(response) -> bool:
+    """
+    checkout_asset answers 200 with just a message when it didn't check the
+    asset out (e.g. the member is inactive)
+    """
+    if not isinstance(response, dict):
+        return True
+    asset = response.get("asset")
+    if isinstance(asset, dict) and "state" in asset:
+        return asset["state"] == "checked_out"
+    return "message" not in response
+
+
+class HolderIndex:
+    """
+    Maps each asset to its current holder and location, and each member to
+    the assets they have checked out.
+
+        index = HolderIndex.from_api()
+        index.assets_held_by(42)   # asset ids member 42 has checked out
+        index.holder(1234)         # member id holding asset 1234, or None
+    """
+
+    def __init__(
+        self,
+        assets: Optional[list[dict]] = None,
+        id_key: str = "sequence_num",
+        holder_key: str = "assigned_to_id",
+        location_key: str = "location_id",
+    ):
+        self.id_key = id_key
+        self.holder_key = holder_key
+        self.location_key = location_key
+        self._holders = {}
+        self._locations = {}
+        self._held = {}
+        self._subscribed = False
+        # Check-ins and check-outs come in from the threads making API calls
+        self._lock = threading.RLock()
+
+        for asset in assets or []:
+            self.add(asset)
+
+    @classmethod
+    def from_api(cls, **kwargs) -> "HolderIndex":
+        """
+        Build the index from get_all_assets and start following changes
+        """
+        index = cls(get_all_assets(), **kwargs)
+        index.subscribe()
+        return index
+
+    def __len__(self) -> int:
+        return len(self._locations)
+
+    def _set_holder(self, asset_id, member_id) -> None:
+        previous = self._holders.pop(asset_id, None)
+        if previous is not None:
+            held = self._held.get(previous)
+            if held is not None:
+                held.discard(asset_id)
+                if not held:
+                    del self._held[previous]
+        if member_id is not None:
+            self._holders[asset_id] = member_id
+            self._held.setdefault(member_id, set()).add(asset_id)
+
+    def add(self, asset: dict) -> None:
+        """
+        Index an asset record, replacing what was known about it
+        """
+        asset_id = _normalize_id(asset[self.id_key])
+        holder = asset.get(self.holder_key)
+        if asset.get("state") not in (None, "checked_out"):
+            holder = None
+        with self._lock:
+            self._set_holder(asset_id, _normalize_id(holder))
+            self._locations[asset_id] = _normalize_id(asset.get(self.location_key))
+
+    def remove(self, asset_id) -> None:
+        asset_id = _normalize_id(asset_id)
+        with self._lock:
+            self._set_holder(asset_id, None)
+            self._locations.pop(asset_id, None)
+
+    def check_out(self, asset_id, member_id, location_id=None) -> None:
+        """
+        Record asset_id as held by member_id, optionally at location_id
+        """
+        asset_id = _normalize_id(asset_id)
+        with self._lock:
+            self._set_holder(asset_id, _normalize_id(member_id))
+            if location_id is not None:
+                self._locations[asset_id] = _normalize_id(location_id)
+            else:
+                self._locations.setdefault(asset_id, None)
+
+    def check_in(self, asset_id, location_id=None) -> None:
+        """
+        Record asset_id as no longer held, optionally now at location_id
+        """
+        asset_id = _normalize_id(asset_id)
+        with self._lock:
+            self._set_holder(asset_id, None)
+            if location_id is not None:
+                self._locations[asset_id] = _normalize_id(location_id)
+            else:
+                self._locations.setdefault(asset_id, None)
+
+    def holder(self, asset_id) -> Optional[int]:
+        """
+        Member id holding the asset, None if it isn't checked out
+        """
+        with self._lock:
+            return self._holders.get(_normalize_id(asset_id))
+
+    def location(self, asset_id) -> Optional[int]:
+        with self._lock:
+            return self._locations.get(_normalize_id(asset_id))
+
+    def assets_held_by(self, member_id) -> set:
+        """
+        Ids of the assets member_id has checked out
+        """
+        with self._lock:
+            return set(self._held.get(_normalize_id(member_id), ()))
+
+    def holders(self) -> dict:
+        """
+        Member id -> ids of the assets they hold, for every member holding any
+        """
+        with self._lock:
+            return {member: set(assets) for member, assets in self._held.items()}
+
+    def _on_checked_in(self, asset_id, checkin: dict, response) -> None:
+        self.check_in(asset_id, checkin.get("checkin_values[location_id]"))
+
+    def _on_checked_out(self, asset_id, user_id, checkout: dict, response) -> None:
+        if _checkout_applied(response):
+            self.check_out(
+                asset_id, user_id, checkout.get("checkout_values[location_id]")
+            )
+
+    def _on_created(self, asset: dict, response) -> None:
+        if isinstance(response, dict) and isinstance(response.get("asset"), dict):
+            response = response["asset"]
+        if isinstance(response, dict) and self.id_key in response:
+            self.add(response)
+
+    def _merge(self, asset_id, changes: dict, add_unknown: bool = False) -> None:
+        """
+        Apply the fields present in changes to an indexed asset. Only those
+        are known to have changed, a partial record mustn't clear the holder
+        or location. An asset not in the index is added if add_unknown.
+        """
+        asset_id = _normalize_id(asset_id)
+        with self._lock:
+            if asset_id not in self._locations:
+                if add_unknown:
+                    self.add(dict(changes, **{self.id_key: asset_id}))
+                return
+            if self.holder_key in changes or "state" in changes:
+                holder = changes.get(self.holder_key, self._holders.get(asset_id))
+                if changes.get("state") not in (None, "checked_out"):
+                    holder = None
+                self._set_holder(asset_id, _normalize_id(holder))
+            if self.location_key in changes:
+                self._locations[asset_id] = _normalize_id(changes[self.location_key])
+
+    def _on_updated(self, asset_id, asset: dict, response) -> None:
+        if isinstance(response, dict) and isinstance(response.get("asset"), dict):
+            response = response["asset"]
+        record = response if isinstance(response, dict) else {}
+        self._merge(asset_id, apply_asset_payload(record, asset))
+
+    def _on_deleted(self, asset_id, response) -> None:
+        self.remove(asset_id)
+
+    def _on_record_changed(self, entity: str, action: str, record_id, record) -> None:
+        if entity != "assets":
+            return
+        if action == "deleted":
+            self.remove(record_id)
+        else:
+            # Notifications may carry only the fields that changed
+            self._merge(record_id, record or {}, add_unknown=True)
+
+    def subscribe(self) -> None:
+        """
+        Keep the index up to date with check-ins, check-outs, creates,
+        updates and deletes made through ezoff, and webhook notifications
+        """
+        if self._subscribed:
+            return
+        events.subscribe("asset_checked_in", self._on_checked_in)
+        events.subscribe("asset_checked_out", self._on_checked_out)
+        events.subscribe("asset_created", self._on_created)
+        events.subscribe("asset_updated", self._on_updated)
+        events.subscribe("asset_deleted", self._on_deleted)
+        events.subscribe("record_changed", self._on_record_changed)
+        self._subscribed = True
+
+    def unsubscribe(self) -> None:
+        """
+        Stop following changes
+        """
+        events.unsubscribe("asset_checked_in", self._on_checked_in)
+        events.unsubscribe("asset_checked_out", self._on_checked_out)
+        events.unsubscribe("asset_created", self._on_created)
+        events.unsubscribe("asset_updated", self._on_updated)
+        events.unsubscribe("asset_deleted", self._on_deleted)
+        events.unsubscribe("record_changed", self._on_record_changed)
+        self._subscribed = False
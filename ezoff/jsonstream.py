@@ -0,0 +1,158 @@
+"""
+Incremental parsing of paginated API responses.
+A page is a JSON object with the records under one key, next to a few small
+values like total_pages. Instead of loading the whole body, the records are
+decoded and yielded one at a time as the body comes in, so memory is bounded
+by the largest record rather than the page.
+"""
+
+import codecs
+import json
+from typing import Iterable, Iterator
+
+_WHITESPACE = " \t\n\r"
+_NUMBER = "0123456789+-.eE"
+_decoder = json.JSONDecoder()
+
+
+class _Reader:
+    """
+    Text buffer over an iterable of byte chunks. Consumed text is dropped as
+    parsing moves on.
+    """
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def more(self) -> bool:
+        """
+        Read another chunk into the buffer. False once the body has ended.
+        """
+        if self.eof:
+            return False
+        self.buf = self.buf[self.pos :]
+        self.pos = 0
+        for chunk in self._chunks:
+            text = self._decoder.decode(chunk)
+            if text:
+                self.buf += text
+                return True
+        self.buf += self._decoder.decode(b"", final=True)
+        self.eof = True
+        return False
+
+    def peek(self) -> str:
+        """
+        Next non-whitespace character, or '' at the end of the body
+        """
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.more():
+                return ""
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise ValueError(
+                f"invalid JSON, expected '{char}' at '{self.buf[self.pos : self.pos + 20]}'"
+            )
+        self.pos += 1
+
+    def value(self):
+        """
+        Decode the next JSON value, reading more of the body until it's complete
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError as e:
+                if not self.more():
+                    raise ValueError("invalid JSON: " + str(e))
+                continue
+            # A number cut off by the end of the buffer may continue in the
+            # next chunk ('12' of '12.5')
+            if (end == len(self.buf) or self.buf[end] in _NUMBER) and self.more():
+                continue
+            self.pos = end
+            return value
+
+
+def _members(reader: _Reader, close: str) -> Iterator:
+    """
+    Walk the items of an array (close ']') or the key, value pairs of an
+    object (close '}') whose opening bracket has been consumed
+    """
+    first = True
+    while True:
+        char = reader.peek()
+        if char == close:
+            reader.pos += 1
+            return
+        if not first:
+            reader.expect(",")
+        first = False
+        if close == "]":
+            yield reader.value()
+        else:
+            key = reader.value()
+            reader.expect(":")
+            yield key, reader.value()
+
+
+def iter_json_items(chunks: Iterable[bytes], key: str, meta: dict) -> Iterator:
+    """
+    Yield the items of the array under key in a JSON object arriving as byte
+    chunks, one at a time. If key holds an object, its (key, value) pairs are
+    yielded instead. The object's other top-level values are put in meta
+    as they're reached, so all of them are there once the iterator is done.
+    Raises KeyError if key isn't in the object, ValueError if the body isn't
+    valid JSON.
+    """
+    reader = _Reader(chunks)
+    reader.expect("{")
+    found = False
+
+    for name, _ in _top_level(reader, key, meta):
+        found = True
+        char = reader.peek()
+        if char == "[" or char == "{":
+            reader.pos += 1
+            yield from _members(reader, "]" if char == "[" else "}")
+        else:
+            meta[name] = reader.value()
+
+    if reader.peek() != "":
+        raise ValueError("invalid JSON, unexpected data after the object")
+    if not found:
+        raise KeyError(key)
+
+
+def _top_level(reader: _Reader, key: str, meta: dict) -> Iterator[tuple]:
+    """
+    Walk the top-level object, storing values in meta and stopping at key
+    (with the reader positioned at its value) for the caller to consume
+    """
+    first = True
+    while True:
+        char = reader.peek()
+        if char == "}":
+            reader.pos += 1
+            return
+        if not first:
+            reader.expect(",")
+        first = False
+        name = reader.value()
+        if not isinstance(name, str):
+            raise ValueError("invalid JSON, object keys must be strings")
+        reader.expect(":")
+        if name == key:
+            yield name, None
+        else:
+            meta[name] = reader.value()
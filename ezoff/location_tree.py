@@ -0,0 +1,174 @@
+"""
+Tree view over EZOfficeInventory locations, built from get_locations.
+Answers parent/children/ancestor/subtree questions locally and can roll item
+quantities up the tree (e.g. totals per region).
+"""
+
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Optional
+
+from ezoff import scheduler
+from ezoff.locations import get_location_item_quantities, get_locations
+
+# Key of the {asset id: quantity} mapping in a get_location_item_quantities
+# response
+QUANTITIES_KEY = "quantities_by_asset_ids"
+
+
+def _quantity_map(data) -> dict:
+    """
+    The {item: quantity} mapping of a get_location_item_quantities response.
+    Raises ValueError if the response isn't shaped that way, rather than
+    rolling up numbers taken from the wrong place.
+    """
+    quantities = data.get(QUANTITIES_KEY) if isinstance(data, dict) else None
+    if not isinstance(quantities, dict):
+        raise ValueError(
+            f"Error, location item quantities response has no {QUANTITIES_KEY} mapping"
+        )
+    for item, quantity in quantities.items():
+        if isinstance(quantity, bool) or not isinstance(quantity, (int, float)):
+            raise ValueError(
+                f"Error, location item quantity for {item} is not a number: {quantity!r}"
+            )
+    return {str(item): quantity for item, quantity in quantities.items()}
+
+
+class LocationTree:
+    """
+    Index of locations by their parent/child relationships.
+    Children, ancestors and subtrees are worked out once when the tree is
+    built, so lookups afterwards are dict reads.
+    """
+
+    def __init__(
+        self, locations: list[dict], id_key: str = "id", parent_key: str = "parent_id"
+    ):
+        self.locations = {loc[id_key]: loc for loc in locations}
+        self._parents = {}
+        self._children = {loc_id: [] for loc_id in self.locations}
+
+        for loc_id, loc in self.locations.items():
+            parent = loc.get(parent_key)
+            # Missing or unknown parents make the location a root
+            if parent in self.locations and parent != loc_id:
+                self._parents[loc_id] = parent
+                self._children[parent].append(loc_id)
+
+        self._ancestors = {}
+        for loc_id in self.locations:
+            chain = []
+            seen = {loc_id}
+            parent = self._parents.get(loc_id)
+            while parent is not None and parent not in seen:
+                chain.append(parent)
+                seen.add(parent)
+                parent = self._parents.get(parent)
+            self._ancestors[loc_id] = tuple(chain)
+
+        subtrees = {loc_id: {loc_id} for loc_id in self.locations}
+        for loc_id, ancestors in self._ancestors.items():
+            for ancestor in ancestors:
+                subtrees[ancestor].add(loc_id)
+        self._subtrees = {k: frozenset(v) for k, v in subtrees.items()}
+
+        self.roots = [
+            loc_id for loc_id in self.locations if loc_id not in self._parents
+        ]
+        self.quantities = {}
+
+    @classmethod
+    def from_api(
+        cls,
+        filter: Optional[dict] = None,
+        id_key: str = "id",
+        parent_key: str = "parent_id",
+    ) -> "LocationTree":
+        """
+        Build the tree from get_locations. filter is as for get_locations.
+        """
+        return cls(get_locations(filter), id_key, parent_key)
+
+    def __len__(self) -> int:
+        return len(self.locations)
+
+    def __contains__(self, location_id) -> bool:
+        return location_id in self.locations
+
+    def __getitem__(self, location_id) -> dict:
+        return self.locations[location_id]
+
+    def parent(self, location_id):
+        """
+        Id of the parent location, None for roots
+        """
+        return self._parents.get(location_id)
+
+    def children(self, location_id) -> list:
+        """
+        Ids of the direct children of a location
+        """
+        return self._children[location_id]
+
+    def ancestors(self, location_id) -> tuple:
+        """
+        Ids of the ancestors of a location, nearest first
+        """
+        return self._ancestors[location_id]
+
+    def subtree(self, location_id) -> frozenset:
+        """
+        Ids of a location and everything below it
+        """
+        return self._subtrees[location_id]
+
+    def fetch_quantities(self, max_workers: int = 16) -> dict:
+        """
+        Get item quantities for every location, max_workers requests at a time.
+        Results are kept on self.quantities and returned.
+        """
+        quantities = {}
+        failed = {}
+
+        # Workers run at the caller's scheduler priority
+        fetch = scheduler.bind_priority(get_location_item_quantities)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(fetch, loc_id): loc_id for loc_id in self.locations
+            }
+            for future in as_completed(futures):
+                loc_id = futures[future]
+                try:
+                    quantities[loc_id] = _quantity_map(future.result())
+                except Exception as e:
+                    failed[loc_id] = e
+
+        if failed:
+            print("Error, could not get item quantities for locations: ", failed)
+            raise Exception(
+                "Error, could not get item quantities for locations: "
+                + ", ".join(str(loc_id) for loc_id in failed)
+            )
+
+        self.quantities = quantities
+        return quantities
+
+    def rolled_up_quantities(
+        self, max_workers: int = 16, refresh: bool = True
+    ) -> dict[object, Counter]:
+        """
+        Item quantities per location including everything stocked in its
+        subtree. Quantities are fetched concurrently unless refresh is False
+        and they were already fetched.
+        """
+        if refresh or not self.quantities:
+            self.fetch_quantities(max_workers)
+
+        totals = {loc_id: Counter() for loc_id in self.locations}
+        for loc_id, quantities in self.quantities.items():
+            totals[loc_id].update(quantities)
+            for ancestor in self._ancestors[loc_id]:
+                totals[ancestor].update(quantities)
+
+        return totals
@@ -3,20 +3,38 @@ This module contains functions for interacting with locations in EZOfficeInvento
 """
 
 import os
-from typing import Optional
-
-import requests
+from typing import Iterator, Literal, Optional, Union
 
+from ezoff import schemas, transport
 from ezoff.auth import Decorators
 
 
 @Decorators.check_env_vars
-def get_locations(filter: Optional[dict]) -> list[dict]:
+def get_locations(
+    filter: Optional[dict], per_page: Union[int, Literal["auto"], None] = None
+) -> list[dict]:
     """
     Get locations
     Optionally filter by status
+    per_page sets the page size, or "auto" to tune it for the fastest pull.
     https://ezo.io/ezofficeinventory/developers/#api-retreive-locations
     """
+
+    all_locations = []
+
+    for page in iter_location_pages(filter, per_page):
+        all_locations.extend(page)
+
+    return all_locations
+
+
+@Decorators.check_env_vars
+def iter_location_pages(
+    filter: Optional[dict], per_page: Union[int, Literal["auto"], None] = None
+) -> Iterator[list[dict]]:
+    """
+    Same as get_locations, but yields the locations one page at a time.
+    """
     if filter is not None:
         if "status" not in filter:
             raise ValueError("filter must have 'status' key")
@@ -27,74 +45,36 @@ def get_locations(filter: Optional[dict]) -> list[dict]:
 
     url = os.environ["EZO_BASE_URL"] + "locations/get_line_item_locations.api"
 
-    page = 1
-    all_locations = []
-
-    while True:
-        params = {"page": page, "include_custom_fields": "true"}
-        if filter is not None:
-            params.update(filter)
-
-        try:
-            response = requests.get(
-                url,
-                headers={"Authorization": "Bearer " + os.environ["EZO_TOKEN"]},
-                params=params,
-                timeout=10,
-            )
-        except Exception as e:
-            print("Error, could not get locations from EZOfficeInventory: ", e)
-            raise Exception(
-                "Error, could not get locations from EZOfficeInventory: " + str(e)
-            )
-
-        if response.status_code != 200:
-            print(
-                f"Error {response.status_code}, could not get locations from EZOfficeInventory: ",
-                response.content,
-            )
-            break
-
-        data = response.json()
-        if "locations" not in data:
-            print(
-                f"Error, could not get locations from EZOfficeInventory: ",
-                response.content,
-            )
-            raise Exception(
-                f"Error, could not get locations from EZOfficeInventory: "
-                + str(response.content)
-            )
-
-        all_locations.extend(data["locations"])
-
-        if "total_pages" not in data:
-            print("Error, could not get total_pages from EZOfficeInventory: ", data)
-            break
-
-        if page >= data["total_pages"]:
-            break
-
-        page += 1
-
-    return all_locations
+    params = {"include_custom_fields": "true"}
+    if filter is not None:
+        params.update(filter)
+
+    yield from transport.iter_pages(
+        url,
+        "locations",
+        "locations",
+        params=params,
+        per_page=per_page,
+        headers={"Authorization": "Bearer " + os.environ["EZO_TOKEN"]},
+    )
 
 
 @Decorators.check_env_vars
 def get_location_details(location_num: int) -> dict:
     """
     Get location details
+    Uses a conditional request, a 304 returns the previously fetched details.
     https://ezo.io/ezofficeinventory/developers/#api-location-details
     """
 
     url = os.environ["EZO_BASE_URL"] + "locations/" + str(location_num) + ".api"
 
     try:
-        response = requests.get(
+        response = transport.get(
             url,
             headers={"Authorization": "Bearer " + os.environ["EZO_TOKEN"]},
             params={"include_custom_fields": "true"},
-            timeout=10,
+            conditional=True,
         )
     except Exception as e:
         print("Error, could not get location from EZOfficeInventory: ", e)
@@ -119,6 +99,7 @@ def get_location_details(location_num: int) -> dict:
 def get_location_item_quantities(location_num: int) -> dict:
     """
     Get quantities of each item at a location
+    Conditional request, quantities are only downloaded again when changed.
     """
 
     url = (
@@ -129,10 +110,10 @@ def get_location_item_quantities(location_num: int) -> dict:
     )
 
     try:
-        response = requests.get(
+        response = transport.get(
             url,
             headers={"Authorization": "Bearer " + os.environ["EZO_TOKEN"]},
-            timeout=10,
+            conditional=True,
         )
     except Exception as e:
         print(
@@ -163,40 +144,12 @@ def create_location(location: dict) -> dict:
     https://ezo.io/ezofficeinventory/developers/#api-create-location
     """
 
-    # Required fields
-    if "location[name]" not in location:
-        raise ValueError("location must have 'location[name]' key")
-
-    # Remove any keys that are not valid
-    valid_keys = [
-        "location[parent_id]",
-        "location[identification_number]",
-        "location[name]",
-        "location[city]",
-        "location[state]",
-        "location[zipcode]",
-        "location[street1]",
-        "location[street2]",
-        "location[status]",
-        "location[description]",
-    ]
-
-    location = {
-        k: v
-        for k, v in location.items()
-        if k in valid_keys or k.startswith("location[custom_attributes]")
-    }
-
-    if "location[status]" in location:
-        if location["location[status]"] not in ["active", "inactive"]:
-            raise ValueError(
-                "location['location[status]'] must be one of 'active', 'inactive'"
-            )
+    location = schemas.validate_payload("create_location", location)
 
     url = os.environ["EZO_BASE_URL"] + "locations.api"
 
     try:
-        response = requests.post(
+        response = transport.post(
             url,
             headers={"Authorization": "Bearer " + os.environ["EZO_TOKEN"]},
             data=location,
@@ -232,10 +185,9 @@ def activate_location(location_num: int) -> dict:
     )
 
     try:
-        response = requests.patch(
+        response = transport.patch(
             url,
             headers={"Authorization": "Bearer " + os.environ["EZO_TOKEN"]},
-            timeout=10,
         )
     except Exception as e:
         print("Error, could not activate location in EZOfficeInventory: ", e)
@@ -271,10 +223,9 @@ def deactivate_location(location_num: int) -> dict:
     )
 
     try:
-        response = requests.patch(
+        response = transport.patch(
             url,
             headers={"Authorization": "Bearer " + os.environ["EZO_TOKEN"]},
-            timeout=10,
         )
     except Exception as e:
         print("Error, could not deactivate location in EZOfficeInventory: ", e)
@@ -302,33 +253,15 @@ def update_location(location_num: int, location: dict) -> dict:
     https://ezo.io/ezofficeinventory/developers/#api-update-location
     """
 
-    # Remove any keys that are not valid
-    valid_keys = [
-        "location[parent_id]",
-        "location[name]",
-        "location[city]",
-        "location[state]",
-        "location[zipcode]",
-        "location[street1]",
-        "location[street2]",
-        "location[status]",
-        "location[description]",
-    ]
-
-    location = {
-        k: v
-        for k, v in location.items()
-        if k in valid_keys or k.startswith("location[custom_attributes]")
-    }
+    location = schemas.validate_payload("update_location", location)
 
     url = os.environ["EZO_BASE_URL"] + "locations/" + str(location_num) + ".api"
 
     try:
-        response = requests.put(
+        response = transport.put(
             url,
             headers={"Authorization": "Bearer " + os.environ["EZO_TOKEN"]},
             data=location,
-            timeout=10,
         )
     except Exception as e:
         print("Error, could not update location in EZOfficeInventory: ", e)
@@ -3,21 +3,35 @@ This module contains functions for interacting with members/roles/user setup in
 """
 
 import os
-from typing import Optional
-
-import requests
+from typing import Iterator, Literal, Optional, Union
 
+from ezoff import schemas, transport
 from ezoff.auth import Decorators
 
 
 @Decorators.check_env_vars
-def get_members(filter: Optional[dict]) -> list[dict]:
+def get_members(
+    filter: Optional[dict], per_page: Union[int, Literal["auto"], None] = None
+) -> list[dict]:
     """
     Get members from EZOfficeInventory
     Optionally filter by email, employee_identification_number, or status
+    per_page sets the page size, or "auto" to tune it for the fastest pull.
     https://ezo.io/ezofficeinventory/developers/#api-retrieve-members
     """
 
+    all_members = []
+
+    for page in iter_member_pages(filter, per_page):
+        all_members.extend(page)
+
+    return all_members
+
+
+def _member_params(filter: Optional[dict]) -> dict:
+    """
+    Query params for listing members, checking filter on the way
+    """
     if filter is not None:
         if "filter" not in filter or "filter_val" not in filter:
             raise ValueError("filter must have 'filter' and 'filter_val' keys")
@@ -30,76 +44,73 @@ def get_members(filter: Optional[dict]) -> list[dict]:
                 "filter['filter'] must be one of 'email', 'employee_identification_number', 'status'"
             )
 
-    url = os.environ["EZO_BASE_URL"] + "members.api"
+    params = {"include_custom_fields": "true"}
+    if filter is not None:
+        params.update(filter)
 
-    page = 1
-    all_members = []
+    return params
 
-    while True:
-        params = {"page": page, "include_custom_fields": "true"}
-        if filter is not None:
-            params.update(filter)
-
-        try:
-            response = requests.get(
-                url,
-                headers={"Authorization": "Bearer " + os.environ["EZO_TOKEN"]},
-                params=params,
-                timeout=10,
-            )
-        except Exception as e:
-            print("Error, could not get members from EZOfficeInventory: ", e)
-            raise Exception(
-                "Error, could not get members from EZOfficeInventory: " + str(e)
-            )
 
-        if response.status_code != 200:
-            print(
-                f"Error {response.status_code}, could not get members from EZOfficeInventory: ",
-                response.content,
-            )
-            break
+@Decorators.check_env_vars
+def iter_member_pages(
+    filter: Optional[dict], per_page: Union[int, Literal["auto"], None] = None
+) -> Iterator[list[dict]]:
+    """
+    Same as get_members, but yields the members one page at a time.
+    """
 
-        data = response.json()
-        if "members" not in data:
-            print(
-                f"Error, could not get members from EZOfficeInventory: ",
-                response.content,
-            )
-            raise Exception(
-                f"Error, could not get members from EZOfficeInventory: "
-                + str(response.content)
-            )
+    url = os.environ["EZO_BASE_URL"] + "members.api"
+    params = _member_params(filter)
 
-        all_members.extend(data["members"])
+    yield from transport.iter_pages(
+        url,
+        "members",
+        "members",
+        params=params,
+        per_page=per_page,
+        headers={"Authorization": "Bearer " + os.environ["EZO_TOKEN"]},
+    )
 
-        if "total_pages" not in data:
-            print("Error, could not get total_pages from EZOfficeInventory: ", data)
-            break
 
-        if page >= data["total_pages"]:
-            break
+@Decorators.check_env_vars
+def iter_member_records(
+    filter: Optional[dict], per_page: Optional[int] = None
+) -> Iterator[dict]:
+    """
+    Same as get_members, but yields members one at a time, parsed as the
+    response comes in.
+    """
 
-        page += 1
+    url = os.environ["EZO_BASE_URL"] + "members.api"
+    params = _member_params(filter)
 
-    return all_members
+    yield from transport.iter_records(
+        url,
+        "members",
+        "members",
+        params=params,
+        per_page=per_page,
+        headers={"Authorization": "Bearer " + os.environ["EZO_TOKEN"]},
+    )
 
 
 @Decorators.check_env_vars
 def get_member_details(member_id: int) -> dict:
     """
     Get member from EZOfficeInventory by member_id
+    Uses a conditional request, so an unchanged member is returned from the
+    last downloaded copy.
     https://ezo.io/ezofficeinventory/developers/#api-member-details
     """
 
     url = os.environ["EZO_BASE_URL"] + "members/" + str(member_id) + ".api"
 
     try:
-        response = requests.get(
+        response = transport.get(
             url,
             headers={"Authorization": "Bearer " + os.environ["EZO_TOKEN"]},
             params={"include_custom_fields": "true"},
-            timeout=10,
+            conditional=True,
         )
     except Exception as e:
         print("Error, could not get member from EZOfficeInventory: ", e)
@@ -125,54 +136,15 @@ def create_member(member: dict) -> dict:
     https://ezo.io/ezofficeinventory/developers/#api-create-member
     """
 
-    # Required fields
-    if "user[email]" not in member:
-        raise ValueError("member must have 'user[email]' key")
-    if "user[first_name]" not in member:
-        raise ValueError("member must have 'user[first_name]' key")
-    if "user[last_name]" not in member:
-        raise ValueError("member must have 'user[last_name]' key")
-    if "user[role_id]" not in member:
-        raise ValueError("member must have 'user[role_id]' key")
-
-    # Remove any keys that are not valid
-    valid_keys = [
-        "user[email]",
-        "user[employee_id]",
-        "user[employee_identification_number]",
-        "user[role_id]",
-        "user[team_id]",
-        "user[user_listing_id]",
-        "user[first_name]",
-        "user[last_name]",
-        "user[address_name]",
-        "user[address]",
-        "user[address_line_2]",
-        "user[city]",
-        "user[state]",
-        "user[country]",
-        "user[phone_number]",
-        "user[fax]",
-        "user[login_enabled]",
-        "user[subscribed_to_emails]",
-        "skip_confirmation_email",
-    ]
-
-    # Check for custom attributes
-    member = {
-        k: v
-        for k, v in member.items()
-        if k in valid_keys or k.startswith("user[custom_attributes]")
-    }
+    member = schemas.validate_payload("create_member", member)
 
     url = os.environ["EZO_BASE_URL"] + "members.api"
 
     try:
-        response = requests.post(
+        response = transport.post(
             url,
             headers={"Authorization": "Bearer " + os.environ["EZO_TOKEN"]},
             data=member,
-            timeout=10,
         )
     except Exception as e:
         print("Error, could not create member in EZOfficeInventory: ", e)
@@ -190,35 +162,15 @@ def update_member(member_id: int, member: dict) -> dict:
     https://ezo.io/ezofficeinventory/developers/#api-update-member
     """
 
-    # Remove any keys that are not valid
-    valid_keys = [
-        "user[email]",
-        "user[employee_id]",
-        "user[role_id]",
-        "user[team_id]",
-        "user[user_listing_id]",
-        "user[first_name]",
-        "user[last_name]",
-        "user[phone_number]",
-        "user[fax]",
-        "skip_confirmation_email",
-    ]
-
-    # Check for custom attributes
-    member = {
-        k: v
-        for k, v in member.items()
-        if k in valid_keys or k.startswith("user[custom_attributes]")
-    }
+    member = schemas.validate_payload("update_member", member)
 
     url = os.environ["EZO_BASE_URL"] + "members/" + str(member_id) + ".api"
 
     try:
-        response = requests.put(
+        response = transport.put(
             url,
             headers={"Authorization": "Bearer " + os.environ["EZO_TOKEN"]},
             data=member,
-            timeout=10,
         )
     except Exception as e:
         print("Error, could not update member in EZOfficeInventory: ", e)
@@ -239,10 +191,9 @@ def deactivate_member(member_id: int) -> dict:
     url = os.environ["EZO_BASE_URL"] + "members/" + str(member_id) + "/deactivate.api"
 
     try:
-        response = requests.put(
+        response = transport.put(
             url,
             headers={"Authorization": "Bearer " + os.environ["EZO_TOKEN"]},
-            timeout=10,
         )
     except Exception as e:
         print("Error, could not deactivate member in EZOfficeInventory: ", e)
@@ -263,10 +214,9 @@ def activate_member(member_id: int) -> dict:
     url = os.environ["EZO_BASE_URL"] + "members/" + str(member_id) + "/activate.api"
 
     try:
-        response = requests.put(
+        response = transport.put(
             url,
             headers={"Authorization": "Bearer " + os.environ["EZO_TOKEN"]},
-            timeout=10,
         )
     except Exception as e:
         print("Error, could not activate member in EZOfficeInventory: ", e)
@@ -288,52 +238,15 @@ def get_custom_roles() -> list[dict]:
 
     url = os.environ["EZO_BASE_URL"] + "custom_roles.api"
 
-    pages = 1
     all_custom_roles = []
 
-    while True:
-        try:
-            response = requests.get(
-                url,
-                headers={"Authorization": "Bearer " + os.environ["EZO_TOKEN"]},
-                params={"page": pages},
-                timeout=10,
-            )
-        except Exception as e:
-            print("Error, could not get custom roles from EZOfficeInventory: ", e)
-            raise Exception(
-                "Error, could not get custom roles from EZOfficeInventory: " + str(e)
-            )
-
-        if response.status_code != 200:
-            print(
-                f"Error {response.status_code}, could not get custom roles from EZOfficeInventory: ",
-                response.content,
-            )
-            break
-
-        data = response.json()
-
-        if "custom_roles" not in data:
-            print(
-                f"Error, could not get custom roles from EZOfficeInventory: ",
-                response.content,
-            )
-            raise Exception(
-                f"Error, could not get custom roles from EZOfficeInventory: "
-                + str(response.content)
-            )
-
-        all_custom_roles.extend(data["custom_roles"])
-
-        if "total_pages" not in data:
-            print("Error, could not get total_pages from EZOfficeInventory: ", data)
-            break
-
-        if pages >= data["total_pages"]:
-            break
-
-        pages += 1
+    for page in transport.iter_pages(
+        url,
+        "custom_roles",
+        "custom roles",
+        headers={"Authorization": "Bearer " + os.environ["EZO_TOKEN"]},
+    ):
+        all_custom_roles.extend(page)
 
     return all_custom_roles
 
@@ -347,51 +260,14 @@ def get_teams() -> list[dict]:
 
     url = os.environ["EZO_BASE_URL"] + "teams.api"
 
-    page = 1
     all_teams = []
 
-    while True:
-        try:
-            response = requests.get(
-                url,
-                headers={"Authorization": "Bearer " + os.environ["EZO_TOKEN"]},
-                params={"page": page},
-                timeout=10,
-            )
-        except Exception as e:
-            print("Error, could not get teams from EZOfficeInventory: ", e)
-            raise Exception(
-                "Error, could not get teams from EZOfficeInventory: " + str(e)
-            )
-
-        if response.status_code != 200:
-            print(
-                f"Error {response.status_code}, could not get teams from EZOfficeInventory: ",
-                response.content,
-            )
-            break
-
-        data = response.json()
-
-        if "teams" not in data:
-            print(
-                f"Error, could not get teams from EZOfficeInventory: ",
-                response.content,
-            )
-            raise Exception(
-                f"Error, could not get teams from EZOfficeInventory: "
-                + str(response.content)
-            )
-
-        all_teams.extend(data["teams"])
-
-        if "total_pages" not in data:
-            print("Error, could not get total_pages from EZOfficeInventory: ", data)
-            break
-
-        if page >= data["total_pages"]:
-            break
-
-        page += 1
+    for page in transport.iter_pages(
+        url,
+        "teams",
+        "teams",
+        headers={"Authorization": "Bearer " + os.environ["EZO_TOKEN"]},
+    ):
+        all_teams.extend(page)
 
     return all_teams
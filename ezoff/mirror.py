@@ -0,0 +1,164 @@
+"""
+Local SQLite mirror of EZOffice records.
+Each synced entity (assets, members, locations, work orders) gets a table of
+records stored as JSON, keyed by id, so other tools can read the data without
+going through the API.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from typing import Callable, Iterator, Literal, Optional, Union
+
+from ezoff.assets import iter_all_asset_pages
+from ezoff.locations import iter_location_pages
+from ezoff.members import iter_member_pages
+from ezoff.workorders import iter_work_order_pages
+
+ENTITIES = ["assets", "members", "locations", "work_orders"]
+
+ID_KEYS = {
+    "assets": "sequence_num",
+    "members": "id",
+    "locations": "id",
+}
+
+WORK_ORDER_STATUSES = ["open", "in_progress", "review_pending", "complete"]
+
+
+def _record_pages(
+    entity: str, per_page: Union[int, Literal["auto"], None]
+) -> Iterator[list[tuple]]:
+    """
+    Pages of (id, record) pairs for entity
+    """
+    if entity == "work_orders":
+        # Work order pages are dicts keyed by work order number
+        for status in WORK_ORDER_STATUSES:
+            for page in iter_work_order_pages(status, per_page):
+                yield list(page.items())
+        return
+
+    if entity == "assets":
+        pages = iter_all_asset_pages(per_page)
+    elif entity == "members":
+        pages = iter_member_pages(None, per_page)
+    else:
+        pages = iter_location_pages(None, per_page)
+
+    id_key = ID_KEYS[entity]
+    for page in pages:
+        yield [(record[id_key], record) for record in page]
+
+
+class Mirror:
+    """
+    SQLite file holding a copy of EZOffice records. Safe to share between
+    threads.
+
+        mirror = Mirror("ezoffice.db")
+        mirror.sync("assets")
+        asset = mirror.get("assets", 123)
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            for entity in ENTITIES:
+                self._db.execute(
+                    f"CREATE TABLE IF NOT EXISTS {entity} ("
+                    "id TEXT PRIMARY KEY, data TEXT NOT NULL, synced_at REAL NOT NULL)"
+                )
+
+    def __enter__(self) -> "Mirror":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    @staticmethod
+    def _check_entity(entity: str) -> None:
+        if entity not in ENTITIES:
+            raise ValueError(f"entity must be one of {ENTITIES}")
+
+    def upsert(self, entity: str, records: list[tuple]) -> int:
+        """
+        Store (id, record) pairs, replacing what's there for the same ids.
+        Returns the number stored.
+        """
+        self._check_entity(entity)
+        now = time.time()
+        rows = [
+            (str(record_id), json.dumps(record), now) for record_id, record in records
+        ]
+        with self._lock, self._db:
+            self._db.executemany(
+                f"INSERT OR REPLACE INTO {entity} (id, data, synced_at) VALUES (?, ?, ?)",
+                rows,
+            )
+        return len(rows)
+
+    def delete(self, entity: str, record_id) -> None:
+        self._check_entity(entity)
+        with self._lock, self._db:
+            self._db.execute(f"DELETE FROM {entity} WHERE id = ?", (str(record_id),))
+
+    def get(self, entity: str, record_id) -> Optional[dict]:
+        self._check_entity(entity)
+        with self._lock:
+            row = self._db.execute(
+                f"SELECT data FROM {entity} WHERE id = ?", (str(record_id),)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def records(self, entity: str) -> list[dict]:
+        self._check_entity(entity)
+        with self._lock:
+            rows = self._db.execute(f"SELECT data FROM {entity}").fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def count(self, entity: str) -> int:
+        self._check_entity(entity)
+        with self._lock:
+            return self._db.execute(f"SELECT COUNT(*) FROM {entity}").fetchone()[0]
+
+    def sync(
+        self,
+        entity: str,
+        per_page: Union[int, Literal["auto"], None] = "auto",
+        prune: bool = False,
+        progress: Optional[Callable[[int], None]] = None,
+    ) -> dict:
+        """
+        Pull every record of entity and store it.
+        With prune, records that weren't in the pull are deleted afterwards.
+        A failed page raises IncompletePullError before anything is pruned,
+        the records already pulled are kept.
+        progress, if given, is called with the number of records in each page.
+        Returns counts of records stored and pruned.
+        """
+        self._check_entity(entity)
+        started = time.time()
+        stored = 0
+
+        for page in _record_pages(entity, per_page):
+            stored += self.upsert(entity, page)
+            if progress is not None:
+                progress(len(page))
+
+        pruned = 0
+        if prune:
+            with self._lock, self._db:
+                pruned = self._db.execute(
+                    f"DELETE FROM {entity} WHERE synced_at < ?", (started,)
+                ).rowcount
+
+        return {"stored": stored, "pruned": pruned}
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
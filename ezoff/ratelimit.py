@@ -0,0 +1,249 @@
+"""
+Request rate budget shared by every process on a host.
+The token bucket lives in a small file guarded by an OS file lock, so any
+number of jobs using ezoff against the same tenant draw from one budget.
+Off unless EZO_RATE_LIMIT is set or configure_rate_limit is called.
+"""
+
+import hashlib
+import os
+import stat
+import struct
+import tempfile
+import threading
+import time
+import weakref
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+# tokens available, time they were counted at
+_STATE = struct.Struct("<dd")
+
+
+def _lock(fd: int) -> None:
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_LOCK, _STATE.size)
+
+
+def _unlock(fd: int) -> None:
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, _STATE.size)
+
+
+def _open_bucket(path: str) -> int:
+    """
+    Open (or create) a bucket file for this user only. Symlinks aren't
+    followed, and a file that isn't a regular file owned by this user is
+    refused, so another local user can't point the bucket at one of our
+    files or share and drain our budget.
+    """
+    flags = os.O_RDWR | os.O_CREAT | getattr(os, "O_NOFOLLOW", 0)
+    fd = os.open(path, flags, 0o600)
+    try:
+        info = os.fstat(fd)
+        if not stat.S_ISREG(info.st_mode):
+            raise PermissionError(f"Error, rate limit bucket {path} is not a file")
+        if hasattr(os, "getuid") and info.st_uid != os.getuid():
+            raise PermissionError(
+                f"Error, rate limit bucket {path} belongs to another user"
+            )
+    except BaseException:
+        os.close(fd)
+        raise
+    return fd
+
+
+class FileTokenBucket:
+    """
+    Token bucket refilled at rate tokens per second up to capacity, stored in
+    a file so that several processes can share it.
+    """
+
+    def __init__(self, path: str, rate: float, capacity: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("rate must be greater than 0")
+        if capacity is not None and capacity < 1:
+            raise ValueError("capacity must be at least 1, a request takes 1 token")
+        self.path = path
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1)
+        # flock is per open file, threads of this process need their own lock
+        self._thread_lock = threading.Lock()
+        self._fd = _open_bucket(path)
+        _buckets.add(self)
+
+    def _reopen(self) -> None:
+        """
+        A forked child shares its parent's open file, and with it the flock,
+        so the two wouldn't exclude each other. Open the file again.
+        """
+        self._thread_lock = threading.Lock()
+        inherited = self._fd
+        self._fd = _open_bucket(self.path)
+        os.close(inherited)
+
+    def _take(self, tokens: float) -> float:
+        """
+        Take tokens if available. Returns 0 on success, otherwise how long to
+        wait before there will be enough.
+        """
+        with self._thread_lock:
+            _lock(self._fd)
+            try:
+                now = time.time()
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                raw = os.read(self._fd, _STATE.size)
+                if len(raw) == _STATE.size:
+                    available, counted_at = _STATE.unpack(raw)
+                    available += max(0.0, now - counted_at) * self.rate
+                    available = min(available, self.capacity)
+                else:
+                    available = self.capacity
+
+                if available >= tokens:
+                    available -= tokens
+                    wait = 0.0
+                else:
+                    wait = (tokens - available) / self.rate
+
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                os.write(self._fd, _STATE.pack(available, now))
+                return wait
+            finally:
+                _unlock(self._fd)
+
+    def try_acquire(self, tokens: float = 1) -> float:
+        """
+        Take tokens if they are available without waiting. Returns 0 if they
+        were taken, otherwise the number of seconds until there will be
+        enough. Raises ValueError if tokens is more than the bucket can ever
+        hold.
+        """
+        if tokens > self.capacity:
+            raise ValueError(
+                f"can't take {tokens} tokens from a bucket holding at most {self.capacity}"
+            )
+        return self._take(tokens)
+
+    def acquire(self, tokens: float = 1) -> float:
+        """
+        Block until tokens are available and take them.
+        Returns the number of seconds spent waiting. Raises ValueError if
+        tokens is more than the bucket can ever hold.
+        """
+        waited = 0.0
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait == 0:
+                return waited
+            time.sleep(wait)
+            waited += wait
+
+    def close(self) -> None:
+        _buckets.discard(self)
+        os.close(self._fd)
+
+
+# Open buckets, reopened in forked children (see FileTokenBucket._reopen)
+_buckets = weakref.WeakSet()
+
+
+def _reopen_after_fork() -> None:
+    for bucket in list(_buckets):
+        bucket._reopen()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reopen_after_fork)
+
+
+_limiter = None
+_configured = False
+
+
+def _private_dir() -> str:
+    """
+    Directory only this user can get at: $XDG_RUNTIME_DIR/ezoff, or an
+    ezoff-<uid> directory with mode 0700 in the temp directory
+    """
+    runtime = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime:
+        directory = os.path.join(runtime, "ezoff")
+    elif hasattr(os, "getuid"):
+        directory = os.path.join(tempfile.gettempdir(), f"ezoff-{os.getuid()}")
+    else:
+        # Windows: the temp directory is already per user
+        directory = os.path.join(tempfile.gettempdir(), "ezoff")
+
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    if hasattr(os, "getuid"):
+        info = os.lstat(directory)
+        if (
+            not stat.S_ISDIR(info.st_mode)
+            or info.st_uid != os.getuid()
+            or info.st_mode & 0o077
+        ):
+            raise PermissionError(
+                f"Error, {directory} must be a directory only this user can access"
+            )
+    return directory
+
+
+def _default_path() -> str:
+    """
+    One bucket file per tenant, in a directory private to this user
+    """
+    tenant = hashlib.sha256(os.environ.get("EZO_BASE_URL", "").encode()).hexdigest()
+    return os.path.join(_private_dir(), f"{tenant[:16]}.bucket")
+
+
+def configure_rate_limit(
+    rate: float, capacity: Optional[float] = None, path: Optional[str] = None
+) -> FileTokenBucket:
+    """
+    Limit all ezoff API calls from every process using the same bucket file to
+    rate requests per second, with bursts of up to capacity.
+    path defaults to a per-tenant file in the temp directory.
+    """
+    global _limiter, _configured
+    _limiter = FileTokenBucket(path or _default_path(), rate, capacity)
+    _configured = True
+    return _limiter
+
+
+def disable_rate_limit() -> None:
+    """
+    Turn rate limiting off, regardless of EZO_RATE_LIMIT
+    """
+    global _limiter, _configured
+    _limiter = None
+    _configured = True
+
+
+def get_rate_limiter() -> Optional[FileTokenBucket]:
+    """
+    The active rate limiter, if any. Falls back to the EZO_RATE_LIMIT,
+    EZO_RATE_LIMIT_BURST and EZO_RATE_LIMIT_FILE environment variables.
+    """
+    global _limiter, _configured
+    if not _configured:
+        if "EZO_RATE_LIMIT" in os.environ:
+            burst = os.environ.get("EZO_RATE_LIMIT_BURST")
+            _limiter = FileTokenBucket(
+                os.environ.get("EZO_RATE_LIMIT_FILE") or _default_path(),
+                float(os.environ["EZO_RATE_LIMIT"]),
+                float(burst) if burst else None,
+            )
+        _configured = True
+    return _limiter
@@ -0,0 +1,254 @@
+"""
+Desired-state sync of members.
+Takes the members that should exist (e.g. from an HR system), compares them
+with one get_members snapshot and only makes the calls needed to close the
+gap: creates, updates of the fields that changed, activations and
+deactivations.
+"""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Literal, Optional
+
+from ezoff import scheduler, schemas
+from ezoff.members import (
+    activate_member,
+    create_member,
+    deactivate_member,
+    get_members,
+    update_member,
+)
+
+_CUSTOM_PREFIX = "user[custom_attributes]["
+
+
+def _normalize_key(value) -> str:
+    return str(value).strip().lower() if value is not None else ""
+
+
+def _normalize_value(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return str(value).lower()
+    return str(value).strip()
+
+
+_MISSING = object()
+
+
+def _current_value(record: dict, key: str):
+    """
+    Value a member record holds for a create_member / update_member payload
+    key, or _MISSING if the record doesn't include that field at all
+    """
+    if key.startswith(_CUSTOM_PREFIX) and key.endswith("]"):
+        name = key[len(_CUSTOM_PREFIX) : -1]
+        custom_fields = record.get("custom_fields") or []
+        if isinstance(custom_fields, dict):
+            return custom_fields.get(name)
+        for field in custom_fields:
+            if isinstance(field, dict) and field.get("name") == name:
+                return field.get("value")
+        return None
+    if key.startswith("user[") and key.endswith("]"):
+        return record.get(key[len("user[") : -1], _MISSING)
+    return record.get(key, _MISSING)
+
+
+def _changed_fields(payload: dict, record: dict, match_key: str) -> dict:
+    """
+    The updatable fields of payload that differ from record. Fields the
+    snapshot doesn't include can't be compared and are left alone.
+    """
+    update_schema = schemas.get_schema("update_member")
+    changes = {}
+
+    for key, value in payload.items():
+        # Already matched case-insensitively
+        if key == match_key or not update_schema.is_valid_key(key):
+            continue
+        current = _current_value(record, key)
+        if current is _MISSING:
+            continue
+        if _normalize_value(value) != _normalize_value(current):
+            changes[key] = value
+
+    return changes
+
+
+def _is_active(record: dict) -> bool:
+    if "status" in record:
+        return str(record["status"]).lower() == "active"
+    if "active" in record:
+        return bool(record["active"])
+    return True
+
+
+def plan_member_changes(
+    desired: list[dict],
+    current: list[dict],
+    key: Literal["email", "employee_identification_number"] = "email",
+    deactivate_missing: bool = False,
+) -> dict:
+    """
+    Work out which calls would bring current (get_members output) in line
+    with desired.
+    desired is a list of create_member payloads ('user[email]' etc.). A
+    'status' key of 'active' or 'inactive' (any case) can be added to control
+    activation, it isn't sent to the API; other values are reported in errors. Members are matched on key, case-insensitively.
+    Only fields update_member accepts and the snapshot includes are compared.
+    With deactivate_missing, active members not in desired are deactivated.
+    Returns a dict of lists:
+        create: create_member payloads
+        update: (member_id, changed fields only) pairs
+        activate / deactivate: member ids
+        unchanged: count of members needing nothing
+        errors: (match key, error) for desired rows that are invalid
+    """
+    payload_key = "user[" + key + "]"
+    current_by_key = {}
+    for record in current:
+        match = _normalize_key(record.get(key))
+        if match:
+            current_by_key[match] = record
+
+    plan = {
+        "create": [],
+        "update": [],
+        "activate": [],
+        "deactivate": [],
+        "unchanged": 0,
+        "errors": [],
+    }
+    seen = set()
+
+    for row in desired:
+        match = _normalize_key(row.get(payload_key))
+        if not match:
+            plan["errors"].append((None, f"member must have '{payload_key}' key"))
+            continue
+        if match in seen:
+            plan["errors"].append((match, "duplicate " + key))
+            continue
+        seen.add(match)
+
+        # A blank status means the default
+        status = _normalize_key(row.get("status")) or "active"
+        if status not in ("active", "inactive"):
+            plan["errors"].append(
+                (match, f"status must be 'active' or 'inactive', got {row['status']!r}")
+            )
+            continue
+        payload = {k: v for k, v in row.items() if k != "status"}
+        record = current_by_key.get(match)
+
+        if record is None:
+            if status == "inactive":
+                plan["unchanged"] += 1
+                continue
+            try:
+                plan["create"].append(
+                    schemas.validate_payload("create_member", payload)
+                )
+            except ValueError as e:
+                plan["errors"].append((match, str(e)))
+            continue
+
+        changes = _changed_fields(payload, record, payload_key)
+
+        needs_work = False
+        if status == "active" and not _is_active(record):
+            plan["activate"].append(record["id"])
+            needs_work = True
+        if changes:
+            plan["update"].append((record["id"], changes))
+            needs_work = True
+        if status == "inactive" and _is_active(record):
+            plan["deactivate"].append(record["id"])
+            needs_work = True
+        if not needs_work:
+            plan["unchanged"] += 1
+
+    if deactivate_missing:
+        for match, record in current_by_key.items():
+            if match not in seen and _is_active(record):
+                plan["deactivate"].append(record["id"])
+
+    return plan
+
+
+def apply_member_plan(plan: dict, max_workers: int = 8) -> dict:
+    """
+    Make the calls from plan_member_changes concurrently.
+    Activations run before updates and deactivations after, since an
+    inactive member may not accept updates.
+    Returns counts of successful calls per kind and a list of
+    (kind, target, error) for the calls that failed.
+    """
+    report = {
+        "created": 0,
+        "updated": 0,
+        "activated": 0,
+        "deactivated": 0,
+        "failed": [],
+    }
+
+    phases = [
+        [
+            ("activated", activate_member, (member_id,))
+            for member_id in plan["activate"]
+        ],
+        [("created", create_member, (payload,)) for payload in plan["create"]]
+        + [
+            ("updated", update_member, (member_id, changes))
+            for member_id, changes in plan["update"]
+        ],
+        [
+            ("deactivated", deactivate_member, (member_id,))
+            for member_id in plan["deactivate"]
+        ],
+    ]
+
+    # Workers run at the caller's scheduler priority
+    run = scheduler.bind_priority(lambda function, *args: function(*args))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for calls in phases:
+            futures = {
+                executor.submit(run, function, *args): (kind, args[0])
+                for kind, function, args in calls
+            }
+            for future in as_completed(futures):
+                kind, target = futures[future]
+                try:
+                    future.result()
+                    report[kind] += 1
+                except Exception as e:
+                    report["failed"].append((kind, target, str(e)))
+
+    return report
+
+
+def reconcile_members(
+    desired: list[dict],
+    key: Literal["email", "employee_identification_number"] = "email",
+    deactivate_missing: bool = False,
+    dry_run: bool = False,
+    max_workers: int = 8,
+    current: Optional[list[dict]] = None,
+) -> dict:
+    """
+    Bring EZOffice members in line with desired, making only the calls that
+    are needed. See plan_member_changes for the format of desired.
+    Takes a single get_members snapshot unless current is passed in.
+    Returns the plan, plus the result of applying it unless dry_run is set.
+    """
+    if current is None:
+        current = get_members(None)
+
+    plan = plan_member_changes(desired, current, key, deactivate_missing)
+    result = {"plan": plan}
+
+    if not dry_run:
+        result["applied"] = apply_member_plan(plan, max_workers)
+
+    return result
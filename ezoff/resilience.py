@@ -0,0 +1,288 @@
+"""
+Tail latency and outage handling for API calls.
+- Latency of every request is tracked per endpoint.
+- Hedging: if a GET takes longer than a latency percentile for its endpoint,
+  a duplicate is sent and whichever answers first is used.
+- Circuit breaker: after repeated failures calls fail straight away for a
+  while instead of waiting on timeouts, then a single probe request checks
+  whether the API has recovered.
+Both are off unless configured.
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+from typing import Callable, Optional
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of making a request while the circuit breaker is open
+    """
+
+
+class LatencyTracker:
+    """
+    Rolling window of recent request latencies per endpoint
+    """
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint: str, seconds: float) -> None:
+        with self._lock:
+            samples = self._samples.get(endpoint)
+            if samples is None:
+                samples = self._samples[endpoint] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def percentile(
+        self, endpoint: str, percentile: float, min_samples: int = 20
+    ) -> Optional[float]:
+        """
+        Latency in seconds below which percentile % of recent requests to
+        endpoint finished. None until there are min_samples samples.
+        """
+        with self._lock:
+            samples = sorted(self._samples.get(endpoint, ()))
+        if len(samples) < max(min_samples, 1):
+            return None
+        i = min(len(samples) - 1, int(len(samples) * percentile / 100))
+        return samples[i]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._samples.clear()
+
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive failures. While open, calls
+    raise CircuitOpenError. After recovery_time seconds one probe call is let
+    through: success closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = 5, recovery_time: float = 30):
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before_request(self) -> None:
+        """
+        Raise CircuitOpenError if a request shouldn't be made right now
+        """
+        with self._lock:
+            if self.state == "closed":
+                return
+            if self.state == "open":
+                if time.monotonic() - self._opened_at < self.recovery_time:
+                    raise CircuitOpenError(
+                        "Error, EZOfficeInventory circuit breaker is open after repeated failures"
+                    )
+                self.state = "half_open"
+                self._probing = False
+            if self._probing:
+                raise CircuitOpenError(
+                    "Error, EZOfficeInventory circuit breaker is waiting on a recovery probe"
+                )
+            self._probing = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = "closed"
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self.state == "half_open" or self._failures >= self.failure_threshold:
+                self.state = "open"
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+
+latencies = LatencyTracker()
+
+_breaker = None
+_hedging = None
+_hedge_executor = None
+_hedge_lock = threading.Lock()
+
+
+def configure_circuit_breaker(
+    failure_threshold: int = 5, recovery_time: float = 30
+) -> CircuitBreaker:
+    """
+    Fail fast after failure_threshold consecutive failed requests (connection
+    errors, timeouts, 5xx and 429 responses), probing again after
+    recovery_time seconds.
+    """
+    global _breaker
+    _breaker = CircuitBreaker(failure_threshold, recovery_time)
+    return _breaker
+
+
+def disable_circuit_breaker() -> None:
+    global _breaker
+    _breaker = None
+
+
+def configure_hedging(
+    percentile: float = 95, min_samples: int = 20, max_workers: int = 16
+) -> None:
+    """
+    Send a duplicate GET when the first one is slower than percentile % of
+    recent requests to the same endpoint. Nothing is hedged until an
+    endpoint has min_samples latency samples.
+    """
+    global _hedging, _hedge_executor
+    with _hedge_lock:
+        if _hedge_executor is not None:
+            _hedge_executor.shutdown(wait=False)
+        _hedge_executor = ThreadPoolExecutor(max_workers=max_workers)
+        _hedging = {"percentile": percentile, "min_samples": min_samples}
+
+
+def disable_hedging() -> None:
+    global _hedging, _hedge_executor
+    with _hedge_lock:
+        if _hedge_executor is not None:
+            _hedge_executor.shutdown(wait=False)
+        _hedge_executor = None
+        _hedging = None
+
+
+def _is_failure(response) -> bool:
+    return response.status_code >= 500 or response.status_code == 429
+
+
+def _attempt(
+    endpoint: str,
+    send: Callable,
+    admit: Optional[Callable] = None,
+    started: Optional[threading.Event] = None,
+):
+    """
+    Make one request. admit, if given, returns a context manager held around
+    it (a scheduler slot, rate limit tokens...). Only send itself is timed,
+    so latency samples don't include time spent queueing. started is set
+    once the request goes out (or admitting it failed).
+    """
+    try:
+        with admit() if admit is not None else nullcontext():
+            if started is not None:
+                started.set()
+            start = time.monotonic()
+            try:
+                response = send()
+            except Exception as e:
+                import requests
+
+                # A timeout is a latency sample too, leaving it out would make
+                # the endpoint look faster than it is
+                if isinstance(e, requests.Timeout):
+                    latencies.record(endpoint, time.monotonic() - start)
+                raise
+            latencies.record(endpoint, time.monotonic() - start)
+            return response
+    finally:
+        if started is not None:
+            started.set()
+
+
+def _close_response(future) -> None:
+    """
+    Done callback closing the response of a hedged attempt that lost, so a
+    streamed response gives its connection back to the pool
+    """
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+def _hedged(endpoint: str, send: Callable, admit: Optional[Callable] = None):
+    """
+    Run send, and a second copy of it if the first is slow once it has gone
+    out. Returns the first successful response, or raises if both attempts
+    failed.
+    """
+    with _hedge_lock:
+        executor = _hedge_executor
+        settings = _hedging
+
+    threshold = None
+    if executor is not None:
+        threshold = latencies.percentile(
+            endpoint, settings["percentile"], settings["min_samples"]
+        )
+    if threshold is None:
+        return _attempt(endpoint, send, admit)
+
+    started = threading.Event()
+    first = executor.submit(_attempt, endpoint, send, admit, started)
+    # Queueing for a slot or rate budget isn't slowness, only hedge on time
+    # spent waiting for the API
+    started.wait()
+    done, _ = wait([first], timeout=threshold)
+    if done:
+        return first.result()
+
+    second = executor.submit(_attempt, endpoint, send, admit)
+    pending = {first, second}
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                for loser in pending:
+                    loser.add_done_callback(_close_response)
+                for other in done - {future}:
+                    _close_response(other)
+                return future.result()
+            error = future.exception()
+    raise error
+
+
+def call(
+    endpoint: str,
+    send: Callable,
+    hedge: bool = False,
+    admit: Optional[Callable] = None,
+):
+    """
+    Make a request through the circuit breaker (if configured), recording its
+    latency under endpoint. send makes the request and returns the response.
+    admit, if given, returns a context manager to hold around each attempt
+    while it's sent, e.g. a scheduler slot; time spent entering it isn't
+    counted as latency. hedge allows duplicate requests, only for idempotent
+    calls.
+    """
+    breaker = _breaker
+    if breaker is not None:
+        breaker.before_request()
+
+    try:
+        if hedge:
+            response = _hedged(endpoint, send, admit)
+        else:
+            response = _attempt(endpoint, send, admit)
+    except Exception:
+        if breaker is not None:
+            breaker.record_failure()
+        raise
+
+    if breaker is not None:
+        if _is_failure(response):
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+
+    return response
@@ -0,0 +1,175 @@
+"""
+Priority scheduling of API calls.
+Calls are either "interactive" (the default) or "bulk". When a scheduler is
+configured, only max_concurrent calls are in flight at once and waiting
+interactive calls get the next free slot ahead of waiting bulk calls, so a
+background sync can't hold up user-facing lookups. Bulk calls are still
+guaranteed a minimum share of slots while both kinds are waiting.
+Rate limit tokens are taken while holding a slot, so the order calls get a
+slot in is also the order they spend the rate budget in. A call that finds
+the budget spent gives its slot back while it waits for the budget to refill.
+"""
+
+import functools
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Iterator, Literal, Optional
+
+PRIORITIES = ("interactive", "bulk")
+
+_local = threading.local()
+
+
+def current_priority() -> str:
+    """
+    Priority of calls made from the current thread
+    """
+    return getattr(_local, "priority", "interactive")
+
+
+@contextmanager
+def priority(name: Literal["interactive", "bulk"]) -> Iterator[None]:
+    """
+    Make calls in this thread with the given priority for the duration of the
+    with block:
+
+        with scheduler.priority("bulk"):
+            assets = get_all_assets()
+
+    Threads started inside the block (e.g. by a ThreadPoolExecutor) don't
+    inherit it; submit bind_priority(function) to run work at the caller's
+    priority.
+    """
+    if name not in PRIORITIES:
+        raise ValueError(f"priority must be one of {PRIORITIES}")
+    previous = current_priority()
+    _local.priority = name
+    try:
+        yield
+    finally:
+        _local.priority = previous
+
+
+def bind_priority(function: Callable) -> Callable:
+    """
+    Wrap function to run at the priority of the thread calling bind_priority,
+    whichever thread ends up running it:
+
+        with scheduler.priority("bulk"):
+            task = scheduler.bind_priority(update_asset)
+            futures = [executor.submit(task, i, payload) for i in ids]
+    """
+    name = current_priority()
+
+    @functools.wraps(function)
+    def run(*args, **kwargs):
+        with priority(name):
+            return function(*args, **kwargs)
+
+    return run
+
+
+class RequestScheduler:
+    """
+    Hands out up to max_concurrent slots, interactive callers first.
+    While both kinds are waiting, at least bulk_share of the slots handed out
+    go to bulk callers.
+    """
+
+    def __init__(self, max_concurrent: int = 8, bulk_share: float = 0.2):
+        if max_concurrent < 1:
+            raise ValueError("max_concurrent must be at least 1")
+        if not 0 < bulk_share <= 1:
+            raise ValueError("bulk_share must be greater than 0 and at most 1")
+        self.max_concurrent = max_concurrent
+        self.bulk_share = bulk_share
+        self._in_use = 0
+        self._waiting = {name: deque() for name in PRIORITIES}
+        # Interactive slots handed out while bulk was waiting
+        self._interactive_streak = 0
+        self._lock = threading.Lock()
+
+    def _next_class(self) -> Optional[str]:
+        interactive = self._waiting["interactive"]
+        bulk = self._waiting["bulk"]
+        if not bulk:
+            return "interactive" if interactive else None
+        if not interactive:
+            return "bulk"
+        if self._interactive_streak + 1 >= 1 / self.bulk_share:
+            return "bulk"
+        return "interactive"
+
+    def _grant(self) -> None:
+        """
+        Wake waiters while slots are free. Caller holds the lock.
+        """
+        while self._in_use < self.max_concurrent:
+            name = self._next_class()
+            if name is None:
+                return
+            if name == "bulk":
+                self._interactive_streak = 0
+            elif self._waiting["bulk"]:
+                self._interactive_streak += 1
+            self._in_use += 1
+            self._waiting[name].popleft().set()
+
+    def acquire(self, name: str) -> None:
+        ticket = threading.Event()
+        with self._lock:
+            self._waiting[name].append(ticket)
+            self._grant()
+        ticket.wait()
+
+    def release(self) -> None:
+        with self._lock:
+            self._in_use -= 1
+            self._grant()
+
+    @contextmanager
+    def slot(self, name: Optional[str] = None) -> Iterator[None]:
+        """
+        Hold a slot for the duration of the with block, at the current
+        thread's priority unless name is given
+        """
+        self.acquire(name or current_priority())
+        try:
+            yield
+        finally:
+            self.release()
+
+
+_scheduler = None
+
+
+def configure_scheduler(
+    max_concurrent: int = 8, bulk_share: float = 0.2
+) -> RequestScheduler:
+    """
+    Allow at most max_concurrent API calls in flight across all threads,
+    giving interactive calls priority and bulk calls at least bulk_share
+    of the slots when both are waiting
+    """
+    global _scheduler
+    _scheduler = RequestScheduler(max_concurrent, bulk_share)
+    return _scheduler
+
+
+def disable_scheduler() -> None:
+    global _scheduler
+    _scheduler = None
+
+
+@contextmanager
+def request_slot(name: Optional[str] = None) -> Iterator[None]:
+    """
+    Slot from the configured scheduler, or nothing if none is configured
+    """
+    scheduler = _scheduler
+    if scheduler is None:
+        yield
+        return
+    with scheduler.slot(name):
+        yield
@@ -0,0 +1,329 @@
+"""
+Payload schemas for every write endpoint.
+Each schema lists the required keys, the valid keys, key prefixes/patterns
+that are allowed on top of those (custom attributes etc.), allowed values
+and date formats. They're compiled once at import time, then used to
+validate and filter payloads before they're sent, one at a time or in bulk.
+"""
+
+import re
+from datetime import datetime
+from typing import Optional
+
+SCHEMAS = {
+    "create_asset": {
+        "noun": "asset",
+        "required": [
+            "fixed_asset[name]",
+            "fixed_asset[group_id]",
+            "fixed_asset[purchased_on]",
+        ],
+        "keys": [
+            "fixed_asset[name]",
+            "fixed_asset[description]",
+            "fixed_asset[group_id]",
+            "fixed_asset[sub_group_id]",
+            "fixed_asset[purchased_on]",
+            "fixed_asset[location_id]",
+            "fixed_asset[image_url]",
+            "fixed_asset[document_urls][]",
+            "fixed_asset[identifier]",
+        ],
+        "prefixes": ["cust_attr"],
+        "dates": {"fixed_asset[purchased_on]": "%m/%d/%Y"},
+    },
+    "update_asset": {
+        "noun": "asset",
+        "keys": [
+            "fixed_asset[name]",
+            "fixed_asset[description]",
+            "fixed_asset[group_id]",
+            "fixed_asset[sub_group_id]",
+            "fixed_asset[identifier]",
+            "fixed_asset[purchased_on]",
+            "fixed_asset[location_id]",
+            "fixed_asset[image_url]",
+            "fixed_asset[document_urls][]",
+        ],
+        "prefixes": ["cust_attr"],
+    },
+    "checkin_asset": {
+        "noun": "checkin",
+        "required": ["checkin_values[location_id]"],
+        "keys": [
+            "checkin_values[location_id]",
+            "checkin_values[comments]",
+        ],
+        "prefixes": ["checkin_values[c_attr_vals]"],
+    },
+    "checkout_asset": {
+        "noun": "checkout",
+        "keys": [
+            "checkout_values[location_id]",
+            "checkout_values[comments]",
+            "till",
+            "till_time",
+            "checkout_values[override_conflicting_reservations]",
+            "checkout_values[override_my_conflicting_reservations]",
+        ],
+        "prefixes": ["checkout_values[c_attr_vals]"],
+    },
+    "create_member": {
+        "noun": "member",
+        "required": [
+            "user[email]",
+            "user[first_name]",
+            "user[last_name]",
+            "user[role_id]",
+        ],
+        "keys": [
+            "user[email]",
+            "user[employee_id]",
+            "user[employee_identification_number]",
+            "user[role_id]",
+            "user[team_id]",
+            "user[user_listing_id]",
+            "user[first_name]",
+            "user[last_name]",
+            "user[address_name]",
+            "user[address]",
+            "user[address_line_2]",
+            "user[city]",
+            "user[state]",
+            "user[country]",
+            "user[phone_number]",
+            "user[fax]",
+            "user[login_enabled]",
+            "user[subscribed_to_emails]",
+            "skip_confirmation_email",
+        ],
+        "prefixes": ["user[custom_attributes]"],
+    },
+    "update_member": {
+        "noun": "member",
+        "keys": [
+            "user[email]",
+            "user[employee_id]",
+            "user[role_id]",
+            "user[team_id]",
+            "user[user_listing_id]",
+            "user[first_name]",
+            "user[last_name]",
+            "user[phone_number]",
+            "user[fax]",
+            "skip_confirmation_email",
+        ],
+        "prefixes": ["user[custom_attributes]"],
+    },
+    "create_location": {
+        "noun": "location",
+        "required": ["location[name]"],
+        "keys": [
+            "location[parent_id]",
+            "location[identification_number]",
+            "location[name]",
+            "location[city]",
+            "location[state]",
+            "location[zipcode]",
+            "location[street1]",
+            "location[street2]",
+            "location[status]",
+            "location[description]",
+        ],
+        "prefixes": ["location[custom_attributes]"],
+        "choices": {"location[status]": ["active", "inactive"]},
+    },
+    "update_location": {
+        "noun": "location",
+        "keys": [
+            "location[parent_id]",
+            "location[name]",
+            "location[city]",
+            "location[state]",
+            "location[zipcode]",
+            "location[street1]",
+            "location[street2]",
+            "location[status]",
+            "location[description]",
+        ],
+        "prefixes": ["location[custom_attributes]"],
+        "choices": {"location[status]": ["active", "inactive"]},
+    },
+    "create_work_order": {
+        "noun": "work_order",
+        "required": ["task[title]", "task[task_type]", "due_date"],
+        "keys": [
+            "task[title]",
+            "task[task_type]",
+            "task[task_type_id]",
+            "task[priority]",
+            "task[assigned_to_id]",
+            "task[reviewer_id]",
+            "task[mark_items_unavailable]",
+            "expected_start_date",
+            "expected_start_time",
+            "due_date",
+            "start_time",
+            "base_cost",
+            "inventory_ids",
+            "checklist_ids",
+            "associated_assets",
+            "custom_field_names",
+        ],
+        "prefixes": [
+            "task[custom_attributes]",
+            "linked_inventory_items",
+            "associated_checklists",
+        ],
+        "dates": {"due_date": "%m/%d/%Y"},
+    },
+    "add_work_log_to_work_order": {
+        "noun": "work_log",
+        "required": ["task_work_log[time_spent]", "task_work_log[user_id]"],
+        "keys": [
+            "task_work_log[time_spent]",
+            "task_work_log[user_id]",
+            "task_work_log[description]",
+            "task_work_log[resource_id]",
+            "task_work_log[resource_type]",
+            "started_on_date",
+            "started_on_time",
+            "ended_on_date",
+            "ended_on_time",
+        ],
+    },
+    "add_linked_inv_to_work_order": {
+        "noun": "linked_inv",
+        "required": ["inventory_id"],
+        "required_patterns": {
+            r"linked_inventory_items\[.*\]\[quantity\]": "linked_inv must have a key that matches the format linked_inventory_items[{Inventory#}][quantity]",
+        },
+        "keys": ["inventory_id"],
+        "patterns": [
+            r"linked_inventory_items\[.*\]\[(quantity|location_id|resource_id|resource_type)\]",
+        ],
+    },
+}
+
+
+class PayloadSchema:
+    """
+    A schema from SCHEMAS compiled for fast checks: valid keys as a frozenset,
+    prefixes as a tuple for a single startswith call and patterns merged
+    into one regex.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        noun: str,
+        keys: list[str],
+        required: Optional[list[str]] = None,
+        prefixes: Optional[list[str]] = None,
+        patterns: Optional[list[str]] = None,
+        required_patterns: Optional[dict[str, str]] = None,
+        choices: Optional[dict[str, list]] = None,
+        dates: Optional[dict[str, str]] = None,
+    ):
+        self.name = name
+        self.noun = noun
+        self.keys = frozenset(keys)
+        self.required = tuple(required or ())
+        self.prefixes = tuple(prefixes or ())
+        self.pattern = (
+            re.compile("|".join(f"(?:{p})" for p in patterns)) if patterns else None
+        )
+        self.required_patterns = [
+            (re.compile(pattern), message)
+            for pattern, message in (required_patterns or {}).items()
+        ]
+        self.choices = {
+            key: frozenset(values) for key, values in (choices or {}).items()
+        }
+        self.dates = dict(dates or {})
+
+    def is_valid_key(self, key: str) -> bool:
+        """
+        Whether a key would be sent to the API
+        """
+        return (
+            key in self.keys
+            or (self.prefixes and key.startswith(self.prefixes))
+            or (self.pattern is not None and self.pattern.fullmatch(key) is not None)
+        )
+
+    def validate(self, payload: dict) -> dict:
+        """
+        Check a payload, raising ValueError if it's missing required keys or
+        has a bad value. Returns the payload with any invalid keys removed.
+        """
+        for key in self.required:
+            if key not in payload:
+                raise ValueError(f"{self.noun} must have '{key}' key")
+
+        for pattern, message in self.required_patterns:
+            if not any(pattern.fullmatch(key) for key in payload):
+                raise ValueError(message)
+
+        for key, date_format in self.dates.items():
+            if key in payload:
+                try:
+                    datetime.strptime(payload[key], date_format)
+                except (TypeError, ValueError):
+                    raise ValueError(
+                        f"{self.noun}['{key}'] must be in the format "
+                        + date_format.replace("%m", "mm")
+                        .replace("%d", "dd")
+                        .replace("%Y", "yyyy")
+                    )
+
+        for key, values in self.choices.items():
+            if key in payload and payload[key] not in values:
+                raise ValueError(
+                    f"{self.noun}['{key}'] must be one of "
+                    + ", ".join(f"'{value}'" for value in sorted(values))
+                )
+
+        return {k: v for k, v in payload.items() if self.is_valid_key(k)}
+
+
+_compiled = {name: PayloadSchema(name, **spec) for name, spec in SCHEMAS.items()}
+
+
+def get_schema(name: str) -> PayloadSchema:
+    """
+    The compiled schema for a write function, e.g. 'create_asset'
+    """
+    if name not in _compiled:
+        raise ValueError(
+            "name must be one of " + ", ".join(f"'{n}'" for n in sorted(_compiled))
+        )
+    return _compiled[name]
+
+
+def validate_payload(name: str, payload: dict) -> dict:
+    """
+    Validate a payload for a write function (e.g. 'create_asset'). Raises
+    ValueError on a bad payload, returns it with invalid keys removed.
+    """
+    return get_schema(name).validate(payload)
+
+
+def validate_payloads(name: str, payloads: list[dict]) -> tuple[list[dict], dict]:
+    """
+    Validate many payloads for the same write function up front, so bad rows
+    can be rejected before any API call is made.
+    Returns the cleaned valid payloads (in order) and a dict of row index ->
+    error message for the rows that failed.
+    """
+    schema = get_schema(name)
+    valid = []
+    errors = {}
+
+    for i, payload in enumerate(payloads):
+        try:
+            valid.append(schema.validate(payload))
+        except ValueError as e:
+            errors[i] = str(e)
+
+    return valid, errors
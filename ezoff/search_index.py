@@ -0,0 +1,222 @@
+"""
+Local full-text search over assets.
+Built from one full asset pull, then kept up to date from the create,
+update and delete calls made through ezoff. Unlike search_for_asset,
+results are complete and no API call is made per search.
+"""
+
+import re
+import threading
+from typing import Optional
+
+from ezoff import events
+from ezoff.assets import apply_asset_payload, get_all_assets
+
+_TOKEN = re.compile(r"\w+")
+
+SEARCH_FIELDS = ["name", "identifier", "description"]
+
+# Prefixes up to this length get their own posting list, longer query words
+# are checked against the tokens of the assets matching their first
+# MAX_PREFIX characters
+MAX_PREFIX = 10
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Lowercased word tokens of a piece of text
+    """
+    return _TOKEN.findall(text.lower())
+
+
+def _normalize_id(value):
+    """
+    Digit strings and ints name the same asset, index them as ints
+    """
+    if isinstance(value, str) and value.strip().isdigit():
+        return int(value)
+    return value
+
+
+def _response_record(response, id_key: str) -> Optional[dict]:
+    """
+    Asset record out of a create_asset / update_asset response, if there is one
+    """
+    if not isinstance(response, dict):
+        return None
+    if isinstance(response.get("asset"), dict):
+        response = response["asset"]
+    if id_key in response:
+        return response
+    return None
+
+
+class AssetSearchIndex:
+    """
+    Inverted index of asset tokens (name, identifier, description and custom
+    field values). Every query word is matched as a prefix, so 'lap dell'
+    finds 'Laptop - Dell Latitude 5440'. All words have to match.
+    Postings are kept per token prefix, so a query word is one lookup however
+    many tokens start with it.
+    """
+
+    def __init__(
+        self, assets: Optional[list[dict]] = None, id_key: str = "sequence_num"
+    ):
+        self.id_key = id_key
+        self.assets = {}
+        self._postings = {}
+        self._asset_tokens = {}
+        self._asset_prefixes = {}
+        self._subscribed = False
+        # Writes can come in from the threads making API calls
+        self._lock = threading.RLock()
+
+        for asset in assets or []:
+            self._index(asset)
+
+    @classmethod
+    def from_api(cls, id_key: str = "sequence_num") -> "AssetSearchIndex":
+        """
+        Build the index from get_all_assets and start following changes
+        """
+        index = cls(get_all_assets(), id_key)
+        index.subscribe()
+        return index
+
+    def __len__(self) -> int:
+        return len(self.assets)
+
+    def _text(self, asset: dict) -> set[str]:
+        parts = [str(asset.get(field) or "") for field in SEARCH_FIELDS]
+        custom_fields = asset.get("custom_fields") or []
+        if isinstance(custom_fields, dict):
+            parts.extend(str(v) for v in custom_fields.values() if v is not None)
+        else:
+            for field in custom_fields:
+                if isinstance(field, dict) and field.get("value") is not None:
+                    parts.append(str(field["value"]))
+        return set(tokenize(" ".join(parts)))
+
+    def _index(self, asset: dict) -> None:
+        asset_id = _normalize_id(asset[self.id_key])
+        self.remove(asset_id)
+
+        tokens = self._text(asset)
+        prefixes = {
+            token[:n]
+            for token in tokens
+            for n in range(1, min(len(token), MAX_PREFIX) + 1)
+        }
+        for prefix in prefixes:
+            self._postings.setdefault(prefix, set()).add(asset_id)
+
+        self.assets[asset_id] = asset
+        self._asset_tokens[asset_id] = tokens
+        self._asset_prefixes[asset_id] = prefixes
+
+    def add(self, asset: dict) -> None:
+        """
+        Index an asset, replacing what was indexed for it before
+        """
+        with self._lock:
+            self._index(asset)
+
+    def remove(self, asset_id) -> None:
+        """
+        Drop an asset from the index
+        """
+        asset_id = _normalize_id(asset_id)
+        with self._lock:
+            prefixes = self._asset_prefixes.pop(asset_id, None)
+            if prefixes is None:
+                return
+            self.assets.pop(asset_id, None)
+            self._asset_tokens.pop(asset_id, None)
+
+            for prefix in prefixes:
+                ids = self._postings[prefix]
+                ids.discard(asset_id)
+                if not ids:
+                    del self._postings[prefix]
+
+    def update(self, asset_id, asset: dict) -> None:
+        """
+        Apply a create_asset / update_asset style payload to an indexed asset
+        """
+        asset_id = _normalize_id(asset_id)
+        with self._lock:
+            current = self.assets.get(asset_id)
+            if current is None:
+                return
+            self._index(apply_asset_payload(current, asset))
+
+    def _prefix_ids(self, prefix: str) -> set:
+        ids = self._postings.get(prefix[:MAX_PREFIX], set())
+        if len(prefix) <= MAX_PREFIX:
+            return ids
+        return {
+            asset_id
+            for asset_id in ids
+            if any(token.startswith(prefix) for token in self._asset_tokens[asset_id])
+        }
+
+    def search(self, query: str, limit: Optional[int] = None) -> list[dict]:
+        """
+        Assets matching every word of query, ordered by asset id
+        """
+        words = sorted(set(tokenize(query)), key=len, reverse=True)
+        if not words:
+            return []
+
+        with self._lock:
+            result = None
+            for word in words:
+                ids = self._prefix_ids(word)
+                result = ids if result is None else result & ids
+                if not result:
+                    return []
+
+            matches = sorted(result)
+            if limit is not None:
+                matches = matches[:limit]
+            return [self.assets[asset_id] for asset_id in matches]
+
+    def _on_created(self, asset: dict, response) -> None:
+        record = _response_record(response, self.id_key)
+        if record is not None:
+            self.add(apply_asset_payload(record, asset))
+
+    def _on_updated(self, asset_id, asset: dict, response) -> None:
+        record = _response_record(response, self.id_key)
+        if record is None:
+            self.update(asset_id, asset)
+            return
+        with self._lock:
+            merged = dict(self.assets.get(_normalize_id(record[self.id_key]), {}))
+            merged.update(record)
+            self._index(apply_asset_payload(merged, asset))
+
+    def _on_deleted(self, asset_id, response) -> None:
+        self.remove(asset_id)
+
+    def subscribe(self) -> None:
+        """
+        Keep the index up to date with assets created, updated or deleted
+        through ezoff
+        """
+        if self._subscribed:
+            return
+        events.subscribe("asset_created", self._on_created)
+        events.subscribe("asset_updated", self._on_updated)
+        events.subscribe("asset_deleted", self._on_deleted)
+        self._subscribed = True
+
+    def unsubscribe(self) -> None:
+        """
+        Stop following changes
+        """
+        events.unsubscribe("asset_created", self._on_created)
+        events.unsubscribe("asset_updated", self._on_updated)
+        events.unsubscribe("asset_deleted", self._on_deleted)
+        self._subscribed = False
@@ -0,0 +1,320 @@
+"""
+Read-only asset dataset in a memory-mapped file, shared between processes.
+Instead of every worker holding its own get_all_assets list, one file holds
+the records as JSON next to a sorted fixed-width id index. Each process maps
+it, so the OS keeps a single copy in the page cache; lookups binary search
+the index in place and only decode the record asked for.
+
+A new version is written to a temporary file and moved over the old one, so
+readers see either the old or the new file, never half of one. Readers
+notice the new file on their next lookup (after check_interval) and map it.
+"""
+
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from typing import Iterable, Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+MAGIC = b"EZOSTOR1"
+# magic, record count, time the file was built
+_HEADER = struct.Struct("<8sQd")
+# id, offset from the start of the record data, length
+_ENTRY = struct.Struct("<qQI")
+
+
+def _normalize_id(value) -> int:
+    """
+    Index entries are 64-bit ints, ids given as strings of digits are allowed
+    """
+    if isinstance(value, str) and value.strip().isdigit():
+        return int(value)
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError(f"asset id must be an integer, got {value!r}")
+    return value
+
+
+def write_asset_store(
+    path: str, assets: Iterable[dict], id_key: str = "sequence_num"
+) -> int:
+    """
+    Write assets to a store file at path, atomically replacing any existing
+    one. Returns the number of records written.
+    """
+    records = {}
+    for asset in assets:
+        records[_normalize_id(asset[id_key])] = json.dumps(
+            asset, separators=(",", ":"), default=str
+        ).encode()
+    ids = sorted(records)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        # mkstemp creates the file 0600, readers may run as other users
+        os.chmod(tmp, 0o644)
+        with os.fdopen(fd, "wb") as f:
+            f.write(_HEADER.pack(MAGIC, len(ids), time.time()))
+            offset = 0
+            for record_id in ids:
+                f.write(_ENTRY.pack(record_id, offset, len(records[record_id])))
+                offset += len(records[record_id])
+            for record_id in ids:
+                f.write(records[record_id])
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    return len(ids)
+
+
+class _MappedFile:
+    """
+    One version of the store file, mapped read-only
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            self.version = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count, self.built_at = _HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC:
+            self.map.close()
+            raise ValueError(f"{path} is not an asset store file")
+        self.data_start = _HEADER.size + self.count * _ENTRY.size
+
+    def entry(self, position: int) -> tuple[int, int, int]:
+        return _ENTRY.unpack_from(self.map, _HEADER.size + position * _ENTRY.size)
+
+    def find(self, record_id: int) -> Optional[int]:
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self.entry(middle)[0] < record_id:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.count and self.entry(low)[0] == record_id:
+            return low
+        return None
+
+    def record(self, position: int) -> dict:
+        _, offset, length = self.entry(position)
+        start = self.data_start + offset
+        return json.loads(self.map[start : start + length])
+
+
+class SharedAssetStore:
+    """
+    Read-only view of an asset store file. Cheap to open in every worker.
+
+        store = SharedAssetStore("/var/lib/app/assets.store")
+        asset = store.get(1234)
+
+    Every check_interval seconds a lookup checks whether the file has been
+    replaced and, if so, maps the new version.
+    """
+
+    def __init__(self, path: str, check_interval: float = 5):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._file = _MappedFile(path)
+        self._checked_at = time.monotonic()
+
+    def __enter__(self) -> "SharedAssetStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _current(self) -> _MappedFile:
+        if time.monotonic() - self._checked_at >= self.check_interval:
+            self.reload()
+        return self._file
+
+    def reload(self) -> bool:
+        """
+        Map the file again if it has been replaced. Returns True if it had.
+        """
+        with self._lock:
+            self._checked_at = time.monotonic()
+            try:
+                stat = os.stat(self.path)
+            except FileNotFoundError:
+                return False
+            if (stat.st_ino, stat.st_mtime_ns, stat.st_size) == self._file.version:
+                return False
+            # The old map is left for the garbage collector, other threads
+            # may still be reading from it
+            self._file = _MappedFile(self.path)
+            return True
+
+    @property
+    def built_at(self) -> float:
+        """
+        When the mapped version was written, as a Unix timestamp
+        """
+        return self._current().built_at
+
+    def __len__(self) -> int:
+        return self._current().count
+
+    def __contains__(self, asset_id) -> bool:
+        try:
+            record_id = _normalize_id(asset_id)
+        except ValueError:
+            # Like a dict, a key that can't be in the store just isn't in it
+            return False
+        return self._current().find(record_id) is not None
+
+    def __getitem__(self, asset_id) -> dict:
+        try:
+            record_id = _normalize_id(asset_id)
+        except ValueError:
+            raise KeyError(asset_id) from None
+        mapped = self._current()
+        position = mapped.find(record_id)
+        if position is None:
+            raise KeyError(asset_id)
+        return mapped.record(position)
+
+    def get(self, asset_id, default=None) -> Optional[dict]:
+        try:
+            return self[asset_id]
+        except KeyError:
+            return default
+
+    def ids(self) -> Iterator[int]:
+        mapped = self._current()
+        for position in range(mapped.count):
+            yield mapped.entry(position)[0]
+
+    def __iter__(self) -> Iterator[dict]:
+        """
+        Every asset in id order, decoded one at a time
+        """
+        mapped = self._current()
+        for position in range(mapped.count):
+            yield mapped.record(position)
+
+    def close(self) -> None:
+        self._file.map.close()
+
+
+def _try_lock(fd: int) -> bool:
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
+
+
+def _unlock(fd: int) -> None:
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+class StoreRefresher:
+    """
+    Background thread rewriting the store file from get_all_assets every
+    interval seconds.
+
+        refresher = StoreRefresher("/var/lib/app/assets.store", interval=900)
+        refresher.start()
+
+    Safe to start in every worker: a lock file makes sure only one process
+    pulls at a time, and a file already refreshed within the interval is left
+    alone. A pull with a failed page raises IncompletePullError and leaves
+    the file as it is.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        interval: float = 900,
+        per_page: Optional[int] = None,
+    ):
+        self.path = path
+        self.interval = interval
+        self.per_page = per_page
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _age(self) -> Optional[float]:
+        try:
+            with open(self.path, "rb") as f:
+                magic, _, built_at = _HEADER.unpack(f.read(_HEADER.size))
+        except (FileNotFoundError, struct.error):
+            return None
+        if magic != MAGIC:
+            return None
+        return time.time() - built_at
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        Pull every asset and replace the store file. Returns False if another
+        process is refreshing it or (unless force) it is still fresh.
+        """
+        from ezoff.assets import iter_all_asset_records
+
+        fd = os.open(self.path + ".lock", os.O_RDWR | os.O_CREAT, 0o666)
+        try:
+            if not _try_lock(fd):
+                return False
+            try:
+                age = self._age()
+                if not force and age is not None and age < self.interval:
+                    return False
+                # Raises IncompletePullError before anything is written if a
+                # page fails
+                assets = list(iter_all_asset_records(self.per_page))
+                write_asset_store(self.path, assets)
+                return True
+            finally:
+                _unlock(fd)
+        finally:
+            os.close(fd)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                print("Error, could not refresh the asset store: ", e)
+            age = self._age()
+            wait = self.interval if age is None else max(self.interval - age, 1)
+            self._stop.wait(wait)
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
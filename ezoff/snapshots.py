@@ -0,0 +1,453 @@
+"""
+Compressed archive of daily snapshots of assets, members and locations.
+Each day is one file: either a full snapshot, or a delta holding only the
+records added, changed or removed since the last full snapshot. Records are
+sorted by id and stored in small compressed blocks with an index at the end
+of the file, so looking up one record on one day decodes at most two blocks.
+
+Blocks are encoded with msgpack and compressed with zstd when those are
+installed (pip install ezoff[snapshots]), otherwise JSON and zlib are used.
+Each file records which it was written with.
+"""
+
+import bisect
+import datetime
+import hashlib
+import json
+import os
+import struct
+import tempfile
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Iterable, Iterator, Literal, Optional, Union
+
+MAGIC = b"EZOSNAP1"
+TRAILER = struct.Struct(">Q")
+
+ENTITIES = ["assets", "members", "locations"]
+
+ID_KEYS = {
+    "assets": "sequence_num",
+    "members": "id",
+    "locations": "id",
+}
+
+Day = Union[datetime.date, str, None]
+
+
+def _day(day: Day) -> str:
+    if day is None:
+        return datetime.date.today().isoformat()
+    if isinstance(day, datetime.date):
+        return day.isoformat()
+    return datetime.date.fromisoformat(day).isoformat()
+
+
+def _sort_key(record_id) -> tuple:
+    """
+    Ids are mostly ints but not always, keep them apart so they still sort
+    """
+    if isinstance(record_id, int):
+        return (0, record_id)
+    return (1, str(record_id))
+
+
+def _hash(record) -> bytes:
+    encoded = json.dumps(record, sort_keys=True, default=str).encode()
+    return hashlib.blake2b(encoded, digest_size=16).digest()
+
+
+def _import_msgpack():
+    try:
+        import msgpack
+    except ImportError:
+        raise ImportError(
+            "msgpack is required to read this snapshot, install with 'pip install ezoff[snapshots]'"
+        )
+    return msgpack
+
+
+def _import_zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError(
+            "zstandard is required to read this snapshot, install with 'pip install ezoff[snapshots]'"
+        )
+    return zstandard
+
+
+def _best_codec() -> tuple[str, str]:
+    try:
+        _import_msgpack()
+        _import_zstandard()
+    except ImportError:
+        return "json", "zlib"
+    return "msgpack", "zstd"
+
+
+def _encode(items: list, encoding: str, compression: str) -> bytes:
+    if encoding == "msgpack":
+        data = _import_msgpack().packb(items, default=str)
+    else:
+        data = json.dumps(items, default=str, separators=(",", ":")).encode()
+    if compression == "zstd":
+        return _import_zstandard().ZstdCompressor(level=10).compress(data)
+    return zlib.compress(data, 9)
+
+
+def _decode(data: bytes, encoding: str, compression: str) -> list:
+    if compression == "zstd":
+        data = _import_zstandard().ZstdDecompressor().decompress(data)
+    else:
+        data = zlib.decompress(data)
+    if encoding == "msgpack":
+        return _import_msgpack().unpackb(data, strict_map_key=False)
+    return json.loads(data)
+
+
+class _SnapshotFile:
+    """
+    One day's file: the header and block index, read once, and the blocks,
+    read on demand
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a snapshot file")
+            f.seek(-(TRAILER.size + len(MAGIC)), os.SEEK_END)
+            (index_offset,) = TRAILER.unpack(f.read(TRAILER.size))
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is incomplete")
+            end = f.seek(-(TRAILER.size + len(MAGIC)), os.SEEK_END)
+            f.seek(index_offset)
+            self.header = json.loads(f.read(end - index_offset))
+        self.kind = self.header["kind"]
+        self.base = self.header.get("base")
+        self.count = self.header["count"]
+        self.blocks = self.header["blocks"]
+        self._first_keys = [tuple(block[0]) for block in self.blocks]
+
+    def read_block(self, number: int) -> list:
+        _, offset, length = self.blocks[number]
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            data = f.read(length)
+        return _decode(data, self.header["encoding"], self.header["compression"])
+
+    def block_for(self, record_id) -> Optional[int]:
+        number = bisect.bisect_right(self._first_keys, _sort_key(record_id)) - 1
+        return number if number >= 0 else None
+
+
+def _write_file(
+    path: str,
+    header: dict,
+    items: list,
+    block_size: int,
+    encoding: str,
+    compression: str,
+) -> None:
+    """
+    Write (id, record) items, sorted by id, in blocks followed by the index.
+    Written to a temporary file of its own and moved into place, so readers
+    never see half a file and concurrent writers don't share one.
+    """
+    blocks = []
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(MAGIC)
+            for start in range(0, len(items), block_size):
+                block = items[start : start + block_size]
+                data = _encode(block, encoding, compression)
+                blocks.append([list(_sort_key(block[0][0])), f.tell(), len(data)])
+                f.write(data)
+            index_offset = f.tell()
+            header = dict(
+                header,
+                encoding=encoding,
+                compression=compression,
+                count=len(items),
+                blocks=blocks,
+            )
+            f.write(json.dumps(header).encode())
+            f.write(TRAILER.pack(index_offset) + MAGIC)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+class SnapshotArchive:
+    """
+    Directory of daily snapshots, one subdirectory per entity.
+
+        archive = SnapshotArchive("snapshots")
+        archive.snapshot()                          # today's assets, members, locations
+        archive.get("assets", 1234, "2024-03-01")   # asset 1234 as of that day
+
+    A day is stored as a delta against the latest full snapshot before it.
+    A new full snapshot is written when the last one is full_every days old,
+    or when the delta would hold more than max_delta_ratio of its records.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        full_every: int = 30,
+        max_delta_ratio: float = 0.5,
+        block_size: int = 256,
+        cache_blocks: int = 64,
+    ):
+        if block_size < 1:
+            raise ValueError("block_size must be at least 1")
+        self.path = path
+        self.full_every = full_every
+        self.max_delta_ratio = max_delta_ratio
+        self.block_size = block_size
+        self.cache_blocks = cache_blocks
+        self._files = {}
+        self._blocks = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+
+    def _entity_dir(self, entity: str) -> str:
+        if entity not in ENTITIES:
+            raise ValueError(f"entity must be one of {ENTITIES}")
+        return os.path.join(self.path, entity)
+
+    def _file(self, entity: str, day: str) -> _SnapshotFile:
+        path = os.path.join(self._entity_dir(entity), day + ".snap")
+        with self._lock:
+            snapshot = self._files.get(path)
+        if snapshot is None:
+            snapshot = _SnapshotFile(path)
+            with self._lock:
+                self._files[path] = snapshot
+        return snapshot
+
+    def _block(self, snapshot: _SnapshotFile, number: int) -> dict:
+        """
+        Decoded block as an id -> record dict, keeping recently used ones
+        """
+        key = (snapshot.path, number)
+        with self._lock:
+            block = self._blocks.get(key)
+            if block is not None:
+                self._blocks.move_to_end(key)
+                return block
+        block = {record_id: record for record_id, record in snapshot.read_block(number)}
+        with self._lock:
+            self._blocks[key] = block
+            while len(self._blocks) > self.cache_blocks:
+                self._blocks.popitem(last=False)
+        return block
+
+    def days(self, entity: str) -> list[str]:
+        """
+        Days with a snapshot, oldest first, as 'YYYY-MM-DD'
+        """
+        directory = self._entity_dir(entity)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(
+            name.removesuffix(".snap")
+            for name in os.listdir(directory)
+            if name.endswith(".snap")
+        )
+
+    def _day_for(self, entity: str, day: Day) -> str:
+        """
+        Latest snapshot day on or before day
+        """
+        day = _day(day)
+        days = self.days(entity)
+        position = bisect.bisect_right(days, day)
+        if position == 0:
+            raise KeyError(f"no {entity} snapshot on or before {day}")
+        return days[position - 1]
+
+    def _lookup(self, snapshot: _SnapshotFile, record_id):
+        """
+        (found, record) for record_id in one file. Deleted records are found
+        with a record of None in deltas.
+        """
+        number = snapshot.block_for(record_id)
+        if number is None:
+            return False, None
+        block = self._block(snapshot, number)
+        if record_id in block:
+            return True, block[record_id]
+        return False, None
+
+    def get(self, entity: str, record_id, day: Day = None) -> Optional[dict]:
+        """
+        Record as it was on day (the latest snapshot on or before it), None
+        if it didn't exist then
+        """
+        if isinstance(record_id, str) and record_id.isdigit():
+            record_id = int(record_id)
+        snapshot = self._file(entity, self._day_for(entity, day))
+        found, record = self._lookup(snapshot, record_id)
+        if found or snapshot.kind == "full":
+            return record
+        return self._lookup(self._file(entity, snapshot.base), record_id)[1]
+
+    def _items(self, snapshot: _SnapshotFile) -> Iterator[tuple]:
+        for number in range(len(snapshot.blocks)):
+            for record_id, record in snapshot.read_block(number):
+                yield record_id, record
+
+    def records(self, entity: str, day: Day = None) -> Iterator[dict]:
+        """
+        Every record as it was on day, in id order. Reads a block at a time.
+        """
+        for _, record in self._state(entity, self._day_for(entity, day)):
+            yield record
+
+    def _state(self, entity: str, day: str) -> Iterator[tuple]:
+        """
+        (id, record) for every record on day, merging a delta into its base
+        """
+        snapshot = self._file(entity, day)
+        if snapshot.kind == "full":
+            yield from self._items(snapshot)
+            return
+
+        base = self._items(self._file(entity, snapshot.base))
+        delta = self._items(snapshot)
+        base_item = next(base, None)
+        delta_item = next(delta, None)
+        while base_item is not None or delta_item is not None:
+            if delta_item is None or (
+                base_item is not None
+                and _sort_key(base_item[0]) < _sort_key(delta_item[0])
+            ):
+                yield base_item
+                base_item = next(base, None)
+                continue
+            if base_item is not None and base_item[0] == delta_item[0]:
+                base_item = next(base, None)
+            if delta_item[1] is not None:
+                yield delta_item
+            delta_item = next(delta, None)
+
+    def _base_for(self, entity: str, day: str) -> Optional[str]:
+        """
+        Latest full snapshot before day
+        """
+        for previous in reversed(self.days(entity)):
+            if previous < day and self._file(entity, previous).kind == "full":
+                return previous
+        return None
+
+    def write(
+        self,
+        entity: Literal["assets", "members", "locations"],
+        records: Iterable[dict],
+        day: Day = None,
+        id_key: Optional[str] = None,
+        full: bool = False,
+    ) -> dict:
+        """
+        Store records as the state of entity on day (today by default).
+        Also how to load existing JSON dumps into the archive, oldest first.
+        records must be the complete set, anything missing is recorded as
+        deleted that day.
+        Returns a summary of what was written.
+        """
+        directory = self._entity_dir(entity)
+        day = _day(day)
+        id_key = id_key or ID_KEYS[entity]
+        if day in self.days(entity):
+            raise ValueError(f"there is already a {entity} snapshot for {day}")
+        os.makedirs(directory, exist_ok=True)
+
+        current = {}
+        for record in records:
+            current[record[id_key]] = record
+        ids = sorted(current, key=_sort_key)
+
+        base = None if full else self._base_for(entity, day)
+        if base is not None:
+            age = datetime.date.fromisoformat(day) - datetime.date.fromisoformat(base)
+            if age.days >= self.full_every:
+                base = None
+
+        items = None
+        if base is not None:
+            base_hashes = {
+                record_id: _hash(record)
+                for record_id, record in self._items(self._file(entity, base))
+            }
+            items = [
+                (record_id, current[record_id])
+                for record_id in ids
+                if base_hashes.pop(record_id, None) != _hash(current[record_id])
+            ]
+            items.extend((record_id, None) for record_id in base_hashes)
+            items.sort(key=lambda item: _sort_key(item[0]))
+            if len(items) > self.max_delta_ratio * max(len(current), 1):
+                base = None
+                items = None
+
+        if items is None:
+            items = [(record_id, current[record_id]) for record_id in ids]
+
+        encoding, compression = _best_codec()
+        header = {
+            "entity": entity,
+            "day": day,
+            "kind": "full" if base is None else "delta",
+        }
+        if base is not None:
+            header["base"] = base
+        path = os.path.join(directory, day + ".snap")
+        _write_file(path, header, items, self.block_size, encoding, compression)
+
+        return {
+            "entity": entity,
+            "day": day,
+            "kind": header["kind"],
+            "base": base,
+            "records": len(current),
+            "stored": len(items),
+            "bytes": os.path.getsize(path),
+        }
+
+    def snapshot(
+        self,
+        entities: Optional[list[str]] = None,
+        day: Day = None,
+        per_page: Optional[int] = None,
+    ) -> list[dict]:
+        """
+        Pull every record of each entity (all three by default) and store
+        them as day's snapshot. Each pull has to finish before anything is
+        written: if a page fails, IncompletePullError is raised and no
+        snapshot is stored for that entity, rather than one recording
+        deletions that never happened.
+        """
+        from ezoff.assets import iter_all_asset_records
+        from ezoff.locations import iter_location_pages
+        from ezoff.members import iter_member_records
+
+        results = []
+        for entity in entities or ENTITIES:
+            if entity == "assets":
+                records = list(iter_all_asset_records(per_page))
+            elif entity == "members":
+                records = list(iter_member_records(None, per_page))
+            else:
+                records = [
+                    r for page in iter_location_pages(None, per_page) for r in page
+                ]
+            results.append(self.write(entity, records, day))
+        return results
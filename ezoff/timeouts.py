@@ -0,0 +1,90 @@
+"""
+Request timeouts per endpoint.
+The default comes from EZO_TIMEOUT (10 seconds if not set). configure_timeouts
+sets a default and timeouts for single endpoints, and can make them adaptive:
+derived from the latency recently observed for each endpoint, so slow but
+healthy calls (large pages) get longer and calls that hang are given up on
+sooner. get_timeout returns the timeout for an endpoint.
+"""
+
+import os
+import threading
+from typing import Optional
+
+from ezoff import resilience
+
+DEFAULT_TIMEOUT = 10
+
+_lock = threading.Lock()
+_settings = None
+
+
+def configure_timeouts(
+    default: float = DEFAULT_TIMEOUT,
+    per_endpoint: Optional[dict] = None,
+    adaptive: bool = False,
+    percentile: float = 99,
+    multiplier: float = 3,
+    minimum: float = 2,
+    maximum: float = 120,
+    min_samples: int = 20,
+) -> None:
+    """
+    Set the timeout (seconds) used for requests.
+    per_endpoint maps an endpoint path ('assets', 'locations/:id/activate',
+    see transport.endpoint_path) to its own timeout. A path's first segment
+    ('locations') covers everything under it that has no entry of its own.
+    With adaptive, once an endpoint has min_samples latency samples its
+    timeout becomes multiplier times the given latency percentile, kept
+    between minimum and maximum. Until then the fixed timeout is used.
+    Samples only time the HTTP call, so a backlog of calls waiting on the
+    scheduler or rate limit doesn't stretch timeouts.
+    """
+    global _settings
+    with _lock:
+        _settings = {
+            "default": default,
+            "per_endpoint": dict(per_endpoint or {}),
+            "adaptive": adaptive,
+            "percentile": percentile,
+            "multiplier": multiplier,
+            "minimum": minimum,
+            "maximum": maximum,
+            "min_samples": min_samples,
+        }
+
+
+def _get_settings() -> dict:
+    global _settings
+    with _lock:
+        if _settings is None:
+            _settings = {
+                "default": float(os.environ.get("EZO_TIMEOUT", DEFAULT_TIMEOUT)),
+                "per_endpoint": {},
+                "adaptive": False,
+            }
+        return _settings
+
+
+def get_timeout(endpoint: str) -> float:
+    """
+    Timeout in seconds for a request to endpoint (an endpoint path)
+    """
+    settings = _get_settings()
+    per_endpoint = settings["per_endpoint"]
+
+    timeout = per_endpoint.get(endpoint)
+    if timeout is None:
+        timeout = per_endpoint.get(endpoint.split("/", 1)[0], settings["default"])
+
+    if settings["adaptive"]:
+        observed = resilience.latencies.percentile(
+            endpoint, settings["percentile"], settings["min_samples"]
+        )
+        if observed is not None:
+            timeout = min(
+                settings["maximum"],
+                max(settings["minimum"], observed * settings["multiplier"]),
+            )
+
+    return timeout
@@ -0,0 +1,196 @@
+"""
+CPU-heavy post-processing of large pulls in a process pool.
+Flattening custom fields, normalising dates and mapping ids to names is pure
+Python, so threads don't help; these functions spread the work over worker
+processes instead. Records are sent in batches to keep pickling overhead
+low, the transform itself is sent once per worker, and results come back in
+the order they went in.
+
+Transforms run in other processes, so they must be picklable: module-level
+functions, functools.partial of them, or Chain.
+"""
+
+import datetime
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterable, Iterator, Optional
+
+# Formats tried, in order, for values that aren't ISO 8601 already
+DATE_FORMATS = [
+    "%m/%d/%Y",
+    "%m/%d/%Y %H:%M",
+    "%m/%d/%Y %I:%M %p",
+    "%Y/%m/%d",
+    "%d %b %Y",
+    "%b %d, %Y",
+]
+
+DATE_SUFFIXES = ("_at", "_on", "_date", "date")
+
+_worker_transform = None
+
+
+def _parse_date(value: str) -> Optional[str]:
+    try:
+        return datetime.datetime.fromisoformat(value).isoformat()
+    except ValueError:
+        pass
+    for date_format in DATE_FORMATS:
+        try:
+            parsed = datetime.datetime.strptime(value, date_format)
+        except ValueError:
+            continue
+        if "%H" in date_format or "%I" in date_format:
+            return parsed.isoformat()
+        return parsed.date().isoformat()
+    return None
+
+
+def normalize_dates(record: dict, fields: Optional[Iterable[str]] = None) -> dict:
+    """
+    Copy of record with date values rewritten as ISO 8601. Looks at fields,
+    or by default every field ending in _at, _on, _date or date. Values that
+    can't be parsed are left as they are.
+    """
+    normalized = dict(record)
+    names = fields if fields is not None else normalized
+    for name in list(names):
+        value = normalized.get(name)
+        if fields is None and not name.endswith(DATE_SUFFIXES):
+            continue
+        if isinstance(value, str) and value:
+            parsed = _parse_date(value.strip())
+            if parsed is not None:
+                normalized[name] = parsed
+    return normalized
+
+
+def map_ids(record: dict, names: dict) -> dict:
+    """
+    Copy of record with names added for ids. names maps an id field to an
+    id -> name dict, e.g. {"location_id": {1: "HQ"}}; the name goes in the
+    field with _id replaced by _name. Use with functools.partial.
+    """
+    mapped = dict(record)
+    for field, lookup in names.items():
+        value = mapped.get(field)
+        if value is None:
+            continue
+        name = lookup.get(value)
+        if name is None and isinstance(value, str) and value.isdigit():
+            name = lookup.get(int(value))
+        if name is not None:
+            mapped[field.removesuffix("_id") + "_name"] = name
+    return mapped
+
+
+class Chain:
+    """
+    Apply several transforms in turn, e.g. Chain(normalize_dates, export.flatten_record)
+    """
+
+    def __init__(self, *transforms: Callable[[dict], dict]):
+        self.transforms = transforms
+
+    def __call__(self, record: dict) -> dict:
+        for transform in self.transforms:
+            record = transform(record)
+        return record
+
+
+def _set_worker_transform(transform: Callable) -> None:
+    global _worker_transform
+    _worker_transform = transform
+
+
+def _run_batch(batch: list[list[dict]]) -> list[list[dict]]:
+    return [[_worker_transform(record) for record in page] for page in batch]
+
+
+def _batches(pages: Iterable[list[dict]], batch_size: int) -> Iterator[list[list]]:
+    """
+    Group consecutive pages until there are at least batch_size records
+    """
+    batch = []
+    count = 0
+    for page in pages:
+        batch.append(list(page))
+        count += len(batch[-1])
+        if count >= batch_size:
+            yield batch
+            batch = []
+            count = 0
+    if batch:
+        yield batch
+
+
+def transform_pages(
+    pages: Iterable[list[dict]],
+    transform: Callable[[dict], dict],
+    workers: Optional[int] = None,
+    batch_size: int = 1000,
+    window: Optional[int] = None,
+) -> Iterator[list[dict]]:
+    """
+    Apply transform to every record of every page using a pool of worker
+    processes (os.cpu_count() by default), yielding transformed pages in
+    their original order. Pages are sent in batches of at least batch_size
+    records. At most window batches (twice the workers by default) are in
+    flight, so a fast producer doesn't pile up results in memory.
+    With workers=1 everything runs in this process.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError("workers must be at least 1")
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1")
+
+    if workers == 1:
+        for page in pages:
+            yield [transform(record) for record in page]
+        return
+
+    window = window or workers * 2
+    executor = ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_set_worker_transform,
+        initargs=(transform,),
+    )
+    pending = deque()
+    try:
+        for batch in _batches(pages, batch_size):
+            pending.append(executor.submit(_run_batch, batch))
+            while len(pending) >= window:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+    finally:
+        # Also reached when the caller stops early
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def transform_records(
+    records: Iterable[dict],
+    transform: Callable[[dict], dict],
+    workers: Optional[int] = None,
+    batch_size: int = 1000,
+    window: Optional[int] = None,
+) -> Iterator[dict]:
+    """
+    Like transform_pages, for a stream of records such as
+    iter_all_asset_records(). Yields transformed records in order.
+    """
+
+    def pages() -> Iterator[list[dict]]:
+        page = []
+        for record in records:
+            page.append(record)
+            if len(page) >= batch_size:
+                yield page
+                page = []
+        if page:
+            yield page
+
+    for page in transform_pages(pages(), transform, workers, batch_size, window):
+        yield from page
@@ -0,0 +1,530 @@
+"""
+Shared HTTP plumbing for talking to the EZOffice API.
+Endpoint modules call into here instead of requests directly so that
+behaviour like conditional requests, response caching, scheduling, rate
+limiting, hedging and circuit breaking only has to be written once.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Iterator, Literal, Optional, Union
+from urllib.parse import urlparse
+
+from ezoff import cache as disk_cache
+from ezoff import jsonstream
+from ezoff import ratelimit, resilience, scheduler, timeouts
+
+if TYPE_CHECKING:
+    import requests
+
+# Validators (ETag / Last-Modified) and the body they belong to, keyed by
+# request. Least recently used entries are dropped past either limit.
+MAX_VALIDATORS = 1024
+MAX_VALIDATOR_BYTES = 64 * 1024 * 1024
+_validators = OrderedDict()
+_validator_bytes = 0
+_validators_lock = threading.Lock()
+
+# Requests sent over the network, hedged duplicates included
+_api_calls = 0
+_api_calls_lock = threading.Lock()
+
+
+class IncompletePullError(Exception):
+    """
+    A page of a paginated pull failed, so the records yielded so far are
+    only part of the data. Anything treating the pull as the full set
+    (pruning, deletion detection, snapshots) must not go ahead.
+    """
+
+
+def _request_key(url: str, params=None, data=None) -> str:
+    """
+    Build a stable key identifying a GET request by its url, params and body
+    """
+    key = url
+    if params:
+        key += "?" + "&".join(f"{k}={v}" for k, v in sorted(params.items()))
+    if data:
+        key += "#" + "&".join(f"{k}={v}" for k, v in sorted(data.items()))
+    return key
+
+
+def endpoint_name(url: str) -> str:
+    """
+    Name of the API area a url belongs to, e.g. 'assets' for
+    .../assets/123/checkin.api or 'search' for .../search.api
+    """
+    base = os.environ.get("EZO_BASE_URL", "")
+    if base and url.startswith(base):
+        path = url[len(base) :]
+    else:
+        path = urlparse(url).path
+    first = path.lstrip("/").split("/", 1)[0]
+    return first.removesuffix(".api")
+
+
+def endpoint_path(url: str) -> str:
+    """
+    Path of a url relative to the API with ids replaced, e.g.
+    'assets/:id/checkin' for .../assets/123/checkin.api. Requests with the same
+    endpoint path are expected to behave alike (latency, timeouts).
+    """
+    base = os.environ.get("EZO_BASE_URL", "")
+    if base and url.startswith(base):
+        path = urlparse(url[len(base) :]).path
+    else:
+        path = urlparse(url).path
+    segments = path.strip("/").removesuffix(".api").split("/")
+    return "/".join(":id" if s.isdigit() else s for s in segments)
+
+
+def _response_from_bytes(url: str, content: bytes, headers=None) -> "requests.Response":
+    """
+    Build a 200 response object around a locally stored body, so callers
+    can treat it exactly like one that came off the wire
+    """
+    import requests
+
+    response = requests.Response()
+    response.status_code = 200
+    response.url = url
+    response._content = content
+    response.encoding = "utf-8"
+    if headers:
+        response.headers.update(headers)
+    return response
+
+
+@contextmanager
+def _admitted(priority: Optional[str] = None) -> Iterator[None]:
+    """
+    Held around each request that goes out: a scheduler slot and a token
+    from the shared rate budget, if configured. Also counts the request.
+    When the budget is spent the slot is given back while waiting for it to
+    refill, then queued for again, so a call sleeping on the rate limit
+    doesn't keep other calls from a slot.
+    """
+    global _api_calls
+    limiter = ratelimit.get_rate_limiter()
+    while True:
+        with scheduler.request_slot(priority):
+            wait = limiter.try_acquire() if limiter is not None else 0
+            if wait == 0:
+                with _api_calls_lock:
+                    _api_calls += 1
+                yield
+                return
+        time.sleep(wait)
+
+
+def api_calls() -> int:
+    """
+    Number of requests this process has sent to the API. Responses served
+    from the disk cache aren't counted.
+    """
+    with _api_calls_lock:
+        return _api_calls
+
+
+def get(
+    url: str, conditional: bool = False, use_cache: bool = True, **kwargs
+) -> "requests.Response":
+    """
+    Perform a GET request. Takes the same keyword arguments as requests.get.
+    Unless a timeout is passed, the one configured for the endpoint is used.
+    If the disk cache is turned on and holds a fresh copy, that is returned
+    without touching the network.
+    If conditional is True, validators from a previous response to the same
+    request are sent along (If-None-Match / If-Modified-Since). Stale disk cache
+    entries are revalidated the same way. A 304 from the server is answered
+    with the stored body as a regular 200 response.
+    """
+    # requests is imported on first use, it's most of ezoff's import time
+    import requests
+
+    key = _request_key(url, kwargs.get("params"), kwargs.get("data"))
+    endpoint = endpoint_name(url)
+
+    cache = disk_cache.get_cache() if use_cache else None
+    entry = None
+    if cache is not None:
+        entry = cache.get(endpoint, key)
+        if entry is not None and entry["fresh"]:
+            return _response_from_bytes(
+                url, entry["content"], {"Content-Type": entry["content_type"]}
+            )
+
+    stored = None
+    if conditional:
+        with _validators_lock:
+            stored = _validators.get(key)
+            if stored is not None:
+                _validators.move_to_end(key)
+    if stored is None and entry is not None:
+        if entry["etag"] or entry["last_modified"]:
+            stored = entry
+
+    headers = dict(kwargs.pop("headers", None) or {})
+    if stored is not None:
+        if stored["etag"]:
+            headers["If-None-Match"] = stored["etag"]
+        if stored["last_modified"]:
+            headers["If-Modified-Since"] = stored["last_modified"]
+
+    path = endpoint_path(url)
+    kwargs.setdefault("timeout", timeouts.get_timeout(path))
+    # Hedged duplicates run on other threads, so pin the caller's priority
+    priority = scheduler.current_priority()
+
+    def send():
+        return requests.get(url, headers=headers, **kwargs)
+
+    response = resilience.call(
+        path, send, hedge=True, admit=lambda: _admitted(priority)
+    )
+
+    if response.status_code == 304 and stored is not None:
+        content_type = stored.get("content_type", "application/json")
+        if cache is not None:
+            cache.set(
+                endpoint,
+                key,
+                stored["content"],
+                stored["etag"],
+                stored["last_modified"],
+                content_type,
+            )
+        return _response_from_bytes(
+            url, stored["content"], {"Content-Type": content_type}
+        )
+
+    if response.status_code == 200:
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        content_type = response.headers.get("Content-Type", "application/json")
+        if conditional and (etag or last_modified):
+            _store_validators(
+                key,
+                {
+                    "etag": etag,
+                    "last_modified": last_modified,
+                    "content": response.content,
+                    "content_type": content_type,
+                },
+            )
+        if cache is not None:
+            cache.set(
+                endpoint, key, response.content, etag, last_modified, content_type
+            )
+
+    return response
+
+
+def _write(method: str, url: str, **kwargs) -> "requests.Response":
+    """
+    Perform a request that changes data. On success any cached responses
+    the change could affect are dropped. Unless a timeout is passed, the one
+    configured for the endpoint is used.
+    """
+    import requests
+
+    path = endpoint_path(url)
+    kwargs.setdefault("timeout", timeouts.get_timeout(path))
+
+    def send():
+        return requests.request(method, url, **kwargs)
+
+    response = resilience.call(path, send, admit=_admitted)
+
+    if response.status_code < 400:
+        cache = disk_cache.get_cache()
+        if cache is not None:
+            endpoint = endpoint_name(url)
+            for related in disk_cache.RELATED_ENDPOINTS.get(endpoint, (endpoint,)):
+                cache.invalidate(related)
+
+    return response
+
+
+def post(url: str, **kwargs) -> "requests.Response":
+    """
+    Perform a POST request. Takes the same keyword arguments as requests.post.
+    """
+    return _write("POST", url, **kwargs)
+
+
+def put(url: str, **kwargs) -> "requests.Response":
+    """
+    Perform a PUT request. Takes the same keyword arguments as requests.put.
+    """
+    return _write("PUT", url, **kwargs)
+
+
+def patch(url: str, **kwargs) -> "requests.Response":
+    """
+    Perform a PATCH request. Takes the same keyword arguments as requests.patch.
+    """
+    return _write("PATCH", url, **kwargs)
+
+
+def delete(url: str, **kwargs) -> "requests.Response":
+    """
+    Perform a DELETE request. Takes the same keyword arguments as requests.delete.
+    """
+    return _write("DELETE", url, **kwargs)
+
+
+def _store_validators(key: str, stored: dict) -> None:
+    global _validator_bytes
+    with _validators_lock:
+        previous = _validators.pop(key, None)
+        if previous is not None:
+            _validator_bytes -= len(previous["content"])
+        _validators[key] = stored
+        _validator_bytes += len(stored["content"])
+        while len(_validators) > MAX_VALIDATORS or (
+            _validator_bytes > MAX_VALIDATOR_BYTES and len(_validators) > 1
+        ):
+            _, dropped = _validators.popitem(last=False)
+            _validator_bytes -= len(dropped["content"])
+
+
+def clear_validators() -> None:
+    """
+    Forget all stored validators and bodies, forcing the next conditional
+    request for each endpoint to download the full response
+    """
+    global _validator_bytes
+    with _validators_lock:
+        _validators.clear()
+        _validator_bytes = 0
+
+
+class PageSizeTuner:
+    """
+    Picks the page size for a paginated pull that gets the most records per
+    second. Sizes are powers of two. Starting from start, the size doubles
+    while that keeps improving throughput by at least 10%, and drops back
+    if the larger size turned out slower.
+    Endpoints are paged by page number, so a new size can only be switched
+    to once the records fetched so far are a whole number of pages of it.
+    """
+
+    def __init__(self, start: int = 32, maximum: int = 1024):
+        self.size = start
+        self.maximum = maximum
+        self._rates = {}
+        self._target = start
+        self._growing = True
+
+    def record(self, size: int, records: int, seconds: float) -> None:
+        """
+        Note how long a full page of size records took
+        """
+        self._rates[size] = records / max(seconds, 1e-6)
+
+        if not self._growing or size != self._target:
+            return
+        smaller = self._rates.get(size // 2)
+        if smaller is not None and self._rates[size] < smaller * 1.1:
+            self._growing = False
+            if self._rates[size] < smaller:
+                self._target = size // 2
+        elif size * 2 <= self.maximum:
+            self._target = size * 2
+        else:
+            self._growing = False
+
+    def stop(self, size: int) -> None:
+        """
+        Stay at size from now on
+        """
+        self._growing = False
+        self._target = size
+        self.size = size
+
+    def next_size(self, offset: int) -> int:
+        """
+        Page size to use for the page starting at record offset
+        """
+        if self._target != self.size and offset % self._target == 0:
+            self.size = self._target
+        return self.size
+
+
+def iter_pages(
+    url: str,
+    key: str,
+    noun: str,
+    params: Optional[dict] = None,
+    per_page: Union[int, Literal["auto"], None] = None,
+    **kwargs,
+) -> Iterator:
+    """
+    Walk a paginated endpoint, yielding what's under `key` in each page.
+    noun is used in error messages ("could not get {noun} from ...").
+    per_page sets the page size, the server's default is used if not given.
+    "auto" tunes the page size while walking to get the most records per
+    second (see PageSizeTuner).
+    If a page comes back with an error status, IncompletePullError is raised,
+    so a pull that finishes without raising got every page.
+    Extra keyword arguments (headers, data, timeout) are passed to get.
+    """
+    tuner = PageSizeTuner() if per_page == "auto" else None
+    page = 1
+    size = per_page if tuner is None else tuner.size
+    # Records yielded so far, and the last size the server was seen to honour
+    offset = 0
+    confirmed = None
+
+    while True:
+        if tuner is not None:
+            new_size = tuner.next_size(offset)
+            if new_size != size:
+                page = offset // new_size + 1
+                size = new_size
+
+        page_params = {"page": page}
+        if size is not None:
+            page_params["per_page"] = size
+        if params:
+            page_params.update(params)
+
+        started = time.monotonic()
+        try:
+            response = get(url, params=page_params, **kwargs)
+        except Exception as e:
+            print(f"Error, could not get {noun} from EZOfficeInventory: ", e)
+            raise Exception(
+                f"Error, could not get {noun} from EZOfficeInventory: " + str(e)
+            )
+
+        if response.status_code != 200:
+            print(
+                f"Error {response.status_code}, could not get {noun} from EZOfficeInventory: ",
+                response.content,
+            )
+            raise IncompletePullError(
+                f"Error {response.status_code}, could not get {noun} from "
+                f"EZOfficeInventory, page {page} failed: " + str(response.content)
+            )
+
+        data = response.json()
+
+        if key not in data:
+            print(
+                f"Error, could not get {noun} from EZOfficeInventory: ",
+                response.content,
+            )
+            raise Exception(
+                f"Error, could not get {noun} from EZOfficeInventory: "
+                + str(response.content)
+            )
+
+        records = len(data[key])
+        last = "total_pages" not in data or page >= data["total_pages"]
+
+        if tuner is not None and records != size and confirmed not in (None, size):
+            # The server didn't honour the new size (capped or ignored it),
+            # or this is the last page and it can't be told. Either way the
+            # page may not start at offset, so drop it and go back to the
+            # last size that worked.
+            tuner.stop(confirmed)
+            continue
+
+        if tuner is not None and not last:
+            if records == size:
+                confirmed = size
+                tuner.record(size, records, time.monotonic() - started)
+            elif confirmed is None:
+                # Go with whatever page size the server uses
+                tuner.stop(records)
+                size = confirmed = records
+
+        yield data[key]
+        offset += records
+
+        if "total_pages" not in data:
+            print("Error, could not get total_pages from EZOfficeInventory: ", data)
+            break
+
+        if page >= data["total_pages"]:
+            break
+
+        page += 1
+
+
+def iter_records(
+    url: str,
+    key: str,
+    noun: str,
+    params: Optional[dict] = None,
+    per_page: Optional[int] = None,
+    chunk_size: int = 64 * 1024,
+    **kwargs,
+) -> Iterator:
+    """
+    Like iter_pages, but yields records one at a time, parsed straight off
+    the response body as it arrives (see jsonstream). Memory use is bounded
+    by one record instead of one page. For endpoints whose records are keyed
+    by id, (id, record) pairs are yielded.
+    Streamed responses skip the disk cache. per_page can't be "auto" here.
+    Raises IncompletePullError if a page fails, like iter_pages.
+    """
+    if per_page == "auto":
+        raise ValueError("per_page can't be 'auto' when streaming records")
+
+    page = 1
+
+    while True:
+        page_params = {"page": page}
+        if per_page is not None:
+            page_params["per_page"] = per_page
+        if params:
+            page_params.update(params)
+
+        try:
+            response = get(
+                url, params=page_params, use_cache=False, stream=True, **kwargs
+            )
+        except Exception as e:
+            print(f"Error, could not get {noun} from EZOfficeInventory: ", e)
+            raise Exception(
+                f"Error, could not get {noun} from EZOfficeInventory: " + str(e)
+            )
+
+        if response.status_code != 200:
+            print(
+                f"Error {response.status_code}, could not get {noun} from EZOfficeInventory: ",
+                response.content,
+            )
+            raise IncompletePullError(
+                f"Error {response.status_code}, could not get {noun} from "
+                f"EZOfficeInventory, page {page} failed: " + str(response.content)
+            )
+
+        meta = {}
+        try:
+            yield from jsonstream.iter_json_items(
+                response.iter_content(chunk_size), key, meta
+            )
+        except KeyError:
+            print(f"Error, could not get {noun} from EZOfficeInventory: ", meta)
+            raise Exception(
+                f"Error, could not get {noun} from EZOfficeInventory: " + str(meta)
+            )
+        finally:
+            response.close()
+
+        if "total_pages" not in meta:
+            print("Error, could not get total_pages from EZOfficeInventory: ", meta)
+            break
+
+        if page >= meta["total_pages"]:
+            break
+
+        page += 1
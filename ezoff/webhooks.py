@@ -0,0 +1,316 @@
+"""
+Local receiver for change notifications, as an alternative to polling.
+A small HTTP server accepts signed JSON notifications about records being
+created, updated or deleted, checks the signature and applies the change:
+cached responses for the record's endpoint are dropped, a Mirror (if given)
+is updated and a record_changed event is emitted.
+
+Notifications look like:
+
+    {
+        "id": "delivery id, used to ignore repeats",
+        "event": "asset.updated",
+        "record_id": 123,
+        "data": {...the record...}
+    }
+
+Events are '<asset|member|location|work_order>.<created|updated|deleted>'.
+The X-EZO-Signature header holds the hex HMAC-SHA256 of the body, keyed
+with the shared secret.
+"""
+
+import hashlib
+import hmac
+import json
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import TYPE_CHECKING, Optional
+
+from ezoff import cache as disk_cache
+from ezoff import events
+
+if TYPE_CHECKING:
+    import requests
+
+SIGNATURE_HEADER = "X-EZO-Signature"
+
+ENTITIES = {
+    "asset": "assets",
+    "member": "members",
+    "location": "locations",
+    "work_order": "work_orders",
+}
+
+ACTIONS = ["created", "updated", "deleted"]
+
+# API endpoint (see transport.endpoint_name) each entity is served from
+ENDPOINTS = {
+    "assets": "assets",
+    "members": "members",
+    "locations": "locations",
+    "work_orders": "tasks",
+}
+
+ID_KEYS = {
+    "assets": ["sequence_num", "id"],
+    "members": ["id"],
+    "locations": ["id"],
+    "work_orders": ["sequence_num", "id"],
+}
+
+MAX_BODY_BYTES = 1024 * 1024
+
+
+def sign(body: bytes, secret: str) -> str:
+    """
+    Signature for a notification body
+    """
+    return hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def verify_signature(body: bytes, signature: Optional[str], secret: str) -> bool:
+    if not signature:
+        return False
+    signature = signature.removeprefix("sha256=")
+    return hmac.compare_digest(sign(body, secret), signature)
+
+
+def parse_notification(body: bytes) -> dict:
+    """
+    Check a notification body and return it with 'entity' and 'action'
+    added. Raises ValueError if it isn't a valid notification.
+    """
+    try:
+        notification = json.loads(body)
+    except ValueError:
+        raise ValueError("notification body must be JSON")
+    if not isinstance(notification, dict):
+        raise ValueError("notification must be a JSON object")
+
+    event = notification.get("event")
+    if not isinstance(event, str) or event.count(".") != 1:
+        raise ValueError("notification must have an 'event' like 'asset.updated'")
+    kind, action = event.split(".")
+    if kind not in ENTITIES:
+        raise ValueError(f"event must be about one of {list(ENTITIES)}")
+    if action not in ACTIONS:
+        raise ValueError(f"event action must be one of {ACTIONS}")
+
+    entity = ENTITIES[kind]
+    data = notification.get("data")
+    if data is not None and not isinstance(data, dict):
+        raise ValueError("notification 'data' must be an object")
+
+    record_id = notification.get("record_id")
+    if record_id is None and data:
+        for key in ID_KEYS[entity]:
+            if data.get(key) is not None:
+                record_id = data[key]
+                break
+    if record_id is None:
+        raise ValueError("notification must have a 'record_id'")
+    if action != "deleted" and not data:
+        raise ValueError(f"{action} notification must have 'data'")
+
+    return dict(notification, entity=entity, action=action, record_id=record_id)
+
+
+class WebhookReceiver:
+    """
+    HTTP server applying signed change notifications posted to path.
+
+        with WebhookReceiver(secret, port=8765, mirror=mirror) as receiver:
+            ...  # notifications are applied in the background
+
+    Repeated deliveries (same notification 'id') are applied once.
+    """
+
+    def __init__(
+        self,
+        secret: str,
+        host: str = "127.0.0.1",
+        port: int = 8765,
+        path: str = "/ezoff/webhook",
+        mirror=None,
+    ):
+        if not secret:
+            raise ValueError("secret must not be empty")
+        self.secret = secret
+        self.path = path
+        self.mirror = mirror
+        self.received = 0
+        self.applied = 0
+        self._seen = OrderedDict()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}{self.path}"
+
+    def __enter__(self) -> "WebhookReceiver":
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _handler_class(self):
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args) -> None:
+                pass
+
+            def do_POST(self) -> None:
+                if self.path.split("?", 1)[0] != receiver.path:
+                    return self._reply(404, "not found")
+                header = self.headers.get("Content-Length")
+                if header is None:
+                    return self._reply(411, "Content-Length required")
+                try:
+                    length = int(header)
+                except ValueError:
+                    length = -1
+                # A negative length would make rfile.read wait for EOF
+                if length < 0:
+                    return self._reply(400, "invalid Content-Length")
+                if length > MAX_BODY_BYTES:
+                    return self._reply(413, "body too large")
+                body = self.rfile.read(length)
+                status, message = receiver.handle(
+                    body, self.headers.get(SIGNATURE_HEADER)
+                )
+                self._reply(status, message)
+
+            def _reply(self, status: int, message: str) -> None:
+                body = json.dumps({"message": message}).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+    def _first_delivery(self, delivery_id) -> bool:
+        if delivery_id is None:
+            return True
+        with self._lock:
+            if delivery_id in self._seen:
+                return False
+            self._seen[delivery_id] = True
+            if len(self._seen) > 10000:
+                self._seen.popitem(last=False)
+        return True
+
+    def apply(self, notification: dict) -> None:
+        """
+        Apply a parsed notification to the disk cache, the mirror and
+        record_changed subscribers
+        """
+        entity = notification["entity"]
+        action = notification["action"]
+        record_id = notification["record_id"]
+        record = notification.get("data")
+
+        cache = disk_cache.get_cache()
+        if cache is not None:
+            endpoint = ENDPOINTS[entity]
+            for related in disk_cache.RELATED_ENDPOINTS.get(endpoint, (endpoint,)):
+                cache.invalidate(related)
+
+        if self.mirror is not None:
+            if action == "deleted":
+                self.mirror.delete(entity, record_id)
+            else:
+                self.mirror.upsert(entity, [(record_id, record)])
+
+        events.emit(
+            "record_changed",
+            entity=entity,
+            action=action,
+            record_id=record_id,
+            record=record,
+        )
+
+    def handle(self, body: bytes, signature: Optional[str]) -> tuple[int, str]:
+        """
+        Check and apply one notification. Returns the HTTP status and message
+        to answer with; a notification that couldn't be applied is answered
+        with a 500 carrying the error, so the sender sees why.
+        """
+        with self._lock:
+            self.received += 1
+        if not verify_signature(body, signature, self.secret):
+            return 401, "bad signature"
+        try:
+            notification = parse_notification(body)
+        except ValueError as e:
+            return 400, str(e)
+        if not self._first_delivery(notification.get("id")):
+            return 200, "already applied"
+        try:
+            self.apply(notification)
+        except Exception as e:
+            # Forget it so a redelivery gets another go
+            with self._lock:
+                self._seen.pop(notification.get("id"), None)
+            return 500, "could not apply notification: " + str(e)
+        with self._lock:
+            self.applied += 1
+        return 200, "applied"
+
+    def start(self) -> None:
+        """
+        Serve in a background thread
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._server.serve_forever, daemon=True
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+
+
+def send_test_webhook(
+    url: str,
+    secret: str,
+    event: str,
+    record_id=None,
+    data: Optional[dict] = None,
+    delivery_id: Optional[str] = None,
+) -> "requests.Response":
+    """
+    Post a signed notification to a receiver, standing in for the real
+    sender when testing
+    """
+    import uuid
+
+    import requests
+
+    notification = {"id": delivery_id or str(uuid.uuid4()), "event": event}
+    if record_id is not None:
+        notification["record_id"] = record_id
+    if data is not None:
+        notification["data"] = data
+    body = json.dumps(notification).encode()
+
+    return requests.post(
+        url,
+        data=body,
+        headers={
+            "Content-Type": "application/json",
+            SIGNATURE_HEADER: sign(body, secret),
+        },
+        timeout=10,
+    )
@@ -3,89 +3,68 @@ This module contains functions to interact with work orders in EZOfficeInventory
 """
 
 import os
-from typing import Literal
-
-import requests
+from typing import Iterator, Literal, Union
 
+from ezoff import schemas, transport
 from ezoff.auth import Decorators
 
 
 @Decorators.check_env_vars
 def get_work_orders(
-    filter: Literal["complete", "in_progress", "review_pending", "open"]
+    filter: Literal["complete", "in_progress", "review_pending", "open"],
+    per_page: Union[int, Literal["auto"], None] = None,
 ) -> dict:
     """
     Get filtered work orders (complete, in_progress, review_pending, or open)
+    per_page sets the page size, or "auto" to tune it for the fastest pull.
     https://ezo.io/ezofficeinventory/developers/#api-get-filtered-task
     """
 
-    url = os.environ["EZO_BASE_URL"] + "tasks.api"
-
-    page = 1
     all_work_orders = {}
 
-    while True:
-
-        try:
-            response = requests.get(
-                url,
-                headers={"Authorization": "Bearer " + os.environ["EZO_TOKEN"]},
-                params={"page": page, "filter": filter},
-                timeout=10,
-            )
-        except Exception as e:
-            print("Error, could not get work orders from EZOfficeInventory: ", e)
-            raise Exception(
-                "Error, could not get work orders from EZOfficeInventory: " + str(e)
-            )
-
-        if response.status_code != 200:
-            print(
-                f"Error {response.status_code}, could not get work orders from EZOfficeInventory: ",
-                response.content,
-            )
-            break
-
-        data = response.json()
-
-        if "work_orders" not in data:
-            print(
-                f"Error, could not get work orders from EZOfficeInventory: ",
-                response.content,
-            )
-            raise Exception(
-                f"Error, could not get work orders from EZOfficeInventory: "
-                + str(response.content)
-            )
-
-        all_work_orders.update(data["work_orders"])
-
-        if "total_pages" not in data:
-            print("Error, could not get total_pages from EZOfficeInventory: ", data)
-            break
-
-        if page >= data["total_pages"]:
-            break
-
-        page += 1
+    for page in iter_work_order_pages(filter, per_page):
+        all_work_orders.update(page)
 
     return all_work_orders
 
 
+@Decorators.check_env_vars
+def iter_work_order_pages(
+    filter: Literal["complete", "in_progress", "review_pending", "open"],
+    per_page: Union[int, Literal["auto"], None] = None,
+) -> Iterator[dict]:
+    """
+    Same as get_work_orders, but yields one page at a time. Each page is a
+    dict of work orders keyed by work order number.
+    """
+
+    url = os.environ["EZO_BASE_URL"] + "tasks.api"
+
+    yield from transport.iter_pages(
+        url,
+        "work_orders",
+        "work orders",
+        params={"filter": filter},
+        per_page=per_page,
+        headers={"Authorization": "Bearer " + os.environ["EZO_TOKEN"]},
+    )
+
+
 @Decorators.check_env_vars
 def get_work_order_details(work_order_id: int) -> dict:
     """
     Get work order details
+    Uses a conditional request, an unchanged work order is not downloaded again.
     https://ezo.io/ezofficeinventory/developers/#api-retrive-task-details
     """
 
     url = os.environ["EZO_BASE_URL"] + "tasks/" + str(work_order_id) + ".api"
 
     try:
-        response = requests.get(
+        response = transport.get(
             url,
             headers={"Authorization": "Bearer " + os.environ["EZO_TOKEN"]},
-            timeout=10,
+            conditional=True,
         )
     except Exception as e:
         print("Error, could not get work order from EZOfficeInventory: ", e)
@@ -118,10 +97,9 @@ def get_work_order_types() -> list[dict]:
     url = os.environ["EZO_BASE_URL"] + "task_types.api"
 
     try:
-        response = requests.get(
+        response = transport.get(
             url,
             headers={"Authorization": "Bearer " + os.environ["EZO_TOKEN"]},
-            timeout=10,
         )
     except Exception as e:
         print("Error, could not get work order types from EZOfficeInventory: ", e)
@@ -159,56 +137,15 @@ def create_work_order(work_order: dict) -> dict:
     https://ezo.io/ezofficeinventory/developers/#api-create-task
     """
 
-    # Required fields
-    if "task[title]" not in work_order:
-        raise ValueError("work_order must have 'task[title]' key")
-    if "task[task_type]" not in work_order:
-        raise ValueError("work_order must have 'task[task_type]' key")
-    if "due_date" not in work_order:
-        raise ValueError("work_order must have 'due_date' key")
-        # Also check that the date is in the correct format mm/dd/yyyy
-        try:
-            datetime.strptime(work_order["due_date"], "%m/%d/%Y")
-        except ValueError:
-            raise ValueError("work_order['due_date'] must be in the format mm/dd/yyyy")
-
-    # Remove any keys that are not valid
-    valid_keys = [
-        "task[title]",
-        "task[task_type]",
-        "task[task_type_id]",
-        "task[priority]",
-        "task[assigned_to_id]",
-        "task[reviewer_id]",
-        "task[mark_items_unavailable]",
-        "expected_start_date",
-        "expected_start_time",
-        "due_date",
-        "start_time",
-        "base_cost",
-        "inventory_ids",
-        "checklist_ids",
-        "associated_assets",
-        "custom_field_names",
-    ]
-
-    work_order = {
-        k: v
-        for k, v in work_order.items()
-        if k in valid_keys
-        or k.startswith("task[custom_attributes]")
-        or k.startswith("linked_inventory_items")
-        or k.startswith("associated_checklists")
-    }
+    work_order = schemas.validate_payload("create_work_order", work_order)
 
     url = os.environ["EZO_BASE_URL"] + "tasks.api"
 
     try:
-        response = requests.post(
+        response = transport.post(
             url,
             headers={"Authorization": "Bearer " + os.environ["EZO_TOKEN"]},
             data=work_order,
-            timeout=10,
         )
     except Exception as e:
         print("Error, could not create work order in EZOfficeInventory: ", e)
@@ -234,10 +171,9 @@ def start_work_order(work_order_id: int) -> dict:
     )
 
     try:
-        response = requests.post(
+        response = transport.post(
             url,
             headers={"Authorization": "Bearer " + os.environ["EZO_TOKEN"]},
-            timeout=10,
         )
     except Exception as e:
         print("Error, could not start work order in EZOfficeInventory: ", e)
@@ -263,10 +199,9 @@ def end_work_order(work_order_id: int) -> dict:
     )
 
     try:
-        response = requests.post(
+        response = transport.post(
             url,
             headers={"Authorization": "Bearer " + os.environ["EZO_TOKEN"]},
-            timeout=10,
         )
     except Exception as e:
         print("Error, could not end work order in EZOfficeInventory: ", e)
@@ -286,26 +221,7 @@ def add_work_log_to_work_order(work_order_id: int, work_log: dict) -> dict:
     https://ezo.io/ezofficeinventory/developers/#api-add-work-log-to-task
     """
 
-    # Required fields
-    if "task_work_log[time_spent]" not in work_log:
-        raise ValueError("work_log must have 'task_work_log[time_spent]' key")
-    if "task_work_log[user_id]" not in work_log:
-        raise ValueError("work_log must have 'task_work_log[user_id]' key")
-
-    # Remove any keys that are not valid
-    valid_keys = [
-        "task_work_log[time_spent]",
-        "task_work_log[user_id]",
-        "task_work_log[description]",
-        "task_work_log[resource_id]",
-        "task_work_log[resource_type]",
-        "started_on_date",
-        "started_on_time",
-        "ended_on_date",
-        "ended_on_time",
-    ]
-
-    work_log = {k: v for k, v in work_log.items() if k in valid_keys}
+    work_log = schemas.validate_payload("add_work_log_to_work_order", work_log)
 
     url = (
         os.environ["EZO_BASE_URL"]
@@ -315,11 +231,10 @@ def add_work_log_to_work_order(work_order_id: int, work_log: dict) -> dict:
     )
 
     try:
-        response = requests.post(
+        response = transport.post(
             url,
             headers={"Authorization": "Bearer " + os.environ["EZO_TOKEN"]},
             data=work_log,
-            timeout=10,
         )
     except Exception as e:
         print("Error, could not add work log to work order in EZOfficeInventory: ", e)
@@ -340,29 +255,7 @@ def add_linked_inv_to_work_order(work_order_id: int, linked_inv: dict) -> dict:
     https://ezo.io/ezofficeinventory/developers/#api-add-linked-inventory-to-task
     """
 
-    # Required fields
-    if "inventory_id" not in linked_inv:
-        raise ValueError("linked_inv must have 'inventory_id' key")
-    if not any(
-        key.startswith("linked_inventory_items[") and key.endswith("][quantity]")
-        for key in linked_inv.keys()
-    ):
-        raise ValueError(
-            "linked_inv must have a key that matches the format linked_inventory_items[{Inventory#}][quantity]"
-        )
-
-    # Remove any keys that are not valid
-    valid_keys = ["inventory_id"]
-
-    linked_inv = {
-        k: v
-        for k, v in linked_inv.items()
-        if k in valid_keys
-        or (k.startswith("linked_inventory_items[") and k.endswith("][quantity]"))
-        or (k.startswith("linked_inventory_items[") and k.endswith("][location_id]"))
-        or (k.startswith("linked_inventory_items[") and k.endswith("][resource_id]"))
-        or (k.startswith("linked_inventory_items[") and k.endswith("][resource_type]"))
-    }
+    linked_inv = schemas.validate_payload("add_linked_inv_to_work_order", linked_inv)
 
     url = (
         os.environ["EZO_BASE_URL"]
@@ -372,11 +265,10 @@ def add_linked_inv_to_work_order(work_order_id: int, linked_inv: dict) -> dict:
     )
 
     try:
-        response = requests.patch(
+        response = transport.patch(
             url,
             headers={"Authorization": "Bearer " + os.environ["EZO_TOKEN"]},
             data=linked_inv,
-            timeout=10,
         )
     except Exception as e:
         print(
@@ -398,51 +290,16 @@ def get_checklists() -> list[dict]:
     https://ezo.io/ezofficeinventory/developers/#api-retrieve-checklists
     """
 
-    page = 1
+    url = os.environ["EZO_BASE_URL"] + "checklists.api"
+
     all_checklists = []
 
-    while True:
-        try:
-            response = requests.get(
-                os.environ["EZO_BASE_URL"] + "checklists.api",
-                headers={"Authorization": "Bearer " + os.environ["EZO_TOKEN"]},
-                params={"page": page},
-                timeout=10,
-            )
-        except Exception as e:
-            print("Error, could not get checklists from EZOfficeInventory: ", e)
-            raise Exception(
-                "Error, could not get checklists from EZOfficeInventory: " + str(e)
-            )
-
-        if response.status_code != 200:
-            print(
-                f"Error {response.status_code}, could not get checklists from EZOfficeInventory: ",
-                response.content,
-            )
-            break
-
-        data = response.json()
-
-        if "checklists" not in data:
-            print(
-                f"Error, could not get checklists from EZOfficeInventory: ",
-                response.content,
-            )
-            raise Exception(
-                f"Error, could not get checklists from EZOfficeInventory: "
-                + str(response.content)
-            )
-
-        all_checklists.extend(data["checklists"])
-
-        if "total_pages" not in data:
-            print("Error, could not get total_pages from EZOfficeInventory: ", data)
-            break
-
-        if page >= data["total_pages"]:
-            break
-
-        page += 1
+    for page in transport.iter_pages(
+        url,
+        "checklists",
+        "checklists",
+        headers={"Authorization": "Bearer " + os.environ["EZO_TOKEN"]},
+    ):
+        all_checklists.extend(page)
 
     return all_checklists
@@ -18,4 +18,12 @@ setup(
     packages=find_packages(),
     python_requires=">=3.12",
     install_requires=required,
+    extras_require={
+        "export": ["pyarrow"],
+        "dataframe": ["pandas"],
+        "snapshots": ["msgpack", "zstandard"],
+    },
+    entry_points={
+        "console_scripts": ["ezoff=ezoff.cli:main"],
+    },
 )
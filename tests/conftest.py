@@ -0,0 +1,43 @@
+import json
+
+import pytest
+import requests
+
+
+@pytest.fixture(autouse=True)
+def ezo_env(monkeypatch):
+    monkeypatch.setenv("EZO_BASE_URL", "https://example.ezofficeinventory.com/")
+    monkeypatch.setenv("EZO_TOKEN", "token")
+    for name in ["EZO_CACHE_DIR", "EZO_RATE_LIMIT", "EZO_TIMEOUT"]:
+        monkeypatch.delenv(name, raising=False)
+
+
+def json_response(body, status: int = 200) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status
+    response._content = json.dumps(body).encode()
+    response._content_consumed = True
+    response.encoding = "utf-8"
+    return response
+
+
+def fake_paged_get(key: str, records: list, per_page: int, fail_page=None):
+    """
+    Stand-in for transport.get serving records in pages of per_page, with
+    fail_page answered with a 500
+    """
+    total_pages = max(1, -(-len(records) // per_page))
+    requested = []
+
+    def get(url, params=None, **kwargs):
+        page = params["page"]
+        requested.append(page)
+        if page == fail_page:
+            return json_response({"message": "Internal Server Error"}, 500)
+        start = (page - 1) * per_page
+        return json_response(
+            {key: records[start : start + per_page], "total_pages": total_pages}
+        )
+
+    get.requested = requested
+    return get
@@ -0,0 +1,60 @@
+import pytest
+
+from conftest import json_response
+from ezoff import transport
+from ezoff.assets import EditableAsset
+
+RECORD = {
+    "sequence_num": 12,
+    "name": "Laptop",
+    "location_id": 3,
+    "custom_fields": [{"name": "Serial", "value": "X123"}],
+}
+
+
+@pytest.fixture
+def puts(monkeypatch):
+    sent = []
+
+    def put(url, data=None, **kwargs):
+        sent.append((url, data))
+        return json_response({"message": "Asset updated"})
+
+    monkeypatch.setattr(transport, "put", put)
+    return sent
+
+
+def test_unchanged_asset_is_not_sent(puts):
+    asset = EditableAsset(dict(RECORD))
+    asset["fixed_asset[name]"] = "Laptop"
+    asset["fixed_asset[location_id]"] = "3"
+    asset["cust_attr[Serial]"] = "X123"
+
+    assert not asset.is_dirty
+    assert asset.save() is None
+    assert puts == []
+
+
+def test_only_changed_fields_are_sent(puts):
+    asset = EditableAsset(dict(RECORD))
+    asset["fixed_asset[name]"] = "Laptop"
+    asset["fixed_asset[location_id]"] = 4
+    asset["cust_attr[Serial]"] = "Y456"
+    asset["fixed_asset[description]"] = "Spare"
+    asset["fixed_asset[description]"] = None
+
+    assert asset.save() == {"message": "Asset updated"}
+
+    assert len(puts) == 1
+    url, data = puts[0]
+    assert url.endswith("assets/12.api")
+    assert data == {"fixed_asset[location_id]": 4, "cust_attr[Serial]": "Y456"}
+    assert asset.record["location_id"] == 4
+    assert not asset.is_dirty
+    assert asset.save() is None
+    assert len(puts) == 1
+
+
+def test_invalid_key_is_refused():
+    with pytest.raises(KeyError):
+        EditableAsset(dict(RECORD))["fixed_asset[colour]"] = "red"
@@ -0,0 +1,75 @@
+import threading
+
+from ezoff import bulk
+
+
+def work_order(title: str) -> dict:
+    return {"task[title]": title, "task[task_type]": "Repair", "due_date": "02/01/2024"}
+
+
+LINKED_INV = {"inventory_id": 7, "linked_inventory_items[7][quantity]": 1}
+
+
+def test_rows_failing_partway_are_reported_with_their_progress(monkeypatch):
+    lock = threading.Lock()
+    calls = []
+    ids = {"ok": 101, "fails at linked inv": 102, "no id": None}
+
+    def create_work_order(payload):
+        with lock:
+            calls.append(("create", payload["task[title]"]))
+        work_order_id = ids[payload["task[title]"]]
+        if work_order_id is None:
+            return {"message": "Task could not be created"}
+        return {"work_order": {"sequence_num": work_order_id}}
+
+    def add_linked_inv_to_work_order(work_order_id, linked_inv):
+        with lock:
+            calls.append(("linked_inventory", work_order_id))
+        if work_order_id == 102:
+            raise Exception("Error, could not add linked inventory: 422")
+
+    def start_work_order(work_order_id):
+        with lock:
+            calls.append(("start", work_order_id))
+
+    monkeypatch.setattr(bulk, "create_work_order", create_work_order)
+    monkeypatch.setattr(
+        bulk, "add_linked_inv_to_work_order", add_linked_inv_to_work_order
+    )
+    monkeypatch.setattr(bulk, "start_work_order", start_work_order)
+
+    orders = [
+        {
+            "work_order": work_order("ok"),
+            "linked_inventory": [LINKED_INV],
+            "start": True,
+        },
+        {
+            "work_order": work_order("fails at linked inv"),
+            "linked_inventory": [LINKED_INV],
+            "start": True,
+        },
+        {"work_order": {"task[title]": "invalid"}},
+        {"work_order": work_order("no id")},
+    ]
+    finished = []
+
+    results = bulk.bulk_create_work_orders(
+        orders, max_workers=2, progress=finished.append
+    )
+
+    assert [r["index"] for r in results] == [0, 1, 2, 3]
+    assert [r["ok"] for r in results] == [True, False, False, False]
+    assert [r["work_order_id"] for r in results] == [101, 102, None, None]
+    assert results[0]["steps"] == ["create", "linked_inventory", "start"]
+    assert results[0]["error"] is None
+    # Created, then stopped at the failing step without starting
+    assert results[1]["steps"] == ["create"]
+    assert "could not add linked inventory" in results[1]["error"]
+    assert ("start", 102) not in calls
+    # Rejected before any call
+    assert results[2]["error"] == "work_order must have 'task[task_type]' key"
+    assert ("create", "invalid") not in calls
+    assert "could not create work order" in results[3]["error"]
+    assert sorted(r["index"] for r in finished) == [0, 1, 2, 3]
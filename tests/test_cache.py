@@ -0,0 +1,35 @@
+import errno
+import os
+import tempfile
+
+from conftest import json_response
+from ezoff import cache as disk_cache
+from ezoff import transport
+
+
+def test_failed_cache_write_does_not_fail_the_request(monkeypatch, tmp_path):
+    cache = disk_cache.configure_cache(str(tmp_path))
+
+    def disk_full(*args, **kwargs):
+        raise OSError(errno.ENOSPC, "No space left on device")
+
+    monkeypatch.setattr(tempfile, "mkstemp", disk_full)
+    monkeypatch.setattr(
+        "requests.get", lambda url, **kwargs: json_response({"assets": []})
+    )
+    try:
+        response = transport.get(os.environ["EZO_BASE_URL"] + "assets.api")
+    finally:
+        disk_cache.disable_cache()
+
+    assert response.status_code == 200
+    assert cache.get("assets", "anything") is None
+
+
+def test_overwriting_an_entry_does_not_grow_the_size(tmp_path):
+    cache = disk_cache.DiskCache(str(tmp_path))
+    cache.set("assets", "key", b"x" * 100)
+    cache.set("assets", "key", b"x" * 100)
+    cache.set("assets", "key", b"x" * 100)
+
+    assert cache._size == cache._total_size()
@@ -0,0 +1,41 @@
+import pytest
+
+from conftest import fake_paged_get
+from ezoff import transport
+from ezoff.cdc import ChangeCapture
+
+ASSETS = [{"sequence_num": i, "name": f"Asset {i}"} for i in range(1, 101)]
+
+
+def _types(changes: list) -> dict:
+    counts = {}
+    for change in changes:
+        counts[change["type"]] = counts.get(change["type"], 0) + 1
+    return counts
+
+
+def test_incomplete_pull_reports_no_deletions(monkeypatch, tmp_path):
+    with ChangeCapture(str(tmp_path / "assets.cdc")) as capture:
+        monkeypatch.setattr(transport, "get", fake_paged_get("assets", ASSETS, 10))
+        assert _types(list(capture.capture())) == {"created": 100}
+
+        changed = [
+            dict(a, name="Renamed") if a["sequence_num"] == 5 else a for a in ASSETS
+        ]
+        monkeypatch.setattr(
+            transport, "get", fake_paged_get("assets", changed, 10, fail_page=9)
+        )
+        changes = []
+        with pytest.raises(transport.IncompletePullError):
+            for change in capture.capture():
+                changes.append(change)
+
+        assert [(c["type"], c["id"]) for c in changes] == [("updated", 5)]
+        assert len(capture) == 100
+
+        monkeypatch.setattr(
+            transport, "get", fake_paged_get("assets", changed[:-1], 10)
+        )
+        changes = list(capture.capture())
+        assert [(c["type"], c["id"]) for c in changes] == [("deleted", 100)]
+        assert len(capture) == 99
@@ -0,0 +1,46 @@
+import threading
+import time
+
+from ezoff import coalesce
+from ezoff.coalesce import WriteBuffer
+
+
+def test_updates_to_one_entity_land_in_order(monkeypatch):
+    landed = []
+    first_started = threading.Event()
+
+    def update_asset(asset_id, payload):
+        if not landed and not first_started.is_set():
+            first_started.set()
+            # The first request is slow, the newer one must wait for it
+            time.sleep(0.3)
+        landed.append((asset_id, payload["fixed_asset[name]"]))
+        return {"asset": payload}
+
+    monkeypatch.setitem(coalesce._WRITERS, "update_asset", update_asset)
+
+    with WriteBuffer(window=0, max_workers=4) as buffer:
+        first = buffer.update_asset(1, {"fixed_asset[name]": "old"})
+        assert first_started.wait(1)
+        second = buffer.update_asset(1, {"fixed_asset[name]": "new"})
+        other = buffer.update_asset(2, {"fixed_asset[name]": "other"})
+        assert other.result(1) == {"asset": {"fixed_asset[name]": "other"}}
+        assert not second.done()
+
+    assert first.result() and second.result()
+    assert [name for asset_id, name in landed if asset_id == 1] == ["old", "new"]
+
+
+def test_updates_merge_within_the_window(monkeypatch):
+    calls = []
+    monkeypatch.setitem(
+        coalesce._WRITERS,
+        "update_asset",
+        lambda asset_id, payload: calls.append((asset_id, dict(payload))),
+    )
+
+    with WriteBuffer(window=10) as buffer:
+        buffer.update_asset(1, {"fixed_asset[name]": "a"})
+        buffer.update_asset(1, {"fixed_asset[description]": "b"})
+
+    assert calls == [(1, {"fixed_asset[name]": "a", "fixed_asset[description]": "b"})]
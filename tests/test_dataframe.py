@@ -0,0 +1,80 @@
+import pytest
+
+from ezoff.dataframe import assets_to_dataframe, to_dataframe
+
+pd = pytest.importorskip("pandas")
+
+ASSETS = [
+    {
+        "sequence_num": 1,
+        "name": "Laptop",
+        "state": "available",
+        "group": {"id": 5, "name": "IT"},
+        "custom_fields": [
+            {"name": "Cost", "value": "1200.50"},
+            {"name": "Leased", "value": "true"},
+            {"name": "Tag", "value": "00123"},
+        ],
+    },
+    {
+        "sequence_num": 2,
+        "name": "Monitor",
+        "state": "checked_out",
+        "group": {"id": 5, "name": "IT"},
+        "custom_fields": [
+            {"name": "Cost", "value": "300"},
+            {"name": "Leased", "value": "False"},
+            {"name": "Tag", "value": "00124"},
+        ],
+    },
+    {
+        "sequence_num": 3,
+        "name": "Desk",
+        "state": "available",
+        "group": {"id": 6, "name": "Furniture"},
+        "custom_fields": [{"name": "Colour", "value": "oak"}],
+    },
+    {"sequence_num": 4, "name": "Chair", "state": "available"},
+]
+
+
+def test_custom_fields_are_flattened_and_typed():
+    frame = to_dataframe(ASSETS, max_category_ratio=0)
+
+    assert "custom_fields" not in frame.columns
+    assert frame["custom_fields.Cost"].tolist()[:2] == [1200.5, 300]
+    assert pd.api.types.is_float_dtype(frame["custom_fields.Cost"])
+    assert frame["custom_fields.Cost"].isna().tolist() == [False, False, True, True]
+    assert frame["custom_fields.Leased"].dtype == "boolean"
+    assert frame["custom_fields.Leased"].tolist()[:2] == [True, False]
+    # Leading zeros keep identifiers as strings
+    assert frame["custom_fields.Tag"].tolist()[:2] == ["00123", "00124"]
+    assert frame["custom_fields.Colour"].tolist()[2] == "oak"
+
+
+def test_nested_records_become_dotted_columns():
+    frame = to_dataframe(ASSETS, max_category_ratio=0)
+
+    assert "group" not in frame.columns
+    assert frame["group.name"].tolist()[:3] == ["IT", "IT", "Furniture"]
+    assert frame["sequence_num"].dtype == "int64"
+
+
+def test_categorical_columns():
+    frame = assets_to_dataframe(ASSETS, max_category_ratio=0)
+
+    assert isinstance(frame["state"].dtype, pd.CategoricalDtype)
+    assert sorted(frame["state"].cat.categories) == ["available", "checked_out"]
+    assert not isinstance(frame["name"].dtype, pd.CategoricalDtype)
+
+    frame = assets_to_dataframe(ASSETS, max_category_ratio=0.5)
+
+    # Two distinct group names in four rows
+    assert isinstance(frame["group.name"].dtype, pd.CategoricalDtype)
+    assert not isinstance(frame["name"].dtype, pd.CategoricalDtype)
+
+
+def test_records_keyed_by_id():
+    frame = to_dataframe({101: {"sequence_num": 101, "title": "Fix"}})
+
+    assert frame["sequence_num"].tolist() == [101]
@@ -0,0 +1,58 @@
+import csv
+
+import pytest
+
+from ezoff.export import export_pages
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+PAGES = [
+    [
+        {"id": 1, "qty": 5, "cost": 10, "custom_fields": []},
+        {"id": 2, "qty": 7, "cost": 12, "custom_fields": []},
+    ],
+    [
+        {
+            "id": 3,
+            "qty": "N/A",
+            "cost": 12.5,
+            "custom_fields": [{"name": "Cost Center", "value": "CC-9"}],
+        },
+    ],
+]
+
+
+@pytest.mark.parametrize("format", ["parquet", "arrow"])
+def test_columns_that_change_between_pages_keep_their_values(tmp_path, format):
+    path = str(tmp_path / f"export.{format}")
+
+    assert export_pages(PAGES, path, format, batch_size=1) == 3
+
+    if format == "parquet":
+        table = pq.read_table(path)
+    else:
+        table = pa.ipc.open_file(path).read_all()
+    rows = table.to_pylist()
+    assert [row["custom_fields.Cost Center"] for row in rows] == [None, None, "CC-9"]
+    assert [row["qty"] for row in rows] == ["5", "7", "N/A"]
+    assert table.schema.field("cost").type == pa.float64()
+    assert [row["cost"] for row in rows] == [10.0, 12.0, 12.5]
+
+
+def test_csv_header_covers_every_page(tmp_path):
+    path = str(tmp_path / "export.csv")
+
+    assert export_pages(PAGES, path, "csv") == 3
+
+    with open(path, newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert rows[2]["custom_fields.Cost Center"] == "CC-9"
+    assert [row["qty"] for row in rows] == ["5", "7", "N/A"]
+
+
+def test_values_not_fitting_a_given_schema_raise(tmp_path):
+    schema = pa.schema([("id", pa.int64()), ("qty", pa.int64())])
+
+    with pytest.raises(ValueError):
+        export_pages(PAGES, str(tmp_path / "export.parquet"), schema=schema)
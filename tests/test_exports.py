@@ -0,0 +1,36 @@
+import importlib
+import inspect
+import pkgutil
+
+import ezoff
+
+
+def _star_imported() -> set[str]:
+    with open(ezoff.ezoff.__file__) as f:
+        return {line.split()[1].lstrip(".") for line in f if line.startswith("from .")}
+
+
+def test_every_submodule_is_listed():
+    modules = {info.name for info in pkgutil.iter_modules(ezoff.__path__)}
+    assert ezoff._SUBMODULES == modules
+    assert set(ezoff._EXPORTS) <= modules
+    assert set(ezoff._EXPORTS) == _star_imported()
+
+
+def test_exports_match_what_modules_define():
+    for module_name, names in ezoff._EXPORTS.items():
+        module = importlib.import_module("ezoff." + module_name)
+        defined = {
+            name
+            for name, value in vars(module).items()
+            if not name.startswith("_")
+            and (inspect.isfunction(value) or inspect.isclass(value))
+            and value.__module__ == module.__name__
+        }
+        assert defined <= set(names), module_name
+        assert [n for n in names if not hasattr(module, n)] == [], module_name
+
+
+def test_lazy_names_resolve():
+    for name in ezoff.__all__:
+        assert getattr(ezoff, name) is not None
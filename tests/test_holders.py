@@ -0,0 +1,82 @@
+from ezoff import events
+from ezoff.holders import HolderIndex
+
+ASSETS = [
+    {"sequence_num": 1, "state": "checked_out", "assigned_to_id": 42, "location_id": 7},
+    {"sequence_num": 2, "state": "available", "location_id": 7},
+]
+
+
+def test_update_moves_asset_without_dropping_holder():
+    index = HolderIndex(ASSETS)
+    index.subscribe()
+
+    events.emit(
+        "asset_updated",
+        asset_id="1",
+        asset={"fixed_asset[location_id]": 8},
+        response={"message": "Asset updated"},
+    )
+
+    assert index.location(1) == 8
+    assert index.holder(1) == 42
+    index.unsubscribe()
+
+
+def test_update_response_record_sets_holder():
+    index = HolderIndex(ASSETS)
+    index.subscribe()
+
+    events.emit(
+        "asset_updated",
+        asset_id=1,
+        asset={"fixed_asset[name]": "Renamed"},
+        response={"asset": {"sequence_num": 1, "state": "available"}},
+    )
+
+    assert index.holder(1) is None
+    assert index.assets_held_by(42) == set()
+    assert index.location(1) == 7
+    index.unsubscribe()
+
+
+def test_partial_webhook_record_keeps_holder_and_location():
+    index = HolderIndex(ASSETS)
+    index.subscribe()
+
+    events.emit(
+        "record_changed",
+        entity="assets",
+        action="updated",
+        record_id=1,
+        record={"name": "Renamed laptop"},
+    )
+    events.emit(
+        "record_changed",
+        entity="assets",
+        action="updated",
+        record_id="2",
+        record={"location_id": 9},
+    )
+
+    assert index.holder(1) == 42
+    assert index.location(1) == 7
+    assert index.location(2) == 9
+    assert index.holder(2) is None
+    index.unsubscribe()
+
+
+def test_webhook_for_a_new_asset_adds_it():
+    index = HolderIndex(ASSETS)
+    index.subscribe()
+
+    events.emit(
+        "record_changed",
+        entity="assets",
+        action="created",
+        record_id=3,
+        record={"state": "checked_out", "assigned_to_id": 5, "location_id": 7},
+    )
+
+    assert index.assets_held_by(5) == {3}
+    index.unsubscribe()
@@ -0,0 +1,52 @@
+import json
+
+import pytest
+
+from ezoff.jsonstream import iter_json_items
+
+BODY = json.dumps(
+    {
+        "page": 1,
+        "assets": [
+            {"id": 12.5e3, "name": 'Café ☕ \\"quoted\\"', "tags": [1, -20, 3.25]},
+            {"id": 1234567, "name": "Laptop", "state": None, "active": True},
+            [],
+            "ünïcode",
+            0,
+        ],
+        "total_pages": 10,
+        "filters": {"state": "available"},
+    },
+    ensure_ascii=False,
+).encode()
+
+
+def _chunks(body: bytes, sizes: list[int]):
+    start = 0
+    for size in sizes:
+        yield body[start : start + size]
+        start += size
+    yield body[start:]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 7, 16, 64, len(BODY)])
+def test_items_match_json_loads_for_any_chunk_size(size):
+    chunks = [BODY[i : i + size] for i in range(0, len(BODY), size)]
+    meta = {}
+
+    items = list(iter_json_items(chunks, "assets", meta))
+
+    expected = json.loads(BODY)
+    assert items == expected["assets"]
+    assert meta == {"page": 1, "total_pages": 10, "filters": {"state": "available"}}
+
+
+def test_items_match_json_loads_for_every_split_point():
+    expected = json.loads(BODY)["assets"]
+    for split in range(len(BODY) + 1):
+        assert list(iter_json_items(_chunks(BODY, [split]), "assets", {})) == expected
+
+
+def test_truncated_body_is_an_error():
+    with pytest.raises(ValueError):
+        list(iter_json_items([BODY[:-20]], "assets", {}))
@@ -0,0 +1,35 @@
+import pytest
+
+from ezoff import location_tree
+from ezoff.location_tree import QUANTITIES_KEY, LocationTree
+
+LOCATIONS = [
+    {"id": 1, "name": "Region"},
+    {"id": 2, "name": "Store A", "parent_id": 1},
+    {"id": 3, "name": "Store B", "parent_id": 1},
+]
+
+
+def test_quantities_roll_up_the_tree(monkeypatch):
+    stock = {1: {}, 2: {"10": 4, "11": 1}, 3: {"10": 2}}
+    monkeypatch.setattr(
+        location_tree,
+        "get_location_item_quantities",
+        lambda loc_id: {QUANTITIES_KEY: stock[loc_id]},
+    )
+
+    totals = LocationTree(LOCATIONS).rolled_up_quantities(max_workers=2)
+
+    assert totals[1] == {"10": 6, "11": 1}
+    assert totals[3] == {"10": 2}
+
+
+def test_unexpected_quantities_response_fails(monkeypatch):
+    monkeypatch.setattr(
+        location_tree,
+        "get_location_item_quantities",
+        lambda loc_id: {"message": "not found", "total": 3},
+    )
+
+    with pytest.raises(Exception, match="could not get item quantities"):
+        LocationTree(LOCATIONS).fetch_quantities()
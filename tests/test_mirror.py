@@ -0,0 +1,41 @@
+import pytest
+
+from conftest import fake_paged_get
+from ezoff import transport
+from ezoff.mirror import Mirror
+
+LOCATIONS = [{"id": i, "name": f"Location {i}"} for i in range(1, 51)]
+
+
+def test_sync_prune_removes_records_missing_from_a_complete_pull(monkeypatch, tmp_path):
+    with Mirror(str(tmp_path / "mirror.db")) as mirror:
+        monkeypatch.setattr(
+            transport, "get", fake_paged_get("locations", LOCATIONS, 10)
+        )
+        mirror.sync("locations", per_page=None)
+
+        monkeypatch.setattr(
+            transport, "get", fake_paged_get("locations", LOCATIONS[:40], 10)
+        )
+        result = mirror.sync("locations", per_page=None, prune=True)
+
+        assert result == {"stored": 40, "pruned": 10}
+        assert mirror.count("locations") == 40
+
+
+def test_sync_prune_keeps_records_after_a_partial_pull(monkeypatch, tmp_path):
+    with Mirror(str(tmp_path / "mirror.db")) as mirror:
+        monkeypatch.setattr(
+            transport, "get", fake_paged_get("locations", LOCATIONS, 10)
+        )
+        mirror.sync("locations", per_page=None)
+
+        monkeypatch.setattr(
+            transport,
+            "get",
+            fake_paged_get("locations", LOCATIONS, 10, fail_page=3),
+        )
+        with pytest.raises(transport.IncompletePullError):
+            mirror.sync("locations", per_page=None, prune=True)
+
+        assert mirror.count("locations") == 50
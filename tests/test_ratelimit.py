@@ -0,0 +1,98 @@
+import os
+
+import pytest
+
+from ezoff import ratelimit
+from ezoff.ratelimit import FileTokenBucket
+
+fcntl = pytest.importorskip("fcntl")
+
+
+def _fork(check) -> int:
+    """
+    Run check in a forked child, its return value is the exit code
+    """
+    pid = os.fork()
+    if pid == 0:
+        try:
+            os._exit(check())
+        except BaseException:
+            os._exit(99)
+    return pid
+
+
+def _exit_code(pid: int) -> int:
+    return os.waitstatus_to_exitcode(os.waitpid(pid, 0)[1])
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+def test_forked_child_is_excluded_by_parents_lock(tmp_path):
+    bucket = FileTokenBucket(str(tmp_path / "bucket"), rate=10)
+    fcntl.flock(bucket._fd, fcntl.LOCK_EX)
+    try:
+
+        def try_lock():
+            try:
+                fcntl.flock(bucket._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return 0
+            return 1
+
+        assert _exit_code(_fork(try_lock)) == 0
+    finally:
+        fcntl.flock(bucket._fd, fcntl.LOCK_UN)
+        bucket.close()
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+def test_forked_children_share_one_budget(tmp_path):
+    bucket = FileTokenBucket(str(tmp_path / "bucket"), rate=0.001, capacity=20)
+
+    def spend():
+        taken = 0
+        for _ in range(20):
+            if bucket._take(1) == 0:
+                taken += 1
+        return taken
+
+    pids = [_fork(spend) for _ in range(4)]
+    taken = sum(_exit_code(pid) for pid in pids)
+    bucket.close()
+
+    assert taken == 20
+
+
+def test_capacity_below_one_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        FileTokenBucket(str(tmp_path / "bucket"), rate=10, capacity=0.5)
+
+
+def test_acquire_more_than_capacity_raises(tmp_path):
+    bucket = FileTokenBucket(str(tmp_path / "bucket"), rate=10, capacity=2)
+    try:
+        with pytest.raises(ValueError):
+            bucket.acquire(3)
+    finally:
+        bucket.close()
+
+
+@pytest.mark.skipif(not hasattr(os, "O_NOFOLLOW"), reason="needs O_NOFOLLOW")
+def test_symlinked_bucket_is_refused(tmp_path):
+    target = tmp_path / "victim"
+    target.write_bytes(b"keep me")
+    os.symlink(target, tmp_path / "bucket")
+
+    with pytest.raises(OSError):
+        FileTokenBucket(str(tmp_path / "bucket"), rate=10)
+    assert target.read_bytes() == b"keep me"
+
+
+def test_default_bucket_is_private(monkeypatch, tmp_path):
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+    bucket = FileTokenBucket(ratelimit._default_path(), rate=10)
+    try:
+        assert os.path.dirname(bucket.path) == str(tmp_path / "ezoff")
+        assert os.stat(tmp_path / "ezoff").st_mode & 0o077 == 0
+        assert os.stat(bucket.path).st_mode & 0o077 == 0
+    finally:
+        bucket.close()
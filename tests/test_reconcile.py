@@ -0,0 +1,117 @@
+from ezoff.reconcile import plan_member_changes
+
+
+def member(email, first="Sam", status=None, **fields):
+    row = {
+        "user[email]": email,
+        "user[first_name]": first,
+        "user[last_name]": "Lee",
+        "user[role_id]": 3,
+    }
+    if status is not None:
+        row["status"] = status
+    row.update(fields)
+    return row
+
+
+CURRENT = [
+    {
+        "id": 1,
+        "email": "sam@example.com",
+        "first_name": "Sam",
+        "last_name": "Lee",
+        "role_id": 3,
+        "status": "active",
+        "custom_fields": [{"name": "Badge", "value": "B-1"}],
+    },
+    {
+        "id": 2,
+        "email": "ana@example.com",
+        "first_name": "Ana",
+        "last_name": "Lee",
+        "role_id": 3,
+        "status": "inactive",
+    },
+    {
+        "id": 3,
+        "email": "kim@example.com",
+        "first_name": "Kim",
+        "last_name": "Lee",
+        "role_id": 3,
+        "status": "active",
+    },
+]
+
+
+def test_new_members_are_created_without_status():
+    plan = plan_member_changes([member("new@example.com", status=" Active ")], [])
+
+    assert plan["create"] == [member("new@example.com")]
+    assert plan["errors"] == []
+
+
+def test_new_inactive_member_is_not_created():
+    plan = plan_member_changes([member("new@example.com", status="INACTIVE")], [])
+
+    assert plan["create"] == []
+    assert plan["unchanged"] == 1
+
+
+def test_unknown_status_is_an_error():
+    plan = plan_member_changes([member("new@example.com", status="enabled")], [])
+
+    assert plan["create"] == []
+    assert plan["errors"] == [
+        ("new@example.com", "status must be 'active' or 'inactive', got 'enabled'")
+    ]
+
+
+def test_updates_carry_changed_fields_only():
+    desired = [member("SAM@example.com ", first="Samuel", **{"user[fax]": "1"})]
+
+    plan = plan_member_changes(desired, CURRENT)
+
+    # fax isn't in the snapshot, so it can't be compared
+    assert plan["update"] == [(1, {"user[first_name]": "Samuel"})]
+    assert plan["create"] == []
+
+
+def test_custom_attribute_changes_are_diffed():
+    same = member("sam@example.com", **{"user[custom_attributes][Badge]": "B-1"})
+    changed = member("sam@example.com", **{"user[custom_attributes][Badge]": "B-2"})
+
+    assert plan_member_changes([same], CURRENT)["unchanged"] == 1
+    assert plan_member_changes([changed], CURRENT)["update"] == [
+        (1, {"user[custom_attributes][Badge]": "B-2"})
+    ]
+
+
+def test_activate_and_deactivate():
+    desired = [
+        member("ana@example.com", first="Ana", status="Active"),
+        member("kim@example.com", first="Kim", status="inactive"),
+    ]
+
+    plan = plan_member_changes(desired, CURRENT)
+
+    assert plan["activate"] == [2]
+    assert plan["deactivate"] == [3]
+    assert plan["update"] == []
+
+
+def test_deactivate_missing_only_touches_active_members_left_out():
+    plan = plan_member_changes(
+        [member("sam@example.com")], CURRENT, deactivate_missing=True
+    )
+
+    assert plan["deactivate"] == [3]
+    assert plan["unchanged"] == 1
+
+
+def test_duplicate_keys_are_reported():
+    desired = [member("sam@example.com"), member("Sam@Example.com", first="Other")]
+
+    plan = plan_member_changes(desired, CURRENT)
+
+    assert plan["errors"] == [("sam@example.com", "duplicate email")]
+    assert plan["update"] == []
@@ -0,0 +1,66 @@
+import threading
+import time
+from contextlib import contextmanager
+
+import pytest
+
+from ezoff import resilience
+
+
+@pytest.fixture(autouse=True)
+def clean_latencies():
+    resilience.latencies.clear()
+    yield
+    resilience.disable_hedging()
+    resilience.latencies.clear()
+
+
+class FakeResponse:
+    status_code = 200
+
+    def __init__(self, name):
+        self.name = name
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_queueing_is_not_counted_as_latency():
+    @contextmanager
+    def admit():
+        time.sleep(0.2)
+        yield
+
+    resilience.call("assets", lambda: FakeResponse("only"), admit=admit)
+
+    assert resilience.latencies.percentile("assets", 50, min_samples=1) < 0.1
+
+
+def test_losing_hedged_response_is_closed():
+    for _ in range(5):
+        resilience.latencies.record("assets", 0.01)
+    resilience.configure_hedging(percentile=50, min_samples=5)
+
+    lock = threading.Lock()
+    calls = []
+    release_first = threading.Event()
+
+    def send():
+        with lock:
+            calls.append(FakeResponse(f"attempt {len(calls) + 1}"))
+            response = calls[-1]
+            first = len(calls) == 1
+        if first:
+            release_first.wait(5)
+        return response
+
+    winner = resilience.call("assets", send, hedge=True)
+    release_first.set()
+
+    assert winner.name == "attempt 2"
+    deadline = time.monotonic() + 5
+    while not calls[0].closed and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert calls[0].closed
+    assert not winner.closed
@@ -0,0 +1,47 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from ezoff import ratelimit, scheduler, transport
+
+
+@pytest.fixture(autouse=True)
+def no_scheduler():
+    yield
+    scheduler.disable_scheduler()
+    ratelimit.disable_rate_limit()
+
+
+def test_bound_function_runs_at_callers_priority():
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        with scheduler.priority("bulk"):
+            bound = executor.submit(scheduler.bind_priority(scheduler.current_priority))
+            unbound = executor.submit(scheduler.current_priority)
+
+        assert bound.result() == "bulk"
+        assert unbound.result() == "interactive"
+
+
+def test_slot_is_free_while_waiting_for_rate_budget(tmp_path):
+    limiter = ratelimit.configure_rate_limit(4, capacity=1, path=str(tmp_path / "b"))
+    limiter.acquire()
+    slots = scheduler.configure_scheduler(max_concurrent=1)
+    sent = threading.Event()
+
+    def bulk_call():
+        with scheduler.priority("bulk"):
+            with transport._admitted():
+                sent.set()
+
+    thread = threading.Thread(target=bulk_call)
+    thread.start()
+    time.sleep(0.05)
+
+    # The bulk call is sleeping on the empty bucket, not holding the slot
+    with slots.slot("interactive"):
+        assert not sent.is_set()
+
+    thread.join(5)
+    assert sent.is_set()
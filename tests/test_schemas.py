@@ -0,0 +1,81 @@
+import pytest
+
+from ezoff.schemas import validate_payload, validate_payloads
+
+ASSET = {
+    "fixed_asset[name]": "Laptop",
+    "fixed_asset[group_id]": 1,
+    "fixed_asset[purchased_on]": "01/31/2024",
+}
+
+
+def test_missing_required_key_is_rejected():
+    payload = dict(ASSET)
+    del payload["fixed_asset[group_id]"]
+
+    with pytest.raises(ValueError, match=r"'fixed_asset\[group_id\]'"):
+        validate_payload("create_asset", payload)
+
+
+def test_unknown_keys_are_dropped_and_prefixed_keys_kept():
+    payload = dict(ASSET, **{"fixed_asset[colour]": "red", "cust_attr[1]": "x"})
+
+    assert validate_payload("create_asset", payload) == dict(
+        ASSET, **{"cust_attr[1]": "x"}
+    )
+
+
+@pytest.mark.parametrize("date", ["2024-01-31", "31/01/2024", None])
+def test_dates_must_match_the_format(date):
+    with pytest.raises(ValueError, match="mm/dd/yyyy"):
+        validate_payload(
+            "create_asset", dict(ASSET, **{"fixed_asset[purchased_on]": date})
+        )
+
+
+def test_choices_are_checked():
+    with pytest.raises(ValueError, match="'active', 'inactive'"):
+        validate_payload(
+            "create_location", {"location[name]": "HQ", "location[status]": "closed"}
+        )
+
+
+def test_linked_inv_needs_a_quantity_key_matching_the_pattern():
+    payload = {
+        "inventory_id": 7,
+        "linked_inventory_items[7][quantity]": 2,
+        "linked_inventory_items[7][location_id]": 3,
+        "linked_inventory_items[7][colour]": "red",
+    }
+
+    assert validate_payload("add_linked_inv_to_work_order", payload) == {
+        "inventory_id": 7,
+        "linked_inventory_items[7][quantity]": 2,
+        "linked_inventory_items[7][location_id]": 3,
+    }
+    with pytest.raises(ValueError, match="linked_inventory_items"):
+        validate_payload(
+            "add_linked_inv_to_work_order",
+            {"inventory_id": 7, "linked_inventory_items[7][location_id]": 3},
+        )
+
+
+def test_validate_payloads_reports_bad_rows_by_index():
+    payloads = [
+        ASSET,
+        {"fixed_asset[name]": "No group"},
+        dict(ASSET, **{"fixed_asset[purchased_on]": "yesterday"}),
+        dict(ASSET, extra="dropped"),
+    ]
+
+    valid, errors = validate_payloads("create_asset", payloads)
+
+    assert valid == [ASSET, ASSET]
+    assert sorted(errors) == [1, 2]
+    assert "fixed_asset[group_id]" in errors[1]
+    assert "mm/dd/yyyy" in errors[2]
+
+
+def test_unknown_schema_name():
+    with pytest.raises(ValueError, match="name must be one of"):
+        validate_payload("create_widget", {})
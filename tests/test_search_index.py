@@ -0,0 +1,62 @@
+import gc
+
+from ezoff import events
+from ezoff.search_index import MAX_PREFIX, AssetSearchIndex
+
+ASSETS = [
+    {"sequence_num": 1, "name": "Laptop - Dell Latitude 5440"},
+    {"sequence_num": 2, "name": "Lamp", "description": "Internationalization kit"},
+]
+
+
+def ids(assets):
+    return [asset["sequence_num"] for asset in assets]
+
+
+def test_words_match_as_prefixes():
+    index = AssetSearchIndex(ASSETS)
+
+    assert ids(index.search("lap dell")) == [1]
+    assert ids(index.search("la")) == [1, 2]
+    assert ids(index.search("internationaliz")) == [2]
+    assert len("internationaliz") > MAX_PREFIX
+    assert index.search("internationalx") == []
+
+    index.remove(2)
+    assert ids(index.search("la")) == [1]
+    assert "lam" not in index._postings
+
+
+def test_unused_index_is_dropped_from_subscribers():
+    index = AssetSearchIndex(ASSETS)
+    index.subscribe()
+    del index
+    gc.collect()
+
+    events.emit("asset_deleted", asset_id=1, response=None)
+
+    assert events._subscribers["asset_deleted"] == []
+
+
+def test_updates_with_string_ids_replace_the_entry():
+    index = AssetSearchIndex(ASSETS)
+    index.subscribe()
+
+    events.emit(
+        "asset_updated",
+        asset_id="1",
+        asset={"fixed_asset[name]": "Desktop"},
+        response={"message": "Asset updated"},
+    )
+    events.emit(
+        "asset_updated",
+        asset_id=2,
+        asset={"fixed_asset[name]": "Desk lamp"},
+        response={"asset": {"sequence_num": "2", "name": "Lamp"}},
+    )
+
+    assert len(index) == 2
+    # The record keeps the id as the API sent it
+    assert ids(index.search("desk")) == [1, "2"]
+    assert index.search("laptop") == []
+    index.unsubscribe()
@@ -0,0 +1,49 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from conftest import fake_paged_get
+from ezoff import transport
+from ezoff.shared_store import SharedAssetStore, StoreRefresher, write_asset_store
+
+
+def test_lookups_with_ids_that_cant_be_in_the_store(tmp_path):
+    path = str(tmp_path / "assets.store")
+    write_asset_store(path, [{"sequence_num": 5, "name": "Laptop"}])
+    store = SharedAssetStore(path)
+
+    assert 5 in store
+    assert "5" in store
+    assert "abc" not in store
+    assert None not in store
+    assert store.get("abc") is None
+    with pytest.raises(KeyError):
+        store["abc"]
+
+
+def test_threads_writing_the_same_store_dont_collide(tmp_path):
+    path = str(tmp_path / "assets.store")
+
+    def write(n):
+        write_asset_store(path, [{"sequence_num": i} for i in range(n)])
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(write, range(1, 41)))
+
+    assert len(list(SharedAssetStore(path).ids())) in range(1, 41)
+    assert os.listdir(tmp_path) == ["assets.store"]
+
+
+def test_refresher_keeps_the_store_after_a_partial_pull(monkeypatch, tmp_path):
+    path = str(tmp_path / "assets.store")
+    write_asset_store(path, [{"sequence_num": i} for i in range(1, 31)])
+    records = [{"sequence_num": i} for i in range(1, 31)]
+    monkeypatch.setattr(
+        transport, "get", fake_paged_get("assets", records, 10, fail_page=2)
+    )
+
+    with pytest.raises(transport.IncompletePullError):
+        StoreRefresher(path).refresh(force=True)
+
+    assert len(list(SharedAssetStore(path).ids())) == 30
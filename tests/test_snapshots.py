@@ -0,0 +1,37 @@
+import os
+
+import pytest
+
+from conftest import fake_paged_get
+from ezoff import transport
+from ezoff.snapshots import SnapshotArchive
+
+ASSETS = [{"sequence_num": i, "name": f"Asset {i}"} for i in range(1, 101)]
+
+
+def test_snapshot_refuses_to_write_a_truncated_pull(monkeypatch, tmp_path):
+    archive = SnapshotArchive(str(tmp_path))
+    monkeypatch.setattr(transport, "get", fake_paged_get("assets", ASSETS, 25))
+    archive.snapshot(["assets"], day="2024-01-01")
+
+    monkeypatch.setattr(
+        transport, "get", fake_paged_get("assets", ASSETS, 25, fail_page=3)
+    )
+    with pytest.raises(transport.IncompletePullError):
+        archive.snapshot(["assets"], day="2024-01-02")
+
+    assert archive.days("assets") == ["2024-01-01"]
+    assert archive.get("assets", 100, "2024-01-02") == ASSETS[-1]
+
+
+def test_write_leaves_no_temporary_files(tmp_path):
+    archive = SnapshotArchive(str(tmp_path))
+    archive.write("assets", ASSETS, day="2024-01-01")
+    archive.write("assets", ASSETS[:-1], day="2024-01-02")
+
+    assert sorted(os.listdir(tmp_path / "assets")) == [
+        "2024-01-01.snap",
+        "2024-01-02.snap",
+    ]
+    assert archive.get("assets", 100, "2024-01-02") is None
+    assert archive.get("assets", 100, "2024-01-01") == ASSETS[-1]
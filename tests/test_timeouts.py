@@ -0,0 +1,30 @@
+import pytest
+import requests
+
+from conftest import json_response
+from ezoff import ratelimit, resilience, timeouts, transport
+
+
+@pytest.fixture(autouse=True)
+def clean_state():
+    resilience.latencies.clear()
+    yield
+    ratelimit.disable_rate_limit()
+    resilience.latencies.clear()
+    timeouts._settings = None
+
+
+def test_adaptive_timeout_ignores_time_spent_waiting_for_budget(monkeypatch, tmp_path):
+    timeouts.configure_timeouts(
+        adaptive=True, min_samples=1, multiplier=3, minimum=0.01
+    )
+    limiter = ratelimit.configure_rate_limit(5, capacity=1, path=str(tmp_path / "b"))
+    limiter.acquire()
+    monkeypatch.setattr(
+        requests, "get", lambda url, **kwargs: json_response({"assets": []})
+    )
+
+    transport.get("https://example.ezofficeinventory.com/assets.api")
+
+    # The call waited ~0.2s for a token, the request itself was instant
+    assert timeouts.get_timeout("assets") < 0.1
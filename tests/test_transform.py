@@ -0,0 +1,74 @@
+import functools
+import time
+
+from ezoff import transform
+from ezoff.transform import Chain, map_ids, normalize_dates, transform_pages
+
+
+def slow_first(record: dict) -> dict:
+    # Early records finish last, results must still come back in order
+    time.sleep(0.05 if record["id"] < 3 else 0)
+    return dict(record, double=record["id"] * 2)
+
+
+def _pages(count: int, size: int, pulled: list = None):
+    for page in range(count):
+        if pulled is not None:
+            pulled.append(page)
+        yield [{"id": page * size + i} for i in range(size)]
+
+
+def test_results_keep_their_order_across_workers():
+    pages = list(transform_pages(_pages(6, 2), slow_first, workers=3, batch_size=1))
+
+    assert [[r["id"] for r in page] for page in pages] == [
+        [i * 2, i * 2 + 1] for i in range(6)
+    ]
+    assert all(r["double"] == r["id"] * 2 for page in pages for r in page)
+
+
+def test_one_worker_runs_in_process(monkeypatch):
+    def no_pool(*args, **kwargs):
+        raise AssertionError("no process pool for workers=1")
+
+    monkeypatch.setattr(transform, "ProcessPoolExecutor", no_pool)
+    seen = []
+
+    # A closure can't be pickled, so this only works in this process
+    def record_it(record):
+        seen.append(record["id"])
+        return record
+
+    assert len(list(transform_pages(_pages(3, 2), record_it, workers=1))) == 3
+    assert seen == list(range(6))
+
+
+def test_pages_are_grouped_into_batches():
+    batches = list(transform._batches(_pages(5, 2), batch_size=3))
+
+    assert [sum(len(page) for page in batch) for batch in batches] == [4, 4, 2]
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+
+
+def test_stopping_early_stops_pulling_pages():
+    pulled = []
+    results = transform_pages(
+        _pages(1000, 1, pulled), normalize_dates, workers=2, batch_size=1, window=2
+    )
+
+    next(results)
+    results.close()
+
+    # Only the window of in-flight batches was read ahead
+    assert len(pulled) <= 3
+
+
+def test_chain_and_map_ids_in_workers():
+    names = functools.partial(map_ids, names={"location_id": {1: "HQ"}})
+    records = [{"id": 1, "location_id": "1", "created_at": "01/02/2024"}]
+
+    (page,) = transform_pages(
+        [records], Chain(normalize_dates, names), workers=2, batch_size=1
+    )
+
+    assert page == [dict(records[0], created_at="2024-01-02", location_name="HQ")]
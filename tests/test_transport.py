@@ -0,0 +1,160 @@
+import importlib
+from types import SimpleNamespace
+
+import pytest
+import requests
+
+from conftest import fake_paged_get, json_response
+from ezoff import transport
+
+RECORDS = [{"id": i, "name": f"Location {i}"} for i in range(1, 101)]
+
+
+def test_iter_pages_yields_every_page(monkeypatch):
+    monkeypatch.setattr(transport, "get", fake_paged_get("locations", RECORDS, 10))
+
+    pages = list(transport.iter_pages("url", "locations", "locations"))
+
+    assert [record for page in pages for record in page] == RECORDS
+
+
+def test_iter_pages_raises_when_a_page_fails_partway(monkeypatch):
+    get = fake_paged_get("locations", RECORDS, 10, fail_page=3)
+    monkeypatch.setattr(transport, "get", get)
+
+    pages = []
+    with pytest.raises(transport.IncompletePullError):
+        for page in transport.iter_pages("url", "locations", "locations"):
+            pages.append(page)
+
+    assert len(pages) == 2
+    assert get.requested == [1, 2, 3]
+
+
+def test_iter_pages_raises_when_the_first_page_fails(monkeypatch):
+    monkeypatch.setattr(
+        transport, "get", fake_paged_get("locations", RECORDS, 10, fail_page=1)
+    )
+
+    with pytest.raises(transport.IncompletePullError):
+        list(transport.iter_pages("url", "locations", "locations"))
+
+
+def test_iter_records_raises_when_a_page_fails_partway(monkeypatch):
+    monkeypatch.setattr(
+        transport, "get", fake_paged_get("locations", RECORDS, 10, fail_page=4)
+    )
+
+    records = []
+    with pytest.raises(transport.IncompletePullError):
+        for record in transport.iter_records("url", "locations", "locations"):
+            records.append(record)
+
+    assert records == RECORDS[:30]
+
+
+def test_stored_validators_are_bounded(monkeypatch):
+    monkeypatch.setattr(transport, "MAX_VALIDATORS", 2)
+    transport.clear_validators()
+    sent = []
+
+    def get(url, headers=None, **kwargs):
+        sent.append(headers.get("If-None-Match"))
+        response = json_response({"id": url})
+        response.headers["ETag"] = "etag " + url
+        return response
+
+    monkeypatch.setattr(requests, "get", get)
+    for url in ["https://x/a", "https://x/b", "https://x/a", "https://x/c"]:
+        transport.get(url, conditional=True)
+    transport.get("https://x/a", conditional=True)
+    transport.get("https://x/b", conditional=True)
+
+    # b was least recently used when c came in
+    assert sent[-2:] == ["etag https://x/a", None]
+    assert len(transport._validators) == 2
+    transport.clear_validators()
+
+
+@pytest.mark.parametrize(
+    "module, function, args, key",
+    [
+        ("assets", "search_for_asset", ["lamp"], "assets"),
+        ("members", "get_teams", [], "teams"),
+        ("groups", "get_subgroups", [None], "sub_groups"),
+    ],
+)
+def test_list_functions_raise_when_a_page_fails_partway(
+    monkeypatch, module, function, args, key
+):
+    get = fake_paged_get(key, RECORDS, 10, fail_page=2)
+    monkeypatch.setattr(transport, "get", get)
+    call = getattr(importlib.import_module("ezoff." + module), function)
+
+    with pytest.raises(transport.IncompletePullError):
+        call(*args)
+
+    assert get.requested == [1, 2]
+
+
+def fake_sized_get(records: list, clock: list, cap=None, default=25, honour=True):
+    """
+    Stand-in for transport.get that pages by params["per_page"], capped at
+    cap, or always by default if not honour. Each request moves clock on by
+    a fixed overhead plus a cost per record, so bigger pages are faster.
+    """
+    requested = []
+
+    def get(url, params=None, **kwargs):
+        size = params.get("per_page", default) if honour else default
+        if cap is not None:
+            size = min(size, cap)
+        page = params["page"]
+        requested.append((page, params.get("per_page")))
+        start = (page - 1) * size
+        chunk = records[start : start + size]
+        clock[0] += 0.05 + 0.0001 * len(chunk)
+        return json_response(
+            {"assets": chunk, "total_pages": max(1, -(-len(records) // size))}
+        )
+
+    get.requested = requested
+    return get
+
+
+MANY = [{"sequence_num": i} for i in range(1, 5001)]
+
+
+def pull_auto(monkeypatch, **server):
+    clock = [0.0]
+    get = fake_sized_get(MANY, clock, **server)
+    monkeypatch.setattr(transport, "get", get)
+    monkeypatch.setattr(transport, "time", SimpleNamespace(monotonic=lambda: clock[0]))
+
+    pages = list(transport.iter_pages("url", "assets", "assets", per_page="auto"))
+
+    assert [record for page in pages for record in page] == MANY
+    return [per_page for _, per_page in get.requested]
+
+
+def test_auto_page_size_grows_to_the_maximum_on_an_uncapped_server(monkeypatch):
+    sizes = pull_auto(monkeypatch)
+
+    assert sizes[0] == 32
+    assert sizes == sorted(sizes)
+    assert sizes[-3:] == [1024, 1024, 1024]
+
+
+def test_auto_page_size_falls_back_when_the_server_caps_it(monkeypatch):
+    sizes = pull_auto(monkeypatch, cap=100)
+
+    # 128 came back as 100 records, so that page is dropped and 64 kept
+    assert sizes.count(128) == 1
+    assert sizes[sizes.index(128) + 1 :] == [64] * (len(MANY) // 64 - 1)
+
+
+def test_auto_page_size_follows_a_server_ignoring_it(monkeypatch):
+    sizes = pull_auto(monkeypatch, honour=False, default=25)
+
+    assert sizes[0] == 32
+    assert sizes[1:] == [25] * (len(MANY) // 25 - 1)
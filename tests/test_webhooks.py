@@ -0,0 +1,90 @@
+import http.client
+import json
+
+import pytest
+
+from ezoff import events
+from ezoff.mirror import Mirror
+from ezoff.webhooks import SIGNATURE_HEADER, WebhookReceiver, send_test_webhook
+
+SECRET = "secret"
+
+
+@pytest.fixture
+def mirror(tmp_path):
+    with Mirror(str(tmp_path / "mirror.db")) as mirror:
+        yield mirror
+
+
+@pytest.fixture
+def receiver(mirror):
+    with WebhookReceiver(SECRET, port=0, mirror=mirror) as receiver:
+        yield receiver
+
+
+def _post(receiver, headers: dict, body: bytes = b"") -> tuple[int, dict]:
+    host, port = receiver._server.server_address[:2]
+    connection = http.client.HTTPConnection(host, port, timeout=5)
+    try:
+        connection.putrequest("POST", receiver.path, skip_accept_encoding=True)
+        for name, value in headers.items():
+            connection.putheader(name, value)
+        connection.endheaders(body)
+        response = connection.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        connection.close()
+
+
+def test_bad_signature_is_rejected(receiver, mirror):
+    response = send_test_webhook(
+        receiver.url, "wrong", "asset.created", 1, {"name": "Laptop"}
+    )
+
+    assert response.status_code == 401
+    assert mirror.count("assets") == 0
+
+
+def test_repeated_delivery_is_applied_once(receiver):
+    changes = []
+
+    def on_change(**kwargs):
+        changes.append(kwargs)
+
+    events.subscribe("record_changed", on_change)
+    try:
+        for _ in range(2):
+            response = send_test_webhook(
+                receiver.url, SECRET, "asset.updated", 1, {"name": "A"}, "delivery-1"
+            )
+            assert response.status_code == 200
+    finally:
+        events.unsubscribe("record_changed", on_change)
+
+    assert len(changes) == 1
+    assert receiver.applied == 1
+    assert receiver.received == 2
+
+
+def test_mirror_upsert_and_delete(receiver, mirror):
+    send_test_webhook(receiver.url, SECRET, "member.created", 7, {"name": "Sam"})
+    assert mirror.get("members", 7) == {"name": "Sam"}
+
+    response = send_test_webhook(receiver.url, SECRET, "member.deleted", 7)
+
+    assert response.status_code == 200
+    assert mirror.get("members", 7) is None
+
+
+@pytest.mark.parametrize(
+    "length, status",
+    [("-1", 400), ("abc", 400), (None, 411), (str(10**9), 413)],
+)
+def test_bad_content_length_is_answered_before_reading(receiver, length, status):
+    body = json.dumps({"event": "asset.deleted", "record_id": 1}).encode()
+    headers = {SIGNATURE_HEADER: "sha256=0"}
+    if length is not None:
+        headers["Content-Length"] = length
+
+    assert _post(receiver, headers, body)[0] == status
+    assert receiver.received == 0